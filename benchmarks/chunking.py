@@ -0,0 +1,81 @@
+"""
+Chunking benchmark: native MarkdownChunker vs the LangChain two-stage splitter.
+
+Chunks a markdown file (or a generated text-heavy corpus) with both implementations,
+checks they produce the same chunks and reports the time per run and MB/s.
+
+    uv run python benchmarks/chunking.py
+    uv run python benchmarks/chunking.py --markdown output/output.md --repeat 20
+"""
+
+import argparse
+import logging
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+from docuflow.core.ingestion.chunking import get_sections, get_sections_langchain
+from docuflow.schemas.document import Document
+
+WORDS = "the of retrieval embedding chunk vector store section header model query document index".split()
+
+
+def generate_markdown(n_sections: int, seed: int = 0) -> str:
+    """Text-heavy markdown: nested headers, bold section titles, long paragraphs, code blocks"""
+    rng = random.Random(seed)
+
+    def paragraph() -> str:
+        sentences = [" ".join(rng.choices(WORDS, k=rng.randint(6, 30))).capitalize() + "." for _ in range(12)]
+        return " ".join(sentences[: rng.randint(1, 12)])
+
+    lines = []
+    for i in range(n_sections):
+        lines.append(f"{'#' * rng.randint(1, 3)} Section {i}\n")
+        for _ in range(rng.randint(2, 8)):
+            if rng.random() < 0.1:
+                lines.append(f"**Note {i}**\n")
+            if rng.random() < 0.05:
+                lines.append("```python\nprint('hello')\n```\n")
+            lines.append(paragraph() + "\n")
+    return "\n".join(lines)
+
+
+def best_of(chunk: Callable[[str], List[Document]], text: str, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        chunk(text)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--markdown", type=Path, default=None, help="markdown file to chunk (default: generated)")
+    parser.add_argument("--sections", type=int, default=2000, help="sections in the generated corpus")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    # both implementations log per call, keep the output to the results
+    logging.disable(logging.INFO)
+
+    text = args.markdown.read_text(encoding="utf-8") if args.markdown else generate_markdown(args.sections)
+    mb = len(text.encode("utf-8")) / 1e6
+
+    native = get_sections(text)
+    reference = get_sections_langchain(text)
+    same = [(d.page_content, d.metadata) for d in native] == [(d.page_content, d.metadata) for d in reference]
+    print(f"input: {mb:.2f} MB, {len(native)} chunks, identical to langchain: {same}")
+
+    native_s = best_of(get_sections, text, args.repeat)
+    reference_s = best_of(get_sections_langchain, text, args.repeat)
+    print(f"{'native':<12} {native_s * 1000:9.1f} ms  {mb / native_s:7.1f} MB/s")
+    print(f"{'langchain':<12} {reference_s * 1000:9.1f} ms  {mb / reference_s:7.1f} MB/s")
+    print(f"speedup: {reference_s / native_s:.2f}x")
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""
+Embedding backend benchmark: PyTorch BGE vs ONNX Runtime (fp32 and int8) on CPU.
+
+Embeds the same passages and queries with every backend and prints, side by side,
+passage throughput, single-query latency and agreement with the PyTorch vectors:
+mean / min cosine similarity per text, and overlap of each query's top-k passages.
+
+Export the ONNX model first (`just onnx-export`).
+
+    uv run python benchmarks/embedding_backends.py
+    uv run python benchmarks/embedding_backends.py --passages 2000 --threads 4
+"""
+
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from docuflow.configs import settings
+from docuflow.interfaces import ITextEmbedder
+from docuflow.services import BGETextEmbedder, ONNXTextEmbedder
+from docuflow.services.onnx_text_embedder import QUANTIZED_MODEL_FILE
+
+WORDS = (
+    "the vector store keeps every chunk of a document with its embedding and metadata so retrieval can "
+    "rank passages by similarity to the question before the language model writes an answer from them "
+    "invoices contracts reports manuals tables pages sections scanned pdf ocr layout heading paragraph"
+).split()
+
+
+def make_texts(n: int, min_words: int, max_words: int, seed: int) -> List[str]:
+    """Sentences of varied length from a fixed vocabulary"""
+    rng = np.random.default_rng(seed)
+    return [" ".join(rng.choice(WORDS, rng.integers(min_words, max_words + 1))) for _ in range(n)]
+
+
+def load_passages(n: int) -> List[str]:
+    """Chunks of our converted markdown when there is any, generated text otherwise"""
+    paragraphs = [
+        paragraph.strip()
+        for path in sorted(Path(settings.md_dir).glob("*.md"))
+        for paragraph in path.read_text(encoding="utf-8").split("\n\n")
+        if len(paragraph.split()) >= 8
+    ]
+    return paragraphs[:n] if len(paragraphs) >= n else make_texts(n, 20, 200, seed=0)
+
+
+def measure(embedder: ITextEmbedder, passages: List[str], queries: List[str]) -> Tuple[np.ndarray, np.ndarray, Dict]:
+    embedder.embed_array(passages[:8])  # warm up
+
+    started = time.perf_counter()
+    passage_vectors = embedder.embed_array(passages)
+    throughput = len(passages) / (time.perf_counter() - started)
+
+    latencies, query_vectors = [], []
+    for query in queries:
+        started = time.perf_counter()
+        query_vectors.append(embedder.embed_queries([query])[0])
+        latencies.append(time.perf_counter() - started)
+    latency = np.array(latencies) * 1000
+    timing = {
+        "texts/s": throughput,
+        "query p50 ms": np.percentile(latency, 50),
+        "query p99 ms": np.percentile(latency, 99),
+    }
+    return passage_vectors, np.array(query_vectors), timing
+
+
+def agreement(
+    reference: Tuple[np.ndarray, np.ndarray], candidate: Tuple[np.ndarray, np.ndarray], k: int
+) -> Dict[str, float]:
+    """Cosine similarity to the reference vectors and top-k passage overlap per query"""
+    cosines = np.concatenate([np.sum(reference[i] * candidate[i], axis=1) for i in range(2)])
+    top_reference = np.argsort(-reference[1] @ reference[0].T, axis=1)[:, :k]
+    top_candidate = np.argsort(-candidate[1] @ candidate[0].T, axis=1)[:, :k]
+    overlap = np.mean([len(set(a) & set(b)) / k for a, b in zip(top_reference, top_candidate)])
+    return {"mean cos": float(cosines.mean()), "min cos": float(cosines.min()), f"top{k} overlap": float(overlap)}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--passages", type=int, default=512)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--threads", type=int, default=settings.onnx_intra_op_threads, help="ONNX intra-op threads")
+    parser.add_argument("--model-dir", type=Path, default=settings.onnx_model_dir)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+
+    passages = load_passages(args.passages)
+    queries = make_texts(args.queries, 4, 16, seed=1)
+    print(f"{len(passages)} passages, {len(queries)} queries, {settings.embedding_model}")
+
+    backends: Dict[str, ITextEmbedder] = {"torch": BGETextEmbedder()}
+    backends["onnx fp32"] = ONNXTextEmbedder(args.model_dir, quantized=False, intra_op_threads=args.threads)
+    if (args.model_dir / QUANTIZED_MODEL_FILE).exists():
+        backends["onnx int8"] = ONNXTextEmbedder(args.model_dir, quantized=True, intra_op_threads=args.threads)
+
+    reference = None
+    print(
+        f"{'backend':<10} {'texts/s':>9} {'query p50':>10} {'query p99':>10} "
+        f"{'mean cos':>9} {'min cos':>9} {f'top{args.k} overlap':>13}"
+    )
+    for name, embedder in backends.items():
+        passage_vectors, query_vectors, timing = measure(embedder, passages, queries)
+        if reference is None:
+            reference = (passage_vectors, query_vectors)
+        scores = agreement(reference, (passage_vectors, query_vectors), args.k)
+        print(
+            f"{name:<10} {timing['texts/s']:9.1f} {timing['query p50 ms']:8.2f}ms {timing['query p99 ms']:8.2f}ms "
+            f"{scores['mean cos']:9.4f} {scores['min cos']:9.4f} {scores[f'top{args.k} overlap']:13.3f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""
+Import-time benchmark for docuflow entry points.
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter per module and
+reports the cumulative import time plus any heavy dependency that got loaded eagerly.
+
+    uv run python benchmarks/import_time.py
+    uv run python benchmarks/import_time.py --max-ms 800   # exit 1 on regression
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+MODULES = [
+    "docuflow.configs",
+    "docuflow.core.ingestion",
+    "docuflow.core.ingestion.ingestion_pipeline",
+    "docuflow.core.loaders",
+    "docuflow.services",
+    "docuflow.main",
+]
+
+# Must only be imported when the feature that needs them actually runs
+HEAVY = ["torch", "transformers", "FlagEmbedding", "chromadb", "easyocr", "pymupdf4llm", "langchain_text_splitters"]
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+
+
+def measure(module: str) -> Tuple[float, List[Tuple[float, str]], List[str]]:
+    """Return (cumulative ms, heaviest top-level imports, heavy deps loaded) for `module`"""
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join([str(SRC), os.environ.get("PYTHONPATH", "")])}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+
+    cumulative: Dict[str, float] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.split("|")
+        cumulative[name.strip()] = int(cumulative_us) / 1000
+
+    total = cumulative.get(module, 0.0)
+    top = sorted(((ms, name) for name, ms in cumulative.items() if name != module), reverse=True)[:5]
+    loaded = [name for name in HEAVY if name in cumulative]
+    return total, top, loaded
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-ms", type=float, default=None, help="fail if any module takes longer")
+    args = parser.parse_args()
+
+    failed = False
+    for module in MODULES:
+        total, top, loaded = measure(module)
+        flag = ""
+        if loaded or (args.max_ms is not None and total > args.max_ms):
+            failed = True
+            flag = "  <-- REGRESSION"
+        print(f"{module:<45} {total:8.1f} ms{flag}")
+        for ms, name in top:
+            print(f"    {ms:8.1f} ms  {name}")
+        if loaded:
+            print(f"    heavy dependencies imported eagerly: {', '.join(loaded)}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
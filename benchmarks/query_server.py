@@ -0,0 +1,104 @@
+"""
+Query server load test: client-side latency and throughput against a running server.
+
+Opens `--concurrency` keep-alive connections that each send queries back to back,
+then prints p50/p99 latency, queries per second and the server's own /stats
+(mean batch size shows how much micro-batching happened).
+
+    just serve                                   # in another shell
+    uv run python benchmarks/query_server.py --requests 2000 --concurrency 32
+    uv run python benchmarks/query_server.py --unix /tmp/docuflow.sock
+
+Restart the server with SERVER_MAX_BATCH_SIZE=1 to compare against unbatched serving.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+QUERIES = [
+    "What is retrieval augmented generation?",
+    "How are documents chunked before embedding?",
+    "Which vector store backends are supported?",
+    "How does the ingestion manifest detect changed files?",
+    "What happens to duplicate chunks?",
+    "How is the BM25 score computed?",
+    "Explain the reciprocal rank fusion of lexical and dense results",
+    "What is the embedding model?",
+]
+
+
+async def connect(args: argparse.Namespace) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    if args.unix:
+        return await asyncio.open_unix_connection(str(args.unix))
+    return await asyncio.open_connection(args.host, args.port)
+
+
+async def request(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter, method: str, path: str, payload: Optional[dict] = None
+) -> dict:
+    body = json.dumps(payload).encode() if payload is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: docuflow\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    length = 0
+    while True:
+        line = await reader.readline()
+        if not line.strip():
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    return json.loads(await reader.readexactly(length))
+
+
+async def client(args: argparse.Namespace, queries: List[str], latencies: List[float]) -> None:
+    reader, writer = await connect(args)
+    try:
+        for query in queries:
+            started = time.perf_counter()
+            await request(reader, writer, "POST", "/query", {"query": query, "top_k": args.k})
+            latencies.append(time.perf_counter() - started)
+    finally:
+        writer.close()
+
+
+async def run(args: argparse.Namespace) -> None:
+    queries = [f"{QUERIES[i % len(QUERIES)]} ({i})" for i in range(args.requests)]
+    latencies: List[float] = []
+    started = time.perf_counter()
+    await asyncio.gather(*(client(args, queries[i :: args.concurrency], latencies) for i in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    reader, writer = await connect(args)
+    stats = await request(reader, writer, "GET", "/stats")
+    writer.close()
+
+    latency = np.array(latencies) * 1000
+    print(f"{len(latencies)} queries, {args.concurrency} clients, {len(latencies) / elapsed:.0f} queries/s")
+    print(f"client   p50 {np.percentile(latency, 50):7.2f} ms   p99 {np.percentile(latency, 99):7.2f} ms")
+    print(f"server   p50 {stats['p50_ms']:7.2f} ms   p99 {stats['p99_ms']:7.2f} ms", end="   ")
+    print(f"mean batch {stats['mean_batch_size']:.1f}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", type=Path, help="Unix socket of the server (instead of host:port)")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""
+Vector search benchmark: recall and latency of quantized flat-index search vs exact search.
+
+Loads the embeddings of one of our collections (a Chroma collection or a flat index),
+or generates clustered unit vectors, builds a flat index per quantization mode in a
+temporary directory and runs the same queries against each. Recall@k is measured
+against exact float32 search; latency is per single query.
+
+Queries are stored vectors with a little noise added, so every query has close neighbours
+like a real question does.
+
+    uv run python benchmarks/vector_search.py
+    uv run python benchmarks/vector_search.py --chroma chroma --collection my_docuflow_collection
+    uv run python benchmarks/vector_search.py --flat chroma --collection my_docuflow_collection --k 10
+"""
+
+import argparse
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from docuflow.services import FlatVectorStore
+
+
+def generate_vectors(n: int, dim: int, seed: int = 0) -> np.ndarray:
+    """Unit vectors around a few hundred cluster centers, roughly like text embeddings"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(n // 500, 1), dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), n)] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def load_chroma(db_path: Path, collection_name: str, page: int = 5000) -> np.ndarray:
+    import chromadb
+
+    collection = chromadb.PersistentClient(path=db_path).get_collection(collection_name)
+    pages = []
+    for offset in range(0, collection.count(), page):
+        pages.append(np.asarray(collection.get(include=["embeddings"], limit=page, offset=offset)["embeddings"]))
+    return np.concatenate(pages).astype(np.float32)
+
+
+def load_flat(db_path: Path, collection_name: str) -> np.ndarray:
+    store = FlatVectorStore(db_path=db_path, collection_name=collection_name)
+    return np.asarray(store._vectors[store._live])
+
+
+def run(store: FlatVectorStore, queries: np.ndarray, k: int) -> tuple[List[List[str]], np.ndarray]:
+    ids, latencies = [], []
+    for query in queries:
+        started = time.perf_counter()
+        ids.append(store.query(query, n_results=k)["ids"][0])
+        latencies.append(time.perf_counter() - started)
+    return ids, np.array(latencies) * 1000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--chroma", type=Path, help="chroma db path to read the collection from")
+    source.add_argument("--flat", type=Path, help="flat index db path to read the collection from")
+    parser.add_argument("--collection", default="my_docuflow_collection")
+    parser.add_argument("--vectors", type=int, default=200_000, help="generated vectors (without --chroma/--flat)")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--oversample", type=int, nargs="+", default=[2, 4, 10])
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+
+    if args.chroma:
+        vectors = load_chroma(args.chroma, args.collection)
+    elif args.flat:
+        vectors = load_flat(args.flat, args.collection)
+    else:
+        vectors = generate_vectors(args.vectors, args.dim)
+
+    rng = np.random.default_rng(1)
+    sample = vectors[rng.choice(len(vectors), min(args.queries, len(vectors)), replace=False)]
+    queries = sample + 0.05 * rng.standard_normal(sample.shape).astype(np.float32)
+    ids = [str(i) for i in range(len(vectors))]
+    print(f"{len(vectors)} vectors x {vectors.shape[1]} dims, {len(queries)} queries, recall@{args.k}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        exact = FlatVectorStore(db_path=Path(directory), collection_name="none")
+        exact.add(ids, [""] * len(ids), [{}] * len(ids), vectors)
+        truth, latency = run(exact, queries, args.k)
+        print(f"{'mode':<8} {'oversample':>10} {'recall':>8} {'p50 ms':>8} {'p99 ms':>8} {'first pass MB':>14}")
+        print(
+            f"{'float32':<8} {'-':>10} {1.0:8.3f} {np.percentile(latency, 50):8.2f} "
+            f"{np.percentile(latency, 99):8.2f} {exact._vectors.nbytes / 1e6:14.1f}"
+        )
+
+        for quantization in ("int8", "binary"):
+            store = FlatVectorStore(db_path=Path(directory), collection_name=quantization, quantization=quantization)
+            store.add(ids, [""] * len(ids), [{}] * len(ids), vectors)
+            for oversample in args.oversample:
+                store.oversample = oversample
+                found, latency = run(store, queries, args.k)
+                recall = np.mean([len(set(a) & set(b)) / len(b) for a, b in zip(found, truth)])
+                print(
+                    f"{quantization:<8} {oversample:>10} {recall:8.3f} {np.percentile(latency, 50):8.2f} "
+                    f"{np.percentile(latency, 99):8.2f} {store._codes.nbytes / 1e6:14.1f}"
+                )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import List, Optional
 
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -21,6 +22,14 @@ class Settings(BaseSettings):
     # chroma db path
     db_path: Path = Field(default=Path("chroma"), description="Directory for chroma db vector storage")
 
+    # ingestion manifest (lives next to the chroma db)
+    manifest_file: str = Field(
+        default="ingestion_manifest.sqlite3", description="SQLite manifest of already ingested files"
+    )
+    purge_missing_sources: bool = Field(
+        default=False, description="Delete chunks of files that disappeared from pdf_dir since the last run"
+    )
+
     @property
     def log_path(self) -> Path:
         return self.log_dir / self.log_file
@@ -29,12 +38,162 @@ class Settings(BaseSettings):
     def output_path(self) -> Path:
         return self.md_dir / self.md_path
 
+    @property
+    def manifest_path(self) -> Path:
+        return self.db_path / self.manifest_file
+
+    @property
+    def embedding_cache_path(self) -> Path:
+        return self.db_path / self.embedding_cache_file
+
+    @property
+    def dedup_path(self) -> Path:
+        return self.db_path / self.dedup_file
+
+    @property
+    def lexical_index_path(self) -> Path:
+        return self.db_path / self.lexical_index_file
+
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")
 
     # Embedding model
     embedding_model: str = "BAAI/bge-small-en-v1.5"
-    chunk_size: int = 800
+    embedding_max_length: int = Field(default=512, description="Max tokens per text in one forward pass")
     use_fp16: bool = False
+    embedding_max_batch_tokens: Optional[int] = Field(
+        default=16384,
+        description="Padded-token budget per embedding batch; texts are bucketed by length. None = fixed batch_size",
+    )
+
+    # Embedding backend
+    embedding_backend: str = Field(
+        default="bge", description="'bge' (PyTorch FlagModel) or 'onnx' (ONNX Runtime on CPU)"
+    )
+    onnx_model_dir: Path = Field(
+        default=Path("models/bge-small-en-v1.5-onnx"), description="Exported ONNX model + tokenizer.json"
+    )
+    onnx_quantized: bool = Field(default=False, description="Load the int8 dynamically quantized ONNX model")
+    onnx_intra_op_threads: int = Field(
+        default=0, description="ONNX Runtime threads per forward pass (0 = one per physical core)"
+    )
+
+    # Chunking
+    chunk_size: int = Field(default=500, description="Max characters per chunk")
+    chunk_overlap: int = Field(default=100, description="Characters shared by consecutive chunks")
+    chunk_by_tokens: bool = Field(
+        default=False, description="Size chunks in embedding-model tokens instead of characters"
+    )
+    chunk_target_tokens: Optional[int] = Field(
+        default=None, description="Tokens per chunk when chunk_by_tokens; None = the model's max length"
+    )
+    chunk_overlap_tokens: int = Field(
+        default=64, description="Tokens shared by consecutive chunks when chunk_by_tokens"
+    )
+
+    # Vector store
+    vector_store_backend: str = Field(
+        default="chroma", description="'chroma' or 'flat' (in-process memory-mapped exact index)"
+    )
+    chroma_write_batch_size: int = Field(
+        default=0, description="Rows per Chroma upsert call (0 = the client's maximum batch size)"
+    )
+    chroma_write_workers: int = Field(default=2, description="Chroma upsert batches written concurrently")
+    chroma_write_retries: int = Field(default=3, description="Attempts per failed Chroma upsert batch")
+    chroma_retry_backoff: float = Field(
+        default=0.5, description="Seconds before the first retry of a failed batch, doubled on each further retry"
+    )
+    flat_query_block_rows: int = Field(default=65536, description="Vectors scored per block in flat index search")
+    flat_quantization: str = Field(
+        default="none", description="First-pass codes of the flat index: 'none', 'int8' or 'binary'"
+    )
+    flat_oversample: int = Field(
+        default=4, description="Candidates per result rescored in float32 when flat_quantization is set"
+    )
+    flat_compact_dead_ratio: float = Field(
+        default=0.25, description="Compact the flat index after a sync once this share of rows is deleted"
+    )
+
+    # Retrieval
+    query_cache_size: int = Field(default=1024, description="Query embeddings kept in the retriever's LRU cache")
+
+    # Lexical (BM25) index and hybrid retrieval
+    lexical_index_enabled: bool = Field(default=False, description="Keep a BM25 index of the stored chunks")
+    lexical_index_file: str = Field(default="lexical_index.sqlite3", description="SQLite BM25 index file name")
+    bm25_k1: float = Field(default=1.2, description="BM25 term frequency saturation")
+    bm25_b: float = Field(default=0.75, description="BM25 chunk length normalization")
+    bm25_max_df: float = Field(
+        default=0.5, description="Query terms in a larger share of chunks are skipped (unless no other term matches)"
+    )
+    bm25_max_postings: int = Field(
+        default=10_000, description="Postings read per query term, highest term frequency first (0 reads all)"
+    )
+    hybrid_candidates: int = Field(default=50, description="Candidates per side (dense, lexical) fused by RRF")
+    hybrid_rrf_k: int = Field(default=60, description="Reciprocal rank fusion constant")
+
+    # Chunk deduplication
+    dedup_enabled: bool = Field(default=False, description="Skip embedding exact and near duplicate chunks")
+    dedup_file: str = Field(default="dedup_index.sqlite3", description="SQLite index of canonical chunks")
+    dedup_threshold: float = Field(default=0.85, description="Estimated Jaccard similarity for a near duplicate")
+    dedup_num_perm: int = Field(default=128, description="MinHash permutations per chunk")
+    dedup_bands: int = Field(default=16, description="LSH bands (num_perm / bands rows each)")
+
+    # Embedding cache
+    embedding_cache_enabled: bool = Field(default=True, description="Reuse embeddings of previously seen texts")
+    embedding_cache_file: str = Field(default="embedding_cache.sqlite3", description="Embedding cache file name")
+    embedding_cache_max_mb: int = Field(default=1024, description="Size cap of the embedding cache (LRU eviction)")
+
+    # OCR
+    ocr_languages: List[str] = Field(default=["en"], description="EasyOCR language codes")
+    ocr_gpu: bool = Field(default=True, description="Let EasyOCR use CUDA when available")
+    ocr_pool_size: int = Field(default=2, description="Warm OCR readers kept for concurrent OCR")
+    ocr_decode_workers: int = Field(default=4, description="Threads decoding images for batch OCR")
+    ocr_batch_size: int = Field(default=16, description="Text regions sent through the recognizer per batch")
+
+    # Parallel ingestion
+    ingest_workers: int = Field(
+        default=1, description="Processes for pdf conversion + chunking; >1 enables pipelined ingestion"
+    )
+    ingest_embed_batch_size: int = Field(
+        default=256, description="Chunks gathered across documents before one embedding call"
+    )
+
+    # Large pdf conversion
+    pdf_parallel_page_threshold: int = Field(
+        default=500, description="PDFs with more pages are converted by page range in parallel; 0 disables"
+    )
+    pdf_pages_per_range: int = Field(default=50, description="Pages per range in parallel pdf conversion")
+    pdf_parallel_workers: Optional[int] = Field(
+        default=None, description="Processes for parallel pdf conversion (default: cpu count)"
+    )
+
+    # Async API
+    async_embed_workers: int = Field(default=1, description="Threads running embedding calls of the async API")
+    async_store_workers: int = Field(
+        default=8, description="Threads running vector store / index calls of the async API"
+    )
+    async_convert_workers: int = Field(default=2, description="Processes converting documents in aingest")
+    async_max_pending: int = Field(
+        default=256, description="Async calls admitted per stage at once; further callers wait (backpressure)"
+    )
+
+    # Query server
+    server_host: str = Field(default="127.0.0.1", description="Host the query server listens on")
+    server_port: int = Field(default=8765, description="TCP port of the query server")
+    server_unix_socket: Optional[Path] = Field(
+        default=None, description="Serve on this Unix socket instead of host:port"
+    )
+    server_max_wait_ms: float = Field(
+        default=5.0, description="Longest a query waits for others to share its embedding batch"
+    )
+    server_max_batch_size: int = Field(default=32, description="Queries embedded and searched together at most")
+    server_max_body_bytes: int = Field(default=65536, description="Larger request bodies are rejected (413)")
+    server_latency_window: int = Field(default=10000, description="Recent requests the p50/p99 latency is taken over")
+    server_stats_interval: float = Field(default=60.0, description="Seconds between latency log lines (0 disables)")
+
+    # Streaming ingestion
+    pdf_stream_pages: int = Field(
+        default=0, description="Pages converted + chunked per window when streaming a pdf; 0 converts it whole"
+    )
 
 
 # INSTANTIATION
@@ -1,22 +1,48 @@
-from docuflow.core.ingestion.chunking import get_sections
-from docuflow.core.ingestion.conversion import (
-    CONVERTERS,
-    convert_docx_to_md,
-    convert_pdf_to_md,
-    extract_text_content,
-    get_converter,
-    save_markdown,
-    convert_image_content,
-)
+from typing import TYPE_CHECKING
+
+from docuflow.utils.lazy import lazy_exports
+
+if TYPE_CHECKING:
+    from docuflow.core.ingestion.chunking import MarkdownChunker, get_sections, iter_sections
+    from docuflow.core.ingestion.conversion import (
+        CONVERTERS,
+        convert_docx_to_md,
+        convert_image_content,
+        convert_pdf_to_md,
+        extract_text_content,
+        get_converter,
+        iter_pdf_pages,
+        save_markdown,
+    )
+
+# Converters and chunkers are resolved on first use, their dependencies
+# (pymupdf, easyocr, text splitters) are imported only when a converter runs
+_EXPORTS = {
+    "MarkdownChunker": ".chunking",
+    "get_sections": ".chunking",
+    "iter_sections": ".chunking",
+    "CONVERTERS": ".conversion",
+    "convert_docx_to_md": ".conversion",
+    "convert_image_content": ".conversion",
+    "convert_pdf_to_md": ".conversion",
+    "extract_text_content": ".conversion",
+    "get_converter": ".conversion",
+    "iter_pdf_pages": ".conversion",
+    "save_markdown": ".conversion",
+}
+
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
 
 __all__ = [
+    "MarkdownChunker",
     "get_sections",
+    "iter_sections",
     "convert_pdf_to_md",
-    "save_pdf",
+    "iter_pdf_pages",
     "save_markdown",
     "convert_docx_to_md",
     "extract_text_content",
-    "convert_image_content"
+    "convert_image_content",
     "get_converter",
     "CONVERTERS",
 ]
@@ -0,0 +1,37 @@
+import hashlib
+import json
+from collections import Counter
+from typing import List, Sequence
+
+from docuflow.schemas.document import Document as DocuFlowDocument
+
+
+def content_digest(document: DocuFlowDocument) -> str:
+    """Hash of a chunk's text together with its metadata (headers, source)"""
+    payload = document.page_content + "\x1f" + json.dumps(document.metadata, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+class ChunkIdAssigner:
+    """
+    Deterministic chunk IDs: source identity + chunk content hash.
+    The same chunk keeps its ID across runs, so re-ingests only touch what changed.
+    A chunk repeated inside one source gets an occurrence suffix to stay unique.
+    """
+
+    def __init__(self, source: str):
+        self.source_digest = hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+        self._seen: Counter[str] = Counter()
+
+    def assign(self, documents: Sequence[DocuFlowDocument]) -> List[str]:
+        ids = []
+        for document in documents:
+            digest = content_digest(document)
+            occurrence = self._seen[digest]
+            self._seen[digest] += 1
+
+            chunk_id = f"{self.source_digest}-{digest}"
+            if occurrence:
+                chunk_id = f"{chunk_id}-{occurrence}"
+            ids.append(chunk_id)
+        return ids
@@ -1,41 +1,342 @@
 import logging
 import re
-from typing import List
-
-from langchain_text_splitters import (
-    MarkdownHeaderTextSplitter,
-    RecursiveCharacterTextSplitter,
-)
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
+from docuflow.configs import settings
+from docuflow.core.providers.tokenizer_provider import TokenCounter
 from docuflow.schemas.document import Document as DocuFlowDocument
 
 logger = logging.getLogger(__name__)
 
+HEADERS_TO_SPLIT_ON = [
+    ("#", "Header 1"),
+    ("##", "Header 2"),
+    ("###", "Header 3"),
+]
+
+SEPARATORS = ["\n\n", "\n", ". ", " ", ""]
+
+# pymupdf4llm renders many section titles as a bold line instead of a header
+BOLD_HEADER_PATTERN = re.compile(r"^\*\*(.*?)\*\*", flags=re.MULTILINE)
+
+# Section blocks with the same headers are joined like MarkdownHeaderTextSplitter does
+_BLOCK_JOINER = "  \n"
+
+Span = Tuple[int, int]
+# Batched length of texts, e.g. token counts; None measures characters
+LengthFunction = Callable[[Sequence[str]], List[int]]
+
+
+@dataclass
+class _Section:
+    """Text under one header context, with a map from its offsets back to the source"""
+
+    metadata: Dict[str, str]
+    parts: List[str] = field(default_factory=list)
+    length: int = 0
+    # per line: offset in section text, and (offset, length) in the source
+    line_starts: List[int] = field(default_factory=list)
+    line_sources: List[Tuple[int, int]] = field(default_factory=list)
+
+    def add_line(self, text: str, source_start: int, source_length: int, joiner: str) -> None:
+        if self.parts:
+            self.parts.append(joiner)
+            self.length += len(joiner)
+        self.line_starts.append(self.length)
+        self.line_sources.append((source_start, source_length))
+        self.parts.append(text)
+        self.length += len(text)
+
+    def to_source(self, offset: int) -> int:
+        i = max(bisect_right(self.line_starts, offset) - 1, 0)
+        source_start, source_length = self.line_sources[i]
+        return source_start + min(offset - self.line_starts[i], source_length)
+
+
+class MarkdownChunker:
+    """
+    Single-pass markdown chunker.
+    Produces the same chunks and header metadata as MarkdownHeaderTextSplitter followed by
+    RecursiveCharacterTextSplitter (see get_sections_langchain), but splits on offsets
+    instead of intermediate strings and records where each chunk sits in the source.
+    Header and code-fence state carry over between split() calls, so a document can be
+    fed window by window.
+
+    With a `length_function` (e.g. TokenCounter) sizes are measured in its units, one
+    batched call per split level, and chunks are checked against chunk_size at the end.
+    """
+
+    def __init__(
+        self,
+        chunk_size: Optional[int] = None,
+        chunk_overlap: Optional[int] = None,
+        separators: Sequence[str] = SEPARATORS,
+        length_function: Optional[LengthFunction] = None,
+    ):
+        chunk_size = chunk_size if chunk_size is not None else settings.chunk_size
+        chunk_overlap = chunk_overlap if chunk_overlap is not None else settings.chunk_overlap
+        if chunk_size <= 0:
+            raise ValueError(f"chunk_size must be > 0, got {chunk_size}")
+        if not 0 <= chunk_overlap <= chunk_size:
+            raise ValueError(f"chunk_overlap must be between 0 and chunk_size, got {chunk_overlap}")
+
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.separators = list(separators)
+        self.length_function = length_function
+        # longest separator first, so "###" is not read as "#"
+        self._headers = sorted(HEADERS_TO_SPLIT_ON, key=lambda header: len(header[0]), reverse=True)
+        self._levels = {name: sep.count("#") for sep, name in HEADERS_TO_SPLIT_ON}
+        self.context: Dict[str, str] = {}  # headers open at the current position
+        self._fence = ""  # opening fence of the code block we are in, if any
+
+    def split(self, markdown_text: str, offset: int = 0) -> List[DocuFlowDocument]:
+        """Chunk `markdown_text`; `offset` is its position in the whole source"""
+        documents = []
+        for section in self._sections(markdown_text):
+            text = "".join(section.parts)
+            spans = self._split(text, 0, len(text), self.separators)
+            if self.length_function is not None:
+                spans = self._enforce_limit(text, spans)
+            for start, end in spans:
+                documents.append(
+                    DocuFlowDocument(
+                        page_content=text[start:end],
+                        metadata=dict(section.metadata),
+                        start_index=offset + section.to_source(start),
+                        end_index=offset + section.to_source(end),
+                    )
+                )
+        return documents
+
+    # ===== HEADER SECTIONS =====
+
+    def _sections(self, markdown_text: str) -> List[_Section]:
+        sections: List[_Section] = []
+        block: List[Tuple[str, int, int]] = []  # (line, source start, source length)
+
+        def flush() -> None:
+            metadata = dict(self.context)
+            if sections and sections[-1].metadata == metadata:
+                section = sections[-1]
+                joiner = _BLOCK_JOINER
+            else:
+                section = _Section(metadata)
+                sections.append(section)
+                joiner = ""
+            for text, source_start, source_length in block:
+                section.add_line(text, source_start, source_length, joiner)
+                joiner = "\n"
+            block.clear()
+
+        position = 0
+        for line in markdown_text.split("\n"):
+            line_start = position
+            position += len(line) + 1
+
+            bold = BOLD_HEADER_PATTERN.match(line)
+            if bold:
+                line = f"## {bold.group(1)}{line[bold.end() :]}"
+                source_start, source_length = line_start, position - 1 - line_start
+            else:
+                source_start = line_start + len(line) - len(line.lstrip())
+                source_length = len(line.strip())
+
+            stripped = line.strip()
+            if not stripped.isprintable():
+                stripped = "".join(filter(str.isprintable, stripped))
+
+            if not self._fence:
+                if stripped.startswith("```") and stripped.count("```") == 1:
+                    self._fence = "```"
+                elif stripped.startswith("~~~"):
+                    self._fence = "~~~"
+            elif stripped.startswith(self._fence):
+                self._fence = ""
+            if self._fence:
+                block.append((stripped, source_start, source_length))
+                continue
+
+            header = self._match_header(stripped)
+            if header is not None:
+                if block:
+                    flush()
+                name, title = header
+                # A header closes every header at its level or deeper
+                for open_name in [n for n in self.context if self._levels[n] >= self._levels[name]]:
+                    del self.context[open_name]
+                self.context[name] = title
+            elif stripped:
+                block.append((stripped, source_start, source_length))
+            elif block:
+                flush()
+
+        if block:
+            flush()
+        return sections
+
+    def _match_header(self, stripped: str) -> Optional[Tuple[str, str]]:
+        for sep, name in self._headers:
+            if stripped.startswith(sep) and (len(stripped) == len(sep) or stripped[len(sep)] == " "):
+                return name, stripped[len(sep) :].strip()
+        return None
+
+    # ===== SIZE SPLITTING =====
+
+    def _split(self, text: str, lo: int, hi: int, separators: List[str]) -> List[Span]:
+        """Recursive separator splitting of text[lo:hi] into chunk spans"""
+        separator = separators[-1]
+        finer: List[str] = []
+        for i, candidate in enumerate(separators):
+            if not candidate:
+                separator = candidate
+                break
+            if text.find(candidate, lo, hi) != -1:
+                separator = candidate
+                finer = separators[i + 1 :]
+                break
+
+        pieces = self._pieces(text, lo, hi, separator)
+        lengths = self._measure(text, pieces)
+
+        chunks: List[Span] = []
+        fitting: List[Span] = []
+        fitting_lengths: List[int] = []
+        for piece, length in zip(pieces, lengths):
+            if length < self.chunk_size:
+                fitting.append(piece)
+                fitting_lengths.append(length)
+                continue
+
+            if fitting:
+                chunks.extend(self._merge(text, fitting, fitting_lengths))
+                fitting = []
+                fitting_lengths = []
+            if finer:
+                chunks.extend(self._split(text, piece[0], piece[1], finer))
+            else:
+                chunks.append(piece)
+        if fitting:
+            chunks.extend(self._merge(text, fitting, fitting_lengths))
+        return chunks
+
+    def _measure(self, text: str, spans: List[Span]) -> List[int]:
+        if self.length_function is None:
+            return [end - start for start, end in spans]
+        return self.length_function([text[start:end] for start, end in spans])
+
+    @staticmethod
+    def _pieces(text: str, lo: int, hi: int, separator: str) -> List[Span]:
+        """text[lo:hi] cut in front of every separator (the separator starts the next piece)"""
+        if not separator:
+            return [(i, i + 1) for i in range(lo, hi)]
+
+        pieces = []
+        start = lo
+        found = text.find(separator, lo, hi)
+        while found != -1:
+            if found > start:
+                pieces.append((start, found))
+            start = found
+            found = text.find(separator, found + len(separator), hi)
+        if hi > start:
+            pieces.append((start, hi))
+        return pieces
+
+    def _merge(self, text: str, pieces: List[Span], lengths: List[int]) -> List[Span]:
+        """Greedily pack adjacent pieces up to chunk_size, keeping chunk_overlap between chunks"""
+        chunks = []
+        first = 0  # current chunk is pieces[first:i]
+        total = 0
+        for i, length in enumerate(lengths):
+            if total + length > self.chunk_size:
+                if total > self.chunk_size:
+                    logger.warning(f"Created a chunk of size {total}, longer than the specified {self.chunk_size}")
+                if first < i:
+                    chunks.append(_strip(text, pieces[first][0], pieces[i - 1][1]))
+                    while total > self.chunk_overlap or (total + length > self.chunk_size and total > 0):
+                        total -= lengths[first]
+                        first += 1
+            total += length
+        chunks.append(_strip(text, pieces[first][0], pieces[-1][1]))
+        return [chunk for chunk in chunks if chunk[0] < chunk[1]]
+
+    def _enforce_limit(self, text: str, spans: List[Span]) -> List[Span]:
+        """
+        Token counts of pieces do not add up exactly to the count of the joined text,
+        so re-cut (at a space, near the middle) the rare chunk that ends up over chunk_size.
+        Nothing is then truncated by the model.
+        """
+        result: List[Span] = []
+        for (start, end), length in zip(spans, self._measure(text, spans)):
+            if length <= self.chunk_size or end - start < 2:
+                result.append((start, end))
+                continue
+
+            middle = (start + end) // 2
+            cut = text.rfind(" ", start + 1, middle + 1)
+            if cut == -1:
+                cut = middle
+            halves = [_strip(text, start, cut), _strip(text, cut, end)]
+            result.extend(self._enforce_limit(text, [half for half in halves if half[0] < half[1]]))
+        return result
+
+
+def _strip(text: str, start: int, end: int) -> Span:
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def make_chunker() -> MarkdownChunker:
+    """Chunker sized from settings: in characters, or in embedding-model tokens"""
+    if not settings.chunk_by_tokens:
+        return MarkdownChunker(settings.chunk_size, settings.chunk_overlap)
+
+    counter = TokenCounter()
+    # Never above what one forward pass takes, so no chunk is truncated
+    target = min(settings.chunk_target_tokens or counter.max_tokens, counter.max_tokens)
+    return MarkdownChunker(target, min(settings.chunk_overlap_tokens, target), length_function=counter)
+
 
 def get_sections(markdown_text: str) -> List[DocuFlowDocument]:
     """
     Splits markdown text into semantic sections based on headers.
     If sections are too large, recursively splits them further.
     """
+    documents = make_chunker().split(markdown_text)
+    logger.info(f"Split into {len(documents)} chunks")
+    return documents
+
+
+def get_sections_langchain(markdown_text: str) -> List[DocuFlowDocument]:
+    """
+    Reference implementation of get_sections on the LangChain splitters.
+    Kept for equivalence tests and benchmarks/chunking.py.
+    """
+    from langchain_text_splitters import (
+        MarkdownHeaderTextSplitter,
+        RecursiveCharacterTextSplitter,
+    )
+
     # 1. First pass: Split by Markdown Headers (Semantic)
-    headers_to_split_on = [
-        ("#", "Header 1"),
-        ("##", "Header 2"),
-        ("###", "Header 3"),
-    ]
 
     # MD splits
 
-    markdown_text = re.sub(r"^\*\*(.*?)\*\*", r"## \1", markdown_text, flags=re.MULTILINE)
+    markdown_text = BOLD_HEADER_PATTERN.sub(r"## \1", markdown_text)
 
-    header_splitter = MarkdownHeaderTextSplitter(headers_to_split_on=headers_to_split_on)
+    header_splitter = MarkdownHeaderTextSplitter(headers_to_split_on=HEADERS_TO_SPLIT_ON)
 
     header_splits = header_splitter.split_text(markdown_text)
 
     # 2. Second pass: Split large chunks recursively (Size limit)
 
     text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=500, chunk_overlap=100, separators=["\n\n", "\n", ". ", " ", ""]
+        chunk_size=settings.chunk_size, chunk_overlap=settings.chunk_overlap, separators=SEPARATORS
     )
 
     # Split
@@ -49,3 +350,16 @@ def get_sections(markdown_text: str) -> List[DocuFlowDocument]:
         for doc in final_splits
     ]
     return converted_docs
+
+
+def iter_sections(markdown_windows: Iterable[str]) -> Iterator[List[DocuFlowDocument]]:
+    """
+    Streaming get_sections: chunks markdown one window (e.g. a few pdf pages) at a time.
+    One chunker runs across all windows, so headers still open at the end of a window
+    carry over and chunks keep their Header 1/2/3 metadata across page boundaries.
+    """
+    chunker = make_chunker()
+    offset = 0
+    for window in markdown_windows:
+        yield chunker.split(window, offset=offset)
+        offset += len(window)
@@ -1,10 +1,14 @@
+import multiprocessing
+import os
 import subprocess
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
+from typing import Any, Iterator, List, Optional, Set
 
-import easyocr
-import pymupdf.layout  # noqa: F401
-import pymupdf4llm
-
+from docuflow.configs import settings
+from docuflow.core.providers.ocr_provider import get_ocr_reader
 from docuflow.utils import get_logger
 
 logger = get_logger(__name__)
@@ -34,7 +38,21 @@ def convert_pdf_to_md(pdf_file: Path) -> str:
     Returns:
         str: The document content in Markdown format.
     """
+    # imported here so that non-pdf runs never load the pdf stack
+    import pymupdf
+    import pymupdf.layout  # noqa: F401
+    import pymupdf4llm
+
     try:
+        threshold = settings.pdf_parallel_page_threshold
+        if threshold > 0:
+            with pymupdf.open(pdf_file) as doc:
+                page_count = doc.page_count
+            if page_count > threshold:
+                if _document_layout() is not None:
+                    return _convert_pdf_parallel(pdf_file, page_count)
+                logger.warning(f"pymupdf4llm has no layout helpers, converting {pdf_file} serially")
+
         md_text = pymupdf4llm.to_markdown(pdf_file, use_ocr=False)
         logger.info(f"Length of text for {pdf_file}: {len(md_text)}")
         return str(md_text)
@@ -43,6 +61,131 @@ def convert_pdf_to_md(pdf_file: Path) -> str:
         raise
 
 
+def _document_layout() -> Optional[Any]:
+    """
+    pymupdf4llm's layout helpers, used for parallel and streamed conversion. They are not
+    public API: None when the installed version lacks them, callers then use to_markdown.
+    """
+    try:
+        from pymupdf4llm.helpers import document_layout
+    except ImportError:
+        return None
+    if not all(hasattr(document_layout, name) for name in ("parse_document", "update_header_tags")):
+        return None
+    return document_layout
+
+
+def _parse_page_range(pdf_file: Path, pages: List[int]) -> Any:
+    """Layout analysis of one page range (runs in a worker process)"""
+    import pymupdf.layout  # noqa: F401
+    from pymupdf4llm.helpers import document_layout
+
+    return document_layout.parse_document(str(pdf_file), pages=pages, use_ocr=False, force_text=True)
+
+
+def _convert_pdf_parallel(pdf_file: Path, page_count: int) -> str:
+    """
+    Convert a large PDF by page ranges in a process pool and stitch the result in page order.
+    Header levels are ranked by font size over the whole document rather than per range,
+    so a section header keeps the same "#" depth as in a single-pass conversion.
+    """
+    from pymupdf4llm.helpers import document_layout
+
+    ranges = _page_ranges(page_count, settings.pdf_pages_per_range)
+    workers = min(settings.pdf_parallel_workers or os.cpu_count() or 1, len(ranges))
+    logger.info(f"Converting {pdf_file}: {page_count} pages in {len(ranges)} ranges on {workers} processes")
+
+    # spawn: the parent may already hold torch/chroma threads, which fork does not survive
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        parsed = list(pool.map(_parse_page_range, repeat(pdf_file), ranges))
+
+    document = parsed[0]
+    document.pages = [page for part in parsed for page in part.pages]
+    document_layout.update_header_tags(document.pages, _header_fontsizes(document.pages))
+
+    md_text = str(document.to_markdown())
+    logger.info(f"Length of text for {pdf_file}: {len(md_text)}")
+    return md_text
+
+
+def _page_ranges(page_count: int, per_range: int) -> List[List[int]]:
+    return [list(range(start, min(start + per_range, page_count))) for start in range(0, page_count, per_range)]
+
+
+def _header_fontsizes(pages: List[Any]) -> Set[int]:
+    return {box.max_fontsize for page in pages for box in page.boxes if box.boxclass in ("title", "section-header")}
+
+
+def iter_pdf_pages(pdf_file: Path, pages_per_window: int) -> Iterator[str]:
+    """
+    Convert the PDF at pdf_file path to Markdown `pages_per_window` pages at a time.
+    Each window is layout-analysed and yielded as soon as it is parsed, so embedding can
+    start while later pages are still converting; only one window is held at once.
+    Header levels are ranked over the whole document from a cheap font-size pre-scan
+    (see _prescan_header_fontsizes), so they do not depend on the window a header falls in.
+    """
+    import pymupdf
+
+    with pymupdf.open(pdf_file) as doc:
+        page_count = doc.page_count
+        document_layout = _document_layout()
+        header_fontsizes = _prescan_header_fontsizes(doc) if document_layout is not None else set()
+    windows = _page_ranges(page_count, pages_per_window)
+    logger.info(f"Streaming {pdf_file}: {page_count} pages, {pages_per_window} per window")
+
+    if document_layout is None:
+        logger.warning("pymupdf4llm has no layout helpers, header levels are ranked per window")
+        yield from _iter_pdf_windows(pdf_file, windows)
+        return
+
+    for pages in windows:
+        try:
+            parsed = _parse_page_range(pdf_file, pages)
+        except Exception as e:
+            logger.exception(f"Failed to convert pages {pages[0]}-{pages[-1]} of {pdf_file}: {e}")
+            raise
+        # headers the pre-scan took for body text rank below all others, earlier windows keep their levels
+        header_fontsizes.update(_header_fontsizes(parsed.pages))
+        document_layout.update_header_tags(parsed.pages, header_fontsizes)
+        yield str(parsed.to_markdown())
+
+
+def _prescan_header_fontsizes(doc: Any) -> Set[int]:
+    """
+    Candidate header font sizes of the whole document without layout analysis: every
+    (rounded, as pymupdf4llm does) span size larger than the body text size, which is
+    the size carrying the most characters. Text extraction only, a small fraction of
+    the cost of the layout pass.
+    """
+    import pymupdf
+
+    characters: Counter = Counter()
+    for page in doc:
+        for block in page.get_text("dict", flags=pymupdf.TEXTFLAGS_TEXT)["blocks"]:
+            for line in block.get("lines", ()):
+                for span in line["spans"]:
+                    characters[round(span["size"])] += len(span["text"].strip())
+    if not characters:
+        return set()
+    body_size = characters.most_common(1)[0][0]
+    return {size for size in characters if size > body_size}
+
+
+def _iter_pdf_windows(pdf_file: Path, windows: List[List[int]]) -> Iterator[str]:
+    """Plain per-window to_markdown, for pymupdf4llm versions without the layout helpers"""
+    import pymupdf
+    import pymupdf4llm
+
+    with pymupdf.open(pdf_file) as doc:
+        for pages in windows:
+            try:
+                md_text = pymupdf4llm.to_markdown(doc, pages=pages, use_ocr=False)
+            except Exception as e:
+                logger.exception(f"Failed to convert pages {pages[0]}-{pages[-1]} of {pdf_file}: {e}")
+                raise
+            yield str(md_text)
+
+
 def convert_docx_to_md(docx_file: Path) -> str:
     """Simple Pandoc conversion"""
     try:
@@ -69,10 +212,11 @@ def extract_text_content(file_path: Path) -> str:
 # ===== IMAGE CONVERTER =====
 
 
-def convert_image_content(file_path: Path) -> str:
+def convert_image_content(file_path: Path, reader: Optional[Any] = None) -> str:
     """Extract text from .png , .jpg , .jpeg , .svg , .webp files"""
     try:
-        reader = easyocr.Reader(["en"])
+        # Shared, already loaded reader unless the caller brings its own
+        reader = reader or get_ocr_reader()
         logger.info(f"Extracting text from: {file_path}")
 
         # Extract text
@@ -0,0 +1,332 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Collection, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from docuflow.configs import settings
+from docuflow.schemas.document import Document as DocuFlowDocument
+from docuflow.utils import get_logger
+
+logger = get_logger(__name__)
+
+# Kinds of duplicate reported by ChunkDeduplicator.assign
+EXACT = "exact"
+NEAR = "near"
+
+_SHINGLE_SIZE = 3  # words per shingle
+_PRIME = 4294967311  # smallest prime above 2**32, keeps (a * x + b) inside uint64
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+def exact_hash(text: str) -> str:
+    """Hash of the text with case and whitespace normalized"""
+    normalized = " ".join(text.lower().split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:32]
+
+
+class MinHasher:
+    """MinHash signatures over word shingles, deterministic across runs and processes"""
+
+    def __init__(self, num_perm: int, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, 1 << 32, size=num_perm, dtype=np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        words = _WORD_PATTERN.findall(text.lower())
+        shingles = {" ".join(words[i : i + _SHINGLE_SIZE]) for i in range(max(len(words) - _SHINGLE_SIZE + 1, 1))}
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+        # one row per permutation, min over shingles
+        permuted = (np.outer(self.a, hashes) + self.b[:, None]) % _PRIME
+        return permuted.min(axis=1)
+
+
+@dataclass
+class DedupMatch:
+    """A chunk that is a duplicate of an already stored (canonical) chunk"""
+
+    canonical_id: str
+    kind: str  # EXACT or NEAR
+    similarity: float
+
+
+class ChunkDeduplicator:
+    """
+    Persistent index of canonical (embedded and stored) chunks for duplicate detection.
+    Exact duplicates are found by normalized text hash, near duplicates by MinHash with
+    an LSH band index (candidates are confirmed by estimated Jaccard similarity).
+    Duplicates are not embedded: the pipeline stores them under their own id, text and
+    source with a `duplicate_of` pointer and the canonical chunk's vector, and records
+    them here so they go (and their source is re-ingested) when the canonical chunk goes.
+
+    New canonical chunks are only reserved (in memory) until their write to the vector
+    store succeeds: commit() then persists them, release() drops them if the write failed.
+    Reserved chunks are matched like stored ones, so repeats across files in flight together
+    are caught too.
+    """
+
+    def __init__(
+        self,
+        db_file: Path,
+        threshold: Optional[float] = None,
+        num_perm: Optional[int] = None,
+        bands: Optional[int] = None,
+    ):
+        self.threshold = threshold if threshold is not None else settings.dedup_threshold
+        self.num_perm = num_perm or settings.dedup_num_perm
+        self.bands = bands or settings.dedup_bands
+        if self.num_perm % self.bands:
+            raise ValueError(f"num_perm ({self.num_perm}) must be a multiple of bands ({self.bands})")
+        self.rows = self.num_perm // self.bands
+        self.hasher = MinHasher(self.num_perm)
+
+        self.db_file = Path(db_file)
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # chunk id -> (source, text hash, signature) of canonicals not written yet
+        self._reserved: Dict[str, Tuple[str, str, np.ndarray]] = {}
+        self._reserved_hashes: Dict[str, Set[str]] = {}
+        self._reserved_buckets: Dict[Tuple[int, int], Set[str]] = {}
+        self._conn = sqlite3.connect(self.db_file, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS canonical (
+                chunk_id TEXT PRIMARY KEY,
+                source TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                signature BLOB NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS canonical_text_hash ON canonical (text_hash);
+            CREATE TABLE IF NOT EXISTS lsh (
+                band INTEGER NOT NULL,
+                bucket INTEGER NOT NULL,
+                chunk_id TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS lsh_bucket ON lsh (band, bucket);
+            CREATE INDEX IF NOT EXISTS lsh_chunk ON lsh (chunk_id);
+            CREATE TABLE IF NOT EXISTS duplicates (
+                chunk_id TEXT NOT NULL,
+                source TEXT NOT NULL,
+                canonical_id TEXT NOT NULL,
+                metadata TEXT NOT NULL,
+                PRIMARY KEY (source, chunk_id)
+            );
+            CREATE INDEX IF NOT EXISTS duplicates_canonical ON duplicates (canonical_id);
+            CREATE INDEX IF NOT EXISTS duplicates_chunk ON duplicates (chunk_id);
+            """
+        )
+        self._conn.commit()
+
+    def assign(
+        self,
+        source: str,
+        ids: Sequence[str],
+        documents: Sequence[DocuFlowDocument],
+        exclude: Collection[str] = (),
+    ) -> Dict[int, DedupMatch]:
+        """
+        Check chunks against the index, positions -> match for the duplicates.
+        Chunks that are not duplicates are reserved as canonical right away, so repeats
+        later in the same batch (or in other files in flight) are caught too; commit() or
+        release() them once their write is done. `exclude` are canonical ids about to be
+        deleted, which must not be matched.
+        """
+        matches: Dict[int, DedupMatch] = {}
+        with self._lock:
+            for position, (chunk_id, document) in enumerate(zip(ids, documents)):
+                text_hash = exact_hash(document.page_content)
+                signature = self.hasher.signature(document.page_content)
+
+                match = self._find(chunk_id, text_hash, signature, exclude)
+                if match is not None:
+                    matches[position] = match
+                else:
+                    self._reserve(chunk_id, source, text_hash, signature)
+        return matches
+
+    def commit(self, chunk_ids: Iterable[str]) -> None:
+        """Persist reserved canonicals whose chunks are now stored"""
+        with self._lock:
+            for chunk_id in chunk_ids:
+                reserved = self._unreserve(chunk_id)
+                if reserved is not None:
+                    self._add_canonical(chunk_id, *reserved)
+            self._conn.commit()
+
+    def release(self, chunk_ids: Iterable[str]) -> Set[str]:
+        """
+        Drop reserved canonicals whose write failed.
+        Returns the sources that already recorded duplicates onto them (to re-ingest).
+        """
+        with self._lock:
+            released = [chunk_id for chunk_id in chunk_ids if self._unreserve(chunk_id) is not None]
+            return self._sources_pointing_at(released)
+
+    def record_duplicates(self, source: str, duplicates: Dict[str, Tuple[str, dict]]) -> None:
+        """Add or replace duplicate records of `source` (chunk id -> (canonical id, metadata))"""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO duplicates (chunk_id, source, canonical_id, metadata) VALUES (?, ?, ?, ?)",
+                [
+                    (chunk_id, source, canonical_id, json.dumps({**metadata, "duplicate_of": canonical_id}))
+                    for chunk_id, (canonical_id, metadata) in duplicates.items()
+                ],
+            )
+            self._conn.commit()
+
+    def duplicates_of(self, canonical_id: str) -> List[Tuple[str, dict]]:
+        """(chunk id, metadata) of every chunk deduplicated onto `canonical_id`"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chunk_id, metadata FROM duplicates WHERE canonical_id = ?", (canonical_id,)
+            ).fetchall()
+        return [(chunk_id, json.loads(metadata)) for chunk_id, metadata in rows]
+
+    def duplicate_ids_of(self, canonical_ids: Sequence[str]) -> List[str]:
+        """Ids of the chunks deduplicated onto any of `canonical_ids`"""
+        duplicate_ids: List[str] = []
+        with self._lock:
+            for start in range(0, len(canonical_ids), 500):
+                batch = list(canonical_ids[start : start + 500])
+                marks = ",".join("?" * len(batch))
+                duplicate_ids.extend(
+                    row[0]
+                    for row in self._conn.execute(
+                        f"SELECT chunk_id FROM duplicates WHERE canonical_id IN ({marks}) ORDER BY chunk_id", batch
+                    )
+                )
+        return duplicate_ids
+
+    def remove(self, chunk_ids: Sequence[str]) -> Set[str]:
+        """
+        Forget chunks deleted from the vector store, canonical or duplicate.
+        Returns the sources whose duplicates pointed at them - they must be
+        re-ingested so one of their chunks becomes canonical again.
+        """
+        if not chunk_ids:
+            return set()
+
+        with self._lock:
+            for chunk_id in chunk_ids:
+                self._unreserve(chunk_id)
+            orphaned = self._sources_pointing_at(chunk_ids)
+            for start in range(0, len(chunk_ids), 500):
+                batch = list(chunk_ids[start : start + 500])
+                marks = ",".join("?" * len(batch))
+                self._conn.execute(
+                    f"DELETE FROM duplicates WHERE canonical_id IN ({marks}) OR chunk_id IN ({marks})", batch * 2
+                )
+                self._conn.execute(f"DELETE FROM canonical WHERE chunk_id IN ({marks})", batch)
+                self._conn.execute(f"DELETE FROM lsh WHERE chunk_id IN ({marks})", batch)
+            self._conn.commit()
+        if orphaned:
+            logger.info(f"{len(orphaned)} sources lost the canonical chunk of a duplicate")
+        return orphaned
+
+    def remove_source(self, source: str) -> None:
+        """Drop the duplicate records of a source that is gone"""
+        with self._lock:
+            self._conn.execute("DELETE FROM duplicates WHERE source = ?", (source,))
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _find(
+        self, chunk_id: str, text_hash: str, signature: np.ndarray, exclude: Collection[str]
+    ) -> Optional[DedupMatch]:
+        stored = [
+            row[0] for row in self._conn.execute("SELECT chunk_id FROM canonical WHERE text_hash = ?", (text_hash,))
+        ]
+        for canonical_id in stored + sorted(self._reserved_hashes.get(text_hash, ())):
+            if canonical_id == chunk_id:
+                # already canonical (e.g. its earlier write failed) - embed it again
+                return None
+            if canonical_id not in exclude:
+                return DedupMatch(canonical_id, EXACT, 1.0)
+
+        buckets = self._buckets(signature)
+        marks = ",".join("(?, ?)" for _ in buckets)
+        candidates = [
+            (canonical_id, np.frombuffer(blob, dtype=np.uint64))
+            for canonical_id, blob in self._conn.execute(
+                f"""
+                SELECT c.chunk_id, c.signature FROM canonical c
+                WHERE c.chunk_id IN (SELECT DISTINCT chunk_id FROM lsh WHERE (band, bucket) IN (VALUES {marks}))
+                """,
+                [value for bucket in buckets for value in bucket],
+            )
+        ]
+        reserved = set().union(*(self._reserved_buckets.get(bucket, set()) for bucket in buckets))
+        candidates.extend((canonical_id, self._reserved[canonical_id][2]) for canonical_id in sorted(reserved))
+
+        best: Optional[DedupMatch] = None
+        for canonical_id, candidate in candidates:
+            if canonical_id == chunk_id or canonical_id in exclude:
+                continue
+            similarity = float(np.mean(candidate == signature))
+            if similarity >= self.threshold and (best is None or similarity > best.similarity):
+                best = DedupMatch(canonical_id, NEAR, similarity)
+        return best
+
+    def _reserve(self, chunk_id: str, source: str, text_hash: str, signature: np.ndarray) -> None:
+        self._unreserve(chunk_id)
+        self._reserved[chunk_id] = (source, text_hash, signature)
+        self._reserved_hashes.setdefault(text_hash, set()).add(chunk_id)
+        for bucket in self._buckets(signature):
+            self._reserved_buckets.setdefault(bucket, set()).add(chunk_id)
+
+    def _unreserve(self, chunk_id: str) -> Optional[Tuple[str, str, np.ndarray]]:
+        reserved = self._reserved.pop(chunk_id, None)
+        if reserved is None:
+            return None
+        _, text_hash, signature = reserved
+        self._reserved_hashes[text_hash].discard(chunk_id)
+        if not self._reserved_hashes[text_hash]:
+            del self._reserved_hashes[text_hash]
+        for bucket in self._buckets(signature):
+            self._reserved_buckets[bucket].discard(chunk_id)
+            if not self._reserved_buckets[bucket]:
+                del self._reserved_buckets[bucket]
+        return reserved
+
+    def _sources_pointing_at(self, canonical_ids: Sequence[str]) -> Set[str]:
+        sources: Set[str] = set()
+        for start in range(0, len(canonical_ids), 500):
+            batch = list(canonical_ids[start : start + 500])
+            marks = ",".join("?" * len(batch))
+            sources.update(
+                row[0]
+                for row in self._conn.execute(
+                    f"SELECT DISTINCT source FROM duplicates WHERE canonical_id IN ({marks})", batch
+                )
+            )
+        return sources
+
+    def _add_canonical(self, chunk_id: str, source: str, text_hash: str, signature: np.ndarray) -> None:
+        self._conn.execute("DELETE FROM lsh WHERE chunk_id = ?", (chunk_id,))
+        self._conn.execute(
+            "INSERT OR REPLACE INTO canonical (chunk_id, source, text_hash, signature) VALUES (?, ?, ?, ?)",
+            (chunk_id, source, text_hash, signature.tobytes()),
+        )
+        self._conn.executemany(
+            "INSERT INTO lsh (band, bucket, chunk_id) VALUES (?, ?, ?)",
+            [(band, bucket, chunk_id) for band, bucket in self._buckets(signature)],
+        )
+
+    def _buckets(self, signature: np.ndarray) -> List[Tuple[int, int]]:
+        """(band, bucket) keys: each band of `rows` signature values hashed to a signed 64-bit int"""
+        buckets = []
+        for band in range(self.bands):
+            values = signature[band * self.rows : (band + 1) * self.rows].tobytes()
+            digest = hashlib.blake2b(values, digest_size=8).digest()
+            buckets.append((band, int.from_bytes(digest, "little", signed=True)))
+        return buckets
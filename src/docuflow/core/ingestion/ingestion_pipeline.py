@@ -1,49 +1,682 @@
+import asyncio
+import multiprocessing
+import queue
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, TypeVar
+
+import numpy as np
 
 from docuflow.configs import settings
-from docuflow.core.ingestion import convert_pdf_to_md, get_sections, save_markdown
-from docuflow.interfaces import ITextEmbedder, IVectorStore
+from docuflow.core.ingestion import convert_pdf_to_md, get_sections, iter_pdf_pages, iter_sections, save_markdown
+from docuflow.core.ingestion.chunk_ids import ChunkIdAssigner
+from docuflow.core.ingestion.dedup import ChunkDeduplicator
+from docuflow.core.ingestion.manifest import CANONICAL_REMOVED, IngestionManifest, ManifestDecision, source_key
+from docuflow.interfaces import EmbeddingMatrix, ITextEmbedder, IVectorStore
+from docuflow.schemas import IngestionReport
+from docuflow.schemas.document import Document as DocuFlowDocument
+from docuflow.services.bm25_index import BM25Index
 from docuflow.utils import get_logger
+from docuflow.utils.aio import conversion_runner, ingest_runner, init_conversion_worker, store_runner
+
+T = TypeVar("T")
+
+
+@dataclass
+class PreparedDocument:
+    """Converted + chunked file, ready to be diffed against the store"""
+
+    file_path: Path
+    source: str
+    ids: List[str]
+    documents: List[DocuFlowDocument]
+
+
+@dataclass
+class PendingWrite:
+    """Chunks of one file that still need embedding, and ids that must go"""
+
+    prepared: PreparedDocument
+    new_positions: List[int]
+    vanished_ids: List[str]
+    decision: Optional[ManifestDecision] = None
+    embeddings: Optional[EmbeddingMatrix] = None
+    # chunk id -> (canonical chunk id, metadata) for chunks not embedded as duplicates
+    duplicates: Dict[str, Tuple[str, dict]] = field(default_factory=dict)
+
+    @property
+    def texts(self) -> List[str]:
+        return [self.prepared.documents[i].page_content for i in self.new_positions]
+
+    @property
+    def chunk_ids(self) -> List[str]:
+        return [self.prepared.ids[i] for i in self.new_positions]
+
+
+def prepare_document(file_path: Path, save_output: bool = True) -> PreparedDocument:
+    """
+    CPU stage of ingestion: pdf -> markdown -> chunks with stable ids.
+    Module level so it can run in a process pool.
+    """
+    logger = get_logger(__name__)
+
+    # conversion of pdf to md
+    logger.info(f"Starting conversion from pdf to md: {file_path}")
+    markdown_text = convert_pdf_to_md(file_path)
+
+    if save_output:
+        # Saving markdown
+        logger.info("Saving Markdown file")
+        save_markdown(markdown_text, settings.output_path)
+
+    # chunking md to document objects
+    source = source_key(file_path)
+    documents = get_sections(markdown_text)
+    for doc in documents:
+        doc.metadata["source"] = source
+    logger.info(f"Generated {len(documents)} chunks for {file_path}")
+
+    #  Generate IDs from source identity + chunk content
+    ids = ChunkIdAssigner(source).assign(documents)
+    return PreparedDocument(file_path=Path(file_path), source=source, ids=ids, documents=documents)
+
+
+def _prefetch(items: Iterable[T], depth: int) -> Iterator[T]:
+    """
+    Produce `items` on a background thread, at most `depth` ahead of the consumer.
+    Lets conversion of the next pages overlap embedding + writing of the current ones.
+    """
+    buffer: "queue.Queue[Tuple[bool, object]]" = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def produce() -> None:
+        try:
+            for item in items:
+                if stop.is_set():
+                    return
+                buffer.put((True, item))
+        except Exception as e:
+            buffer.put((False, e))
+            return
+        buffer.put((False, None))
+
+    producer = threading.Thread(target=produce, name="docuflow-prefetch", daemon=True)
+    producer.start()
+    try:
+        while True:
+            ok, item = buffer.get()
+            if not ok:
+                if item is not None:
+                    raise item  # type: ignore[misc]
+                return
+            yield item  # type: ignore[misc]
+    finally:
+        stop.set()
+        # unblock a producer waiting on a full buffer
+        while producer.is_alive():
+            try:
+                buffer.get(timeout=0.1)
+            except queue.Empty:
+                pass
 
 
 class IngestionPipeline:
-    def __init__(self, embedder: ITextEmbedder, vector_store: IVectorStore):
+    def __init__(
+        self,
+        embedder: ITextEmbedder,
+        vector_store: IVectorStore,
+        manifest: Optional[IngestionManifest] = None,
+        deduplicator: Optional[ChunkDeduplicator] = None,
+        lexical_index: Optional[BM25Index] = None,
+    ):
         self.logger = get_logger(__name__)
         self.embedder = embedder
         self.vector_store = vector_store
+        self.manifest = manifest
+        self.deduplicator = deduplicator
+        # BM25 index kept in step with the vector store (same chunks, same ids)
+        self.lexical_index = lexical_index
+
+        # Dedup bookkeeping of the current run (updated from the writer thread too)
+        self._dedup_lock = threading.Lock()
+        self._chunks_checked = 0
+        self._chunks_duplicate = 0
+        self._orphaned: Set[str] = set()  # sources whose duplicates lost their canonical chunk
 
     def ingest(self, file_path: Path) -> None:
-        # conversion of pdf to md
-        self.logger.info("Starting conversion from pdf to md")
-        markdown_text = convert_pdf_to_md(file_path)
+        """Ingest one file unconditionally and record it in the manifest"""
+        if self.manifest is None:
+            self._ingest_file(file_path)
+            return
 
-        # Saving markdown
-        self.logger.info("Saving Markdown file")
-        save_markdown(markdown_text, settings.output_path)
+        decision = self.manifest.check(file_path)
+        self._ingest_and_record(file_path, decision)
+
+    async def aingest(self, file_path: Path) -> None:
+        """
+        Async ingest(): conversion in worker processes, embedding and store calls on the
+        shared async runners, so many files and queries can be in flight on one event loop.
+        Cancelling before the write leaves the store untouched; a write that has started
+        runs to completion. As in sync(), sources whose duplicates lost their canonical
+        chunk are re-ingested afterwards.
+        """
+        decision = None
+        if self.manifest is not None:
+            decision = await store_runner().run(self.manifest.check, file_path)
+
+        if settings.pdf_stream_pages > 0 and Path(file_path).suffix.lower() == ".pdf":
+            # streaming interleaves all stages per page window
+            if decision is None:
+                await ingest_runner().run(self._ingest_file, file_path)
+            else:
+                await ingest_runner().run(self._ingest_and_record, file_path, decision)
+        else:
+            prepared = await conversion_runner().run(prepare_document, file_path)
+            pending = await store_runner().run(self._diff, prepared, decision)
+            try:
+                await store_runner().run(self._dedup, pending)
+                if pending.new_positions:
+                    pending.embeddings = await self.embedder.aembed_array(pending.texts)
+            except BaseException:
+                self._release(pending)
+                raise
+
+            # shielded: cancellation must not abandon the store half-written
+            await asyncio.shield(store_runner().run(self._commit, pending))
+            self.logger.info(f"Ingested {prepared.file_path}")
+
+        if self.deduplicator is not None and self.manifest is not None and self._orphaned:
+            await ingest_runner().run(self._reingest_orphaned, IngestionReport())
+
+    def sync(
+        self,
+        file_paths: Iterable[Path],
+        purge_missing: Optional[bool] = None,
+        workers: Optional[int] = None,
+    ) -> IngestionReport:
+        """
+        Ingest only files that are new or changed since the last run.
+        With `purge_missing` (default: settings.purge_missing_sources), files that are in the
+        manifest but gone from disk are purged from the vector store. An empty file list never
+        purges: a missing or unmounted directory must not wipe the store.
+        With `workers > 1` conversion runs in a process pool, overlapped with embedding and writing.
+        """
+        if self.manifest is None:
+            raise RuntimeError("sync() requires an IngestionManifest")
+
+        file_paths = list(file_paths)
+        purge_missing = purge_missing if purge_missing is not None else settings.purge_missing_sources
+        workers = workers or settings.ingest_workers
+        report = IngestionReport()
+        with self._dedup_lock:
+            self._chunks_checked = self._chunks_duplicate = 0
+
+        to_ingest: List[Tuple[Path, ManifestDecision]] = []
+        for file_path in file_paths:
+            try:
+                decision = self.manifest.check(file_path)
+            except Exception as e:
+                self.logger.error(f"Failed to check {file_path}: {e}")
+                report.failed[source_key(file_path)] = str(e)
+                continue
+
+            if not decision.needs_ingest:
+                self.logger.info(f"Skipping {file_path} ({decision.reason})")
+                report.count_skipped(decision.reason)
+                continue
+            to_ingest.append((file_path, decision))
+
+        if workers > 1 and len(to_ingest) > 1:
+            self._ingest_parallel(to_ingest, workers, report)
+        else:
+            for file_path, decision in to_ingest:
+                try:
+                    self.logger.info(f"Ingesting {file_path} ({decision.reason})")
+                    self._ingest_and_record(file_path, decision)
+                    report.count_ingested(decision.reason)
+                except Exception as e:
+                    self.logger.error(f"Failed to ingest {file_path}: {e}")
+                    report.failed[decision.source] = str(e)
+
+        if purge_missing and not file_paths:
+            self.logger.warning("No files to sync, not purging the manifest's sources")
+        elif purge_missing:
+            report.purged = self.purge_missing()
+
+        if self.deduplicator is not None:
+            self._reingest_orphaned(report)
+            report.chunks_checked = self._chunks_checked
+            report.chunks_duplicate = self._chunks_duplicate
+
+        self.logger.info(f"Ingestion run finished: {report.summary()}")
+        return report
+
+    def purge_missing(self) -> int:
+        """Delete chunks of manifest files that no longer exist on disk"""
+        if self.manifest is None:
+            return 0
+
+        purged = 0
+        for source in self.manifest.sources():
+            if Path(source).exists():
+                continue
+
+            chunk_ids = self.vector_store.get(where={"source": source}, include=())["ids"]
+            if chunk_ids:
+                self._delete(chunk_ids)
+            if self.deduplicator is not None:
+                self.deduplicator.remove_source(source)
+            self.manifest.remove(source)
+            self.logger.info(f"Purged {source} from vector store")
+            purged += 1
+        return purged
+
+    def _ingest_and_record(self, file_path: Path, decision: ManifestDecision) -> None:
+        assert self.manifest is not None
+        chunk_ids = self._ingest_file(file_path)
+        self.manifest.record(decision, file_path, chunk_ids)
+
+    def _ingest_file(self, file_path: Path) -> List[str]:
+        if settings.pdf_stream_pages > 0 and Path(file_path).suffix.lower() == ".pdf":
+            return self._ingest_streaming(file_path, settings.pdf_stream_pages)
+
+        prepared = prepare_document(file_path)
+
+        pending = self._diff(prepared)
+        self._dedup(pending)
+        if pending.new_positions:
+            # generate embeddings
+            self.logger.info("Generating embeddings...")
+            self._embed(pending)
 
-        # chunking md to document objects
-        self.logger.info("Starting chunking...")
-        documents = get_sections(markdown_text)
-        self.logger.info(f"Generated {len(documents)} chunks")
+        self._write(pending)
+        self.logger.info("Ingestion complete.")
+        return prepared.ids
+
+    def _ingest_streaming(self, file_path: Path, pages_per_window: int) -> List[str]:
+        """
+        Convert, chunk, embed and write one page window at a time.
+        Peak memory is bounded by a window instead of the whole document,
+        and the first chunks are stored while later pages are still converting.
+        """
+        source = source_key(file_path)
+        existing_ids = set(self.vector_store.get(where={"source": source}, include=())["ids"])
+        assigner = ChunkIdAssigner(source)
+        all_ids: List[str] = []
+
+        output_file = Path(settings.output_path)
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        with output_file.open("w", encoding="utf-8") as markdown_out:
+
+            def save_window(windows: Iterable[str]) -> Iterator[str]:
+                for window in windows:
+                    markdown_out.write(window)
+                    yield window
+
+            windows = save_window(iter_pdf_pages(file_path, pages_per_window))
+            for documents in _prefetch(iter_sections(windows), depth=2):
+                for doc in documents:
+                    doc.metadata["source"] = source
+                ids = assigner.assign(documents)
+                all_ids.extend(ids)
+
+                prepared = PreparedDocument(file_path=Path(file_path), source=source, ids=ids, documents=documents)
+                new_positions = [i for i, chunk_id in enumerate(ids) if chunk_id not in existing_ids]
+                self._restore_lexical(prepared, existing_ids)
+                pending = PendingWrite(prepared, new_positions, vanished_ids=[])
+                # what vanishes is only known at the end, so keep clear of all current chunks
+                self._dedup(pending, exclude=existing_ids)
+                if pending.new_positions:
+                    self._embed(pending)
+                self._write(pending)
+
+        vanished_ids = sorted(existing_ids.difference(all_ids))
+        if vanished_ids:
+            self._delete(vanished_ids)
+        self.logger.info(
+            f"{Path(file_path).name}: streamed {len(all_ids)} chunks, {len(vanished_ids)} vanished. Ingestion complete."
+        )
+        return all_ids
+
+    def _diff(self, prepared: PreparedDocument, decision: Optional[ManifestDecision] = None) -> PendingWrite:
+        """Compare a prepared file against what the store already holds for its source"""
+        existing_ids = set(self.vector_store.get(where={"source": prepared.source}, include=())["ids"])
+        new_positions = [i for i, chunk_id in enumerate(prepared.ids) if chunk_id not in existing_ids]
+        self._restore_lexical(prepared, existing_ids)
+        vanished_ids = sorted(existing_ids.difference(prepared.ids))
+        self.logger.info(
+            f"{prepared.file_path.name}: {len(new_positions)} new or changed chunks, "
+            f"{len(prepared.ids) - len(new_positions)} unchanged, {len(vanished_ids)} vanished"
+        )
+        return PendingWrite(prepared, new_positions, vanished_ids, decision)
+
+    def _restore_lexical(self, prepared: PreparedDocument, stored_ids: Set[str]) -> None:
+        """
+        Index stored chunks the lexical index lacks: the file's last write failed between
+        the store and the index, and as unchanged chunks they would never be written again.
+        """
+        if self.lexical_index is None:
+            return
+
+        positions = [i for i, chunk_id in enumerate(prepared.ids) if chunk_id in stored_ids]
+        missing = set(self.lexical_index.missing([prepared.ids[i] for i in positions]))
+        if not missing:
+            return
+
+        positions = [i for i in positions if prepared.ids[i] in missing]
+        self.logger.warning(f"{prepared.file_path.name}: {len(positions)} stored chunks missing from the lexical index")
+        self.lexical_index.add(
+            [prepared.ids[i] for i in positions],
+            [prepared.documents[i].page_content for i in positions],
+            [prepared.source] * len(positions),
+        )
+
+    def _embed(self, pending: PendingWrite) -> None:
+        try:
+            pending.embeddings = self.embedder.embed_array(pending.texts)
+        except BaseException:
+            self._release(pending)
+            raise
+
+    def _write(self, pending: PendingWrite) -> None:
+        """Store new chunks (then they become canonical for dedup) and duplicates, delete vanished ones"""
+        prepared = pending.prepared
+        if pending.new_positions:
+            assert pending.embeddings is not None
+            # store in vector db
+            self.logger.info("Storing embeddings in vector store...")
+            ids = pending.chunk_ids
+            texts = pending.texts
+            try:
+                self.vector_store.add(
+                    ids=ids,
+                    documents=texts,
+                    metadata=[prepared.documents[i].metadata for i in pending.new_positions],
+                    embeddings=pending.embeddings,
+                )
+                if self.lexical_index is not None:
+                    self.lexical_index.add(ids, texts, [prepared.source] * len(ids))
+            except BaseException:
+                self._release(pending)
+                raise
+            if self.deduplicator is not None:
+                self.deduplicator.commit(ids)
+            self.logger.info(f"Stored {len(pending.new_positions)} chunks into vector store")
+
+        if pending.duplicates:
+            self._write_duplicates(pending)
+        if pending.vanished_ids:
+            self._delete(pending.vanished_ids)
+
+    def _commit(self, pending: PendingWrite) -> None:
+        """Write a file's chunks, then record its manifest entry"""
+        prepared = pending.prepared
+        self._write(pending)
+        if self.manifest is not None and pending.decision is not None:
+            self.manifest.record(pending.decision, prepared.file_path, prepared.ids)
+
+    def _delete(self, chunk_ids: List[str]) -> None:
+        """
+        Delete chunks from the store, the lexical index and the dedup index.
+        Duplicates stored onto a deleted chunk carry its vector and go with it;
+        their sources are re-ingested.
+        """
+        if self.deduplicator is not None:
+            deleted = set(chunk_ids)
+            chunk_ids = chunk_ids + [
+                chunk_id for chunk_id in self.deduplicator.duplicate_ids_of(chunk_ids) if chunk_id not in deleted
+            ]
+        self.vector_store.delete(chunk_ids)
+        if self.lexical_index is not None:
+            self.lexical_index.delete(chunk_ids)
+        if self.deduplicator is None:
+            return
+
+        orphaned = self.deduplicator.remove(chunk_ids)
+        with self._dedup_lock:
+            self._orphaned.update(orphaned)
+
+    # ===== DEDUPLICATION =====
+
+    def _dedup(self, pending: PendingWrite, exclude: Optional[Set[str]] = None) -> None:
+        """Drop exact / near duplicates of already stored chunks from what gets embedded"""
+        if self.deduplicator is None or not pending.new_positions:
+            return
 
-        # Extract content and metadata
-        texts = [doc.page_content for doc in documents]
-        self.logger.info(f"Stored {len(texts)} chunks into vector store")
-        metadata = [doc.metadata for doc in documents]
+        prepared = pending.prepared
+        positions = pending.new_positions
+        matches = self.deduplicator.assign(
+            prepared.source,
+            [prepared.ids[i] for i in positions],
+            [prepared.documents[i] for i in positions],
+            # chunks about to be deleted cannot serve as canonical
+            exclude=exclude if exclude is not None else set(pending.vanished_ids),
+        )
+        for k, match in matches.items():
+            position = positions[k]
+            pending.duplicates[prepared.ids[position]] = (match.canonical_id, prepared.documents[position].metadata)
+        pending.new_positions = [position for k, position in enumerate(positions) if k not in matches]
+
+        with self._dedup_lock:
+            self._chunks_checked += len(positions)
+            self._chunks_duplicate += len(matches)
+        if matches:
+            self.logger.info(f"{prepared.file_path.name}: {len(matches)} of {len(positions)} new chunks are duplicates")
+
+    def _release(self, pending: PendingWrite) -> None:
+        """Give up the canonicals reserved for a file whose embedding or write failed"""
+        if self.deduplicator is None:
+            return
 
-        # generate embeddings
-        self.logger.info("Generating embeddings...")
-        embeddings = self.embedder.embed(texts)
-        self.logger.info("Storing embeddings in vector store...")
+        orphaned = self.deduplicator.release(pending.chunk_ids)
+        with self._dedup_lock:
+            self._orphaned.update(orphaned)
 
-        #  Generate IDs
-        ids = [str(i) for i in range(len(texts))]
+    def _write_duplicates(self, pending: PendingWrite) -> None:
+        """
+        Store duplicates under their own id, text and metadata (plus `duplicate_of`) with the
+        vector of their canonical chunk, so source-filtered queries find them without a second
+        embedding. A canonical chunk not in the store (its write failed, or another file in
+        flight has not written it yet) leaves its duplicates to a re-ingest of the source.
+        """
+        assert self.deduplicator is not None
+        prepared = pending.prepared
+        vectors = self._canonical_vectors(pending)
+        duplicates = {
+            chunk_id: (canonical_id, metadata)
+            for chunk_id, (canonical_id, metadata) in pending.duplicates.items()
+            if canonical_id in vectors
+        }
+        if len(duplicates) < len(pending.duplicates):
+            self.logger.warning(
+                f"{prepared.file_path.name}: {len(pending.duplicates) - len(duplicates)} duplicates "
+                "lost their canonical chunk, re-ingesting later"
+            )
+            with self._dedup_lock:
+                self._orphaned.add(prepared.source)
+        if not duplicates:
+            return
 
-        # store in vector db
+        positions = {chunk_id: i for i, chunk_id in enumerate(prepared.ids)}
+        ids = list(duplicates)
+        texts = [prepared.documents[positions[chunk_id]].page_content for chunk_id in ids]
         self.vector_store.add(
             ids=ids,
             documents=texts,
-            metadata=metadata,
-            embeddings=embeddings,
+            metadata=[{**metadata, "duplicate_of": canonical_id} for canonical_id, metadata in duplicates.values()],
+            embeddings=np.stack([vectors[canonical_id] for canonical_id, _ in duplicates.values()]),
         )
-        self.logger.info("Ingestion complete.")
+        if self.lexical_index is not None:
+            self.lexical_index.add(ids, texts, [prepared.source] * len(ids))
+        self.deduplicator.record_duplicates(prepared.source, duplicates)
+
+    def _canonical_vectors(self, pending: PendingWrite) -> Dict[str, np.ndarray]:
+        """Vectors of the canonical chunks of `pending`'s duplicates, from this write or the store"""
+        canonical_ids = {canonical_id for canonical_id, _ in pending.duplicates.values()}
+        vectors: Dict[str, np.ndarray] = {}
+        if pending.embeddings is not None:
+            embeddings = np.asarray(pending.embeddings, dtype=np.float32)
+            vectors.update(
+                (chunk_id, embeddings[row])
+                for row, chunk_id in enumerate(pending.chunk_ids)
+                if chunk_id in canonical_ids
+            )
+
+        stored = sorted(canonical_ids.difference(vectors))
+        if stored:
+            records = self.vector_store.get(ids=stored, include=("embeddings",))
+            vectors.update(zip(records["ids"], np.asarray(records["embeddings"], dtype=np.float32)))
+        return vectors
+
+    def _reingest_orphaned(self, report: IngestionReport) -> None:
+        """Re-ingest sources whose duplicates lost their canonical chunk this run"""
+        assert self.manifest is not None
+        while self._orphaned:
+            source = self._orphaned.pop()
+            file_path = Path(source)
+            if not file_path.exists():
+                continue
+
+            try:
+                decision = self.manifest.check(file_path)
+                decision.reason = CANONICAL_REMOVED
+                self.logger.info(f"Re-ingesting {file_path} ({decision.reason})")
+                self._ingest_and_record(file_path, decision)
+                report.count_ingested(decision.reason)
+            except Exception as e:
+                self.logger.error(f"Failed to ingest {file_path}: {e}")
+                report.failed[source] = str(e)
+
+    # ===== PIPELINED INGESTION =====
+
+    def _ingest_parallel(
+        self,
+        to_ingest: List[Tuple[Path, ManifestDecision]],
+        workers: int,
+        report: IngestionReport,
+    ) -> None:
+        """
+        Three overlapping stages:
+        conversion + chunking in a process pool -> one embedding thread batching chunks
+        across documents -> one writer thread upserting into the vector store.
+        """
+        self.logger.info(f"Pipelined ingestion of {len(to_ingest)} files with {workers} workers")
+        # Bounded queues keep at most a few documents' chunks in memory per stage
+        embed_queue: "queue.Queue[Optional[PendingWrite]]" = queue.Queue(maxsize=workers * 2)
+        write_queue: "queue.Queue[Optional[PendingWrite]]" = queue.Queue(maxsize=workers * 2)
+        report_lock = threading.Lock()
+
+        def fail(source: str, error: Exception) -> None:
+            self.logger.error(f"Failed to ingest {source}: {error}")
+            with report_lock:
+                report.failed[source] = str(error)
+
+        embed_thread = threading.Thread(
+            target=self._embed_stage, args=(embed_queue, write_queue, fail), name="docuflow-embed"
+        )
+        write_thread = threading.Thread(
+            target=self._write_stage, args=(write_queue, report, report_lock, fail), name="docuflow-write"
+        )
+        embed_thread.start()
+        write_thread.start()
+
+        try:
+            # spawn: the parent already holds torch/chroma threads, which fork does not survive
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_conversion_worker,
+            ) as pool:
+                decisions: Dict[Future[PreparedDocument], ManifestDecision] = {}
+                remaining = list(reversed(to_ingest))
+                in_flight: Set[Future[PreparedDocument]] = set()
+
+                while remaining or in_flight:
+                    while remaining and len(in_flight) < workers * 2:
+                        file_path, decision = remaining.pop()
+                        try:
+                            future = pool.submit(prepare_document, file_path, False)
+                        except Exception as e:
+                            # e.g. BrokenProcessPool after a worker died: fail the file, not the run
+                            fail(decision.source, e)
+                            continue
+                        decisions[future] = decision
+                        in_flight.add(future)
+                    if not in_flight:
+                        continue
+
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        decision = decisions.pop(future)
+                        try:
+                            pending = self._diff(future.result(), decision)
+                            self._dedup(pending)
+                            embed_queue.put(pending)
+                        except Exception as e:
+                            fail(decision.source, e)
+        finally:
+            embed_queue.put(None)
+            embed_thread.join()
+            write_thread.join()
+
+    def _embed_stage(
+        self,
+        embed_queue: "queue.Queue[Optional[PendingWrite]]",
+        write_queue: "queue.Queue[Optional[PendingWrite]]",
+        fail: Callable[[str, Exception], None],
+    ) -> None:
+        finished = False
+        while not finished:
+            # Block for one document, then take whatever else is already waiting
+            batch: List[PendingWrite] = []
+            n_texts = 0
+            item = embed_queue.get()
+            while item is not None:
+                batch.append(item)
+                n_texts += len(item.new_positions)
+                if n_texts >= settings.ingest_embed_batch_size:
+                    break
+                try:
+                    item = embed_queue.get_nowait()
+                except queue.Empty:
+                    break
+            finished = item is None
+
+            texts = [text for pending in batch for text in pending.texts]
+            try:
+                if texts:
+                    self.logger.info(f"Embedding {len(texts)} chunks from {len(batch)} documents")
+                    embeddings = self.embedder.embed_array(texts)
+                    offset = 0
+                    for pending in batch:
+                        pending.embeddings = embeddings[offset : offset + len(pending.new_positions)]
+                        offset += len(pending.new_positions)
+            except Exception as e:
+                for pending in batch:
+                    self._release(pending)
+                    fail(pending.prepared.source, e)
+                continue
+
+            for pending in batch:
+                write_queue.put(pending)
+
+        write_queue.put(None)
+
+    def _write_stage(
+        self,
+        write_queue: "queue.Queue[Optional[PendingWrite]]",
+        report: IngestionReport,
+        report_lock: threading.Lock,
+        fail: Callable[[str, Exception], None],
+    ) -> None:
+        while (pending := write_queue.get()) is not None:
+            prepared = pending.prepared
+            try:
+                self._commit(pending)
+                with report_lock:
+                    report.count_ingested(pending.decision.reason if pending.decision else "forced")
+                self.logger.info(f"Ingested {prepared.file_path}")
+            except Exception as e:
+                fail(prepared.source, e)
@@ -0,0 +1,163 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional
+
+from docuflow.utils import get_logger
+
+logger = get_logger(__name__)
+
+# Reasons reported by IngestionManifest.check
+NEW = "new"
+MODIFIED = "modified"
+UNCHANGED = "unchanged"  # size and mtime match the manifest
+CONTENT_UNCHANGED = "content_unchanged"  # stat changed (touch, copy) but the bytes did not
+CANONICAL_REMOVED = "canonical_removed"  # unchanged, but chunks it was deduplicated onto were deleted
+
+_HASH_BLOCK_SIZE = 1 << 20
+
+
+def source_key(file_path: Path) -> str:
+    """Stable identity of a file across runs"""
+    return str(Path(file_path).resolve())
+
+
+def hash_file(file_path: Path) -> str:
+    """sha256 of the file content, read in blocks"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while block := f.read(_HASH_BLOCK_SIZE):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+@dataclass
+class ManifestEntry:
+    source: str
+    size: int
+    mtime_ns: int
+    content_hash: str
+    chunk_ids: List[str] = field(default_factory=list)
+    ingested_at: float = 0.0
+
+
+@dataclass
+class ManifestDecision:
+    """What to do with one file, plus the stat snapshot taken while deciding"""
+
+    source: str
+    reason: str
+    size: int
+    mtime_ns: int
+    content_hash: Optional[str] = None
+
+    @property
+    def needs_ingest(self) -> bool:
+        return self.reason in (NEW, MODIFIED)
+
+
+class IngestionManifest:
+    """
+    Persistent record of ingested files, keyed by path + size + mtime.
+    When the stat changed the content hash decides whether the file really changed.
+    """
+
+    def __init__(self, db_file: Path):
+        self.db_file = Path(db_file)
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_file, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS files (
+                source TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                content_hash TEXT NOT NULL,
+                chunk_ids TEXT NOT NULL,
+                ingested_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get(self, source: str) -> Optional[ManifestEntry]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT source, size, mtime_ns, content_hash, chunk_ids, ingested_at FROM files WHERE source = ?",
+                (source,),
+            ).fetchone()
+        if row is None:
+            return None
+        return ManifestEntry(
+            source=row[0],
+            size=row[1],
+            mtime_ns=row[2],
+            content_hash=row[3],
+            chunk_ids=json.loads(row[4]),
+            ingested_at=row[5],
+        )
+
+    def sources(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT source FROM files")]
+
+    def check(self, file_path: Path) -> ManifestDecision:
+        """Decide whether `file_path` must be (re-)ingested"""
+        source = source_key(file_path)
+        stat = Path(file_path).stat()
+        entry = self.get(source)
+
+        if entry is None:
+            return ManifestDecision(source, NEW, stat.st_size, stat.st_mtime_ns)
+
+        if entry.size == stat.st_size and entry.mtime_ns == stat.st_mtime_ns:
+            return ManifestDecision(source, UNCHANGED, stat.st_size, stat.st_mtime_ns, entry.content_hash)
+
+        # Stat changed - only the content hash can tell if the bytes did
+        content_hash = hash_file(file_path)
+        if content_hash == entry.content_hash:
+            logger.info(f"{source} changed on disk but its content did not")
+            self._update_stat(source, stat.st_size, stat.st_mtime_ns)
+            return ManifestDecision(source, CONTENT_UNCHANGED, stat.st_size, stat.st_mtime_ns, content_hash)
+
+        return ManifestDecision(source, MODIFIED, stat.st_size, stat.st_mtime_ns, content_hash)
+
+    def record(self, decision: ManifestDecision, file_path: Path, chunk_ids: List[str]) -> None:
+        """Store the state a file was ingested with"""
+        content_hash = decision.content_hash or hash_file(file_path)
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO files (source, size, mtime_ns, content_hash, chunk_ids, ingested_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    decision.source,
+                    decision.size,
+                    decision.mtime_ns,
+                    content_hash,
+                    json.dumps(chunk_ids),
+                    time.time(),
+                ),
+            )
+            self._conn.commit()
+
+    def remove(self, source: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM files WHERE source = ?", (source,))
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _update_stat(self, source: str, size: int, mtime_ns: int) -> None:
+        with self._lock:
+            self._conn.execute("UPDATE files SET size = ?, mtime_ns = ? WHERE source = ?", (size, mtime_ns, source))
+            self._conn.commit()
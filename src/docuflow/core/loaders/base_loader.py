@@ -1,8 +1,9 @@
+import os
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
 from docuflow.interfaces import ILoader
-from docuflow.schemas import RawDocument
+from docuflow.schemas import FileContent, RawDocument
 from docuflow.utils import get_logger
 
 
@@ -19,33 +20,39 @@ class BaseLoader(ILoader):
 
     def validate(self, source_path: str) -> bool:
         """Verify file exists and is supported"""
+        return self.load_metadata(source_path) is not None
+
+    def load_metadata(self, source_path: str) -> Optional[dict]:
+        """File metadata from a single os.stat, without touching the content"""
         path = Path(source_path)
-        return path.exists() and path.suffix.lower() in self.SUPPORTED_EXTENSIONS
+        if path.suffix.lower() not in self.SUPPORTED_EXTENSIONS:
+            return None
+
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+
+        return {
+            "filename": path.name,
+            "file_size": stat.st_size,
+            "format": path.suffix.lower(),
+            "mtime_ns": stat.st_mtime_ns,
+        }
 
     def load(self, source_path: str) -> List[RawDocument]:
-        """Load file as raw bytes - same for all formats"""
+        """Load file as a lazy content handle - same for all formats"""
 
-        if not self.validate(source_path):
+        # The default validate() is load_metadata's own check; only an override adds a second stat
+        if getattr(self.validate, "__func__", None) is not BaseLoader.validate and not self.validate(source_path):
             self.logger.warning(f"Invalid file: {source_path}")
             return []
 
-        try:
-            path = Path(source_path)
-
-            # Load raw bytes
-            raw_content = path.read_bytes()
-
-            return [
-                RawDocument(
-                    content=raw_content,
-                    source=source_path,
-                    metadata={
-                        "filename": path.name,
-                        "file_size": path.stat().st_size,
-                        "format": path.suffix.lower(),
-                    },
-                )
-            ]
-        except Exception as e:
-            self.logger.error(f"Error loading {source_path}: {e}")
+        metadata = self.load_metadata(source_path)
+        if metadata is None:
+            self.logger.warning(f"Invalid file: {source_path}")
             return []
+
+        # Bytes are read (memory-mapped) only when a parser consumes them
+        content = FileContent(source_path, metadata["file_size"])
+        return [RawDocument(content=content, source=source_path, metadata=metadata)]
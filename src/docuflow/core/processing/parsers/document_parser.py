@@ -1,6 +1,6 @@
 from pathlib import Path
 
-from docuflow.core.ingestion import convert_docx_to_md, convert_pdf_to_md, extract_text_content
+from docuflow.core.ingestion import convert_docx_to_md, convert_pdf_to_md
 from docuflow.schemas import RawDocument
 from docuflow.utils import get_logger
 
@@ -21,7 +21,9 @@ class DocumentParser:
             elif format == ".docx":
                 result = convert_docx_to_md(Path(raw_document.source))
             elif format in [".txt", ".md"]:
-                result = extract_text_content(Path(raw_document.source))
+                # Text is decoded from the loader's buffer instead of reopening the file
+                with raw_document.buffer() as content:
+                    result = str(content, "utf-8")
             else:
                 raise ValueError(f"Unsupported format: {format}")
 
@@ -0,0 +1,118 @@
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from docuflow.configs import settings
+from docuflow.utils import get_logger
+
+logger = get_logger(__name__)
+
+LanguageKey = Tuple[str, ...]
+
+# Process-wide registry: one loaded reader per language set
+_readers: Dict[LanguageKey, Any] = {}
+_load_locks: Dict[LanguageKey, threading.Lock] = {}
+_pools: Dict[Tuple[LanguageKey, int], "OCRReaderPool"] = {}
+_registry_lock = threading.Lock()
+
+
+def _language_key(languages: Optional[Sequence[str]]) -> LanguageKey:
+    return tuple(sorted(languages or settings.ocr_languages))
+
+
+def _load_reader(languages: LanguageKey) -> Any:
+    # easyocr pulls in torch - only import it once OCR is actually needed
+    import easyocr
+
+    logger.info(f"Loading EasyOCR reader for {list(languages)}")
+    return easyocr.Reader(list(languages), gpu=settings.ocr_gpu)
+
+
+def get_ocr_reader(languages: Optional[Sequence[str]] = None) -> Any:
+    """Shared EasyOCR reader for `languages`, loaded on first use and reused afterwards"""
+    key = _language_key(languages)
+    with _registry_lock:
+        reader = _readers.get(key)
+        if reader is not None:
+            return reader
+        load_lock = _load_locks.setdefault(key, threading.Lock())
+
+    # Only callers of the same language set wait for a load, other languages stay available
+    with load_lock:
+        with _registry_lock:
+            reader = _readers.get(key)
+        if reader is None:
+            reader = _load_reader(key)
+            with _registry_lock:
+                _readers[key] = reader
+    return reader
+
+
+class OCRReaderPool:
+    """
+    Bounded pool of warm EasyOCR readers for concurrent OCR.
+    At most `size` readers are ever loaded; acquire() blocks until one is free,
+    so memory stays bounded however many images are queued. The readers are the
+    pool's own: a reader is never shared with get_ocr_reader() callers.
+    """
+
+    def __init__(self, size: Optional[int] = None, languages: Optional[Sequence[str]] = None):
+        self.size = size or settings.ocr_pool_size
+        self.languages = _language_key(languages)
+        self._idle: List[Any] = []
+        self._created = 0
+        self._available = threading.Condition()
+
+    @contextmanager
+    def acquire(self) -> Iterator[Any]:
+        reader = self._take()
+        try:
+            yield reader
+        finally:
+            with self._available:
+                self._idle.append(reader)
+                self._available.notify()
+
+    def warm(self) -> None:
+        """Load all readers up front instead of on first use"""
+        while (reader := self._create()) is not None:
+            with self._available:
+                self._idle.append(reader)
+                self._available.notify()
+
+    def _take(self) -> Any:
+        while True:
+            with self._available:
+                # Pool is full - wait for a reader to be released (or a failed load to free its slot)
+                while not self._idle and self._created >= self.size:
+                    self._available.wait()
+                if self._idle:
+                    return self._idle.pop()
+
+            reader = self._create()
+            if reader is not None:
+                return reader
+
+    def _create(self) -> Optional[Any]:
+        with self._available:
+            if self._created >= self.size:
+                return None
+            self._created += 1
+
+        try:
+            return _load_reader(self.languages)
+        except BaseException:
+            with self._available:
+                self._created -= 1
+                self._available.notify()
+            raise
+
+
+def get_ocr_pool(size: Optional[int] = None, languages: Optional[Sequence[str]] = None) -> OCRReaderPool:
+    """Shared pool of warm readers per (language set, size)"""
+    key = (_language_key(languages), size or settings.ocr_pool_size)
+    with _registry_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = OCRReaderPool(size=key[1], languages=key[0])
+    return pool
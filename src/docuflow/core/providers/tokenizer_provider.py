@@ -0,0 +1,53 @@
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+from docuflow.configs import settings
+from docuflow.utils import get_logger
+
+logger = get_logger(__name__)
+
+# Process-wide registry: one loaded tokenizer per model
+_tokenizers: Dict[str, Any] = {}
+_registry_lock = threading.Lock()
+
+
+def get_tokenizer(model_name: Optional[str] = None) -> Any:
+    """Fast (Rust) tokenizer of the embedding model, loaded on first use and reused afterwards"""
+    name = model_name or settings.embedding_model
+    with _registry_lock:
+        tokenizer = _tokenizers.get(name)
+        if tokenizer is None:
+            # transformers is heavy - only import it once token counting is actually needed
+            from transformers import AutoTokenizer
+
+            logger.info(f"Loading tokenizer for {name}")
+            tokenizer = _tokenizers[name] = AutoTokenizer.from_pretrained(name, use_fast=True)
+    return tokenizer
+
+
+class TokenCounter:
+    """
+    Batched token counts with the embedding model's tokenizer.
+    Callable on a list of texts, so it plugs into MarkdownChunker as its length function.
+    """
+
+    def __init__(self, tokenizer: Optional[Any] = None):
+        self.tokenizer = tokenizer or get_tokenizer()
+
+    @property
+    def max_tokens(self) -> int:
+        """Content tokens that fit in one forward pass (max length minus special tokens)"""
+        max_length = min(self.tokenizer.model_max_length, settings.embedding_max_length)
+        return max_length - self.tokenizer.num_special_tokens_to_add()
+
+    def __call__(self, texts: Sequence[str]) -> List[int]:
+        if not texts:
+            return []
+        encoded = self.tokenizer(
+            list(texts),
+            add_special_tokens=False,
+            return_attention_mask=False,
+            return_token_type_ids=False,
+            verbose=False,
+        )
+        return [len(ids) for ids in encoded["input_ids"]]
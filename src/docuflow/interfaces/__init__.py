@@ -1,6 +1,6 @@
 from docuflow.interfaces.loader import ILoader
 from docuflow.interfaces.retriever import IRetriever
-from docuflow.interfaces.text_embedder import ITextEmbedder
-from docuflow.interfaces.vector_store import IVectorStore
+from docuflow.interfaces.text_embedder import EmbeddingMatrix, Embeddings, ITextEmbedder
+from docuflow.interfaces.vector_store import IVectorStore, MetadataFilter
 
-__all__ = ["IVectorStore", "ITextEmbedder", "IRetriever", "ILoader"]
+__all__ = ["IVectorStore", "ITextEmbedder", "IRetriever", "ILoader", "EmbeddingMatrix", "Embeddings", "MetadataFilter"]
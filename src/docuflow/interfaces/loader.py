@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import List, Optional
 
 from docuflow.schemas import RawDocument
 
@@ -26,6 +26,19 @@ class ILoader(ABC):
         """
         pass
 
+    @abstractmethod
+    def load_metadata(self, source_path: str) -> Optional[dict]:
+        """
+        Fast path: file metadata only, the content is never read.
+
+        Args:
+            source_path: Path to file
+
+        Returns:
+            Metadata dict, or None if the file is missing or unsupported
+        """
+        pass
+
     @abstractmethod
     def load(self, source_path: str) -> List[RawDocument]:
         """
@@ -1,11 +1,30 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import List, Optional, Sequence
 
+from docuflow.interfaces.vector_store import MetadataFilter
 from docuflow.schemas import RetrievedChunk
+from docuflow.utils.aio import store_runner
 
 
 class IRetriever(ABC):
     @abstractmethod
-    def retrieve(self, query: str, top_k: int = 5) -> List[RetrievedChunk]:
-        """Return top_k relevant documents for query."""
+    def retrieve(self, query: str, top_k: int = 5, where: Optional[MetadataFilter] = None) -> List[RetrievedChunk]:
+        """Return top_k relevant documents for query, among chunks whose metadata matches `where`."""
         pass
+
+    def retrieve_many(
+        self, queries: Sequence[str], top_k: int = 5, where: Optional[MetadataFilter] = None
+    ) -> List[List[RetrievedChunk]]:
+        """Return top_k relevant documents for each query."""
+        return [self.retrieve(query, top_k, where) for query in queries]
+
+    async def aretrieve(
+        self, query: str, top_k: int = 5, where: Optional[MetadataFilter] = None
+    ) -> List[RetrievedChunk]:
+        return (await self.aretrieve_many([query], top_k, where))[0]
+
+    async def aretrieve_many(
+        self, queries: Sequence[str], top_k: int = 5, where: Optional[MetadataFilter] = None
+    ) -> List[List[RetrievedChunk]]:
+        """Async retrieve_many; retrievers with async stages override this, the default runs it in a worker"""
+        return await store_runner().run(self.retrieve_many, queries, top_k, where)
@@ -1,5 +1,14 @@
 from abc import ABC, abstractmethod
-from typing import List, Sequence
+from typing import List, Optional, Sequence, Union
+
+import numpy as np
+from numpy.typing import NDArray
+
+from docuflow.utils.aio import embedding_runner
+
+# Contiguous (n_texts, dim) float32 matrix - the zero-copy path between embedders and stores
+EmbeddingMatrix = NDArray[np.float32]
+Embeddings = Union[List[List[float]], EmbeddingMatrix]
 
 
 class ITextEmbedder(ABC):
@@ -9,6 +18,38 @@ class ITextEmbedder(ABC):
 
     """
 
+    # Identifies the vectors produced (model + precision), e.g. to key caches; None if unknown
+    model_id: Optional[str] = None
+
     @abstractmethod
     def embed(self, texts: Sequence[str]) -> List[List[float]]:
         pass
+
+    def embed_array(self, texts: Sequence[str]) -> EmbeddingMatrix:
+        """
+        Embed into one contiguous float32 matrix.
+        Backends should override this to fill a preallocated buffer; the default
+        goes through the list API for compatibility.
+        """
+        return np.asarray(self.embed(texts), dtype=np.float32)
+
+    def embed_queries(self, queries: Sequence[str]) -> EmbeddingMatrix:
+        """
+        Embed search queries into a float32 matrix.
+        Models with a query instruction (BGE) override this; by default queries
+        are embedded like passages.
+        """
+        return self.embed_array(queries)
+
+    # ===== ASYNC =====
+    # Blocking calls run on the shared embedding runner: concurrent callers queue
+    # for the model instead of each holding a thread of the event loop's executor.
+
+    async def aembed(self, texts: Sequence[str]) -> List[List[float]]:
+        return await embedding_runner().run(self.embed, texts)
+
+    async def aembed_array(self, texts: Sequence[str]) -> EmbeddingMatrix:
+        return await embedding_runner().run(self.embed_array, texts)
+
+    async def aembed_queries(self, queries: Sequence[str]) -> EmbeddingMatrix:
+        return await embedding_runner().run(self.embed_queries, queries)
@@ -1,5 +1,13 @@
 from abc import ABC, abstractmethod
-from typing import Any, List, Mapping
+from typing import Any, List, Mapping, Optional, Sequence
+
+from docuflow.interfaces.text_embedder import Embeddings
+from docuflow.utils.aio import store_runner
+
+# Chroma-style metadata filter, e.g. {"source": "a.pdf"}, {"page": {"$gte": 3}},
+# {"Header 1": {"$in": ["Intro", "Scope"]}}, {"$and": [...]}, {"$or": [...]}.
+# Operators: $eq $ne $gt $gte $lt $lte $in $nin; several keys in one dict are ANDed.
+MetadataFilter = Mapping[str, Any]
 
 
 class IVectorStore(ABC):
@@ -15,9 +23,9 @@ class IVectorStore(ABC):
         ids: List[str],
         documents: List[str],
         metadata: List[Mapping[str, Any]],
-        embeddings: List[List[float]],
+        embeddings: Embeddings,
     ) -> None:
-        """Add documents, embeddings, and metadata to the vector store."""
+        """Add documents, embeddings (lists or a float32 matrix), and metadata to the vector store."""
         pass
 
     @abstractmethod
@@ -25,10 +33,81 @@ class IVectorStore(ABC):
         self,
         query_embedding: List[float],
         n_results: int = 5,
+        where: Optional[MetadataFilter] = None,
+    ) -> dict[str, Any]:
+        """Return top `n_results` from the vector store matching `query_embedding`, among records matching `where`."""
+        pass
+
+    def query_batch(
+        self,
+        query_embeddings: Embeddings,
+        n_results: int = 5,
+        where: Optional[MetadataFilter] = None,
+    ) -> dict[str, Any]:
+        """
+        Top `n_results` for each query embedding (rows of a matrix), one result list per query.
+        Backends override this with a single batched search; the default queries one by one.
+        """
+        merged: dict[str, Any] = {}
+        for query_embedding in query_embeddings:
+            results = self.query(list(query_embedding), n_results, where)
+            for key, values in results.items():
+                if isinstance(values, list):
+                    merged.setdefault(key, []).extend(values)
+        return merged
+
+    @abstractmethod
+    def get(
+        self,
+        ids: Optional[List[str]] = None,
+        where: Optional[MetadataFilter] = None,
+        include: Sequence[str] = ("documents", "metadatas"),
     ) -> dict[str, Any]:
-        """Return top `n_results` from the vector store matching `query_embedding`."""
+        """
+        Return stored records by id and/or metadata filter. `include=()` returns ids only,
+        "embeddings" adds the stored vectors (one row per id).
+        """
         pass
 
     @abstractmethod
     def delete(self, ids: List[str]) -> None:
         pass
+
+    # ===== ASYNC =====
+    # Run on the shared store runner, one client serves all concurrent callers.
+
+    async def aadd(
+        self,
+        ids: List[str],
+        documents: List[str],
+        metadata: List[Mapping[str, Any]],
+        embeddings: Embeddings,
+    ) -> None:
+        await store_runner().run(self.add, ids, documents, metadata, embeddings)
+
+    async def aquery(
+        self,
+        query_embedding: List[float],
+        n_results: int = 5,
+        where: Optional[MetadataFilter] = None,
+    ) -> dict[str, Any]:
+        return await store_runner().run(self.query, query_embedding, n_results, where)
+
+    async def aquery_batch(
+        self,
+        query_embeddings: Embeddings,
+        n_results: int = 5,
+        where: Optional[MetadataFilter] = None,
+    ) -> dict[str, Any]:
+        return await store_runner().run(self.query_batch, query_embeddings, n_results, where)
+
+    async def aget(
+        self,
+        ids: Optional[List[str]] = None,
+        where: Optional[MetadataFilter] = None,
+        include: Sequence[str] = ("documents", "metadatas"),
+    ) -> dict[str, Any]:
+        return await store_runner().run(self.get, ids, where, include)
+
+    async def adelete(self, ids: List[str]) -> None:
+        await store_runner().run(self.delete, ids)
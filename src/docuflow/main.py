@@ -1,8 +1,66 @@
+import asyncio
+
 from docuflow.configs import settings
+from docuflow.core.ingestion.dedup import ChunkDeduplicator
 from docuflow.core.ingestion.ingestion_pipeline import IngestionPipeline
-from docuflow.services import BGETextEmbedder, ChromaVectorStore
+from docuflow.core.ingestion.manifest import IngestionManifest
+from docuflow.interfaces import IRetriever, ITextEmbedder, IVectorStore
+from docuflow.services import (
+    BGETextEmbedder,
+    BM25Index,
+    CachedTextEmbedder,
+    ChromaVectorStore,
+    FlatVectorStore,
+    HybridRetriever,
+    ONNXTextEmbedder,
+    QueryServer,
+    VectorRetriever,
+)
 from docuflow.utils import ensure_directories, get_logger
 
+COLLECTION_NAME = "my_docuflow_collection"
+
+
+def build_embedder() -> ITextEmbedder:
+    """Embedding backend selected in settings, behind the embedding cache when enabled"""
+    embedder: ITextEmbedder
+    if settings.embedding_backend == "onnx":
+        embedder = ONNXTextEmbedder()
+    elif settings.embedding_backend == "bge":
+        embedder = BGETextEmbedder()
+    else:
+        raise ValueError(f"Unknown embedding backend: {settings.embedding_backend}")
+    if settings.embedding_cache_enabled:
+        embedder = CachedTextEmbedder(embedder)
+    return embedder
+
+
+def build_vector_store() -> IVectorStore:
+    """Vector store backend selected in settings"""
+    if settings.vector_store_backend == "flat":
+        return FlatVectorStore(db_path=settings.db_path, collection_name=COLLECTION_NAME)
+    if settings.vector_store_backend == "chroma":
+        return ChromaVectorStore(db_path=settings.db_path, collection_name=COLLECTION_NAME)
+    raise ValueError(f"Unknown vector store backend: {settings.vector_store_backend}")
+
+
+def build_retriever() -> IRetriever:
+    """Retriever over the configured store, hybrid when the lexical index is enabled"""
+    retriever = VectorRetriever(embedder=build_embedder(), vector_store=build_vector_store())
+    if settings.lexical_index_enabled:
+        return HybridRetriever(retriever, BM25Index(settings.lexical_index_path))
+    return retriever
+
+
+def serve() -> None:
+    """Run the query server until interrupted"""
+    get_logger(__name__).info("Starting Docuflow query server")
+    server = QueryServer(build_retriever())
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
 
 def main() -> None:
     logger = get_logger(__name__)
@@ -12,26 +70,41 @@ def main() -> None:
     ensure_directories()
 
     logger.info("Starting Embedding Phase")
-    embedder = BGETextEmbedder()
+    embedder = build_embedder()
 
     logger.info("Starting Vectorising")
-    vector_store = ChromaVectorStore(
-        db_path=settings.db_path,
-        collection_name="my_docuflow_collection",
-    )
+    vector_store = build_vector_store()
+
+    lexical_index = None
+    if settings.lexical_index_enabled:
+        lexical_index = BM25Index(settings.lexical_index_path)
+        if lexical_index.count() == 0:
+            # turned on for an existing collection
+            lexical_index.rebuild_from(vector_store)
 
     pipeline = IngestionPipeline(
         embedder=embedder,
         vector_store=vector_store,
+        manifest=IngestionManifest(settings.manifest_path),
+        deduplicator=ChunkDeduplicator(settings.dedup_path) if settings.dedup_enabled else None,
+        lexical_index=lexical_index,
     )
 
     pdf_files = list(settings.pdf_dir.glob("*.pdf"))
 
     if not pdf_files:
-        return
-
-    for pdf in pdf_files:
-        pipeline.ingest(pdf)
+        logger.warning(f"No pdf files found in {settings.pdf_dir}")
+    # purges removed files only when enabled, and never for an empty directory
+    report = pipeline.sync(pdf_files)
+    logger.info(f"Skipped {report.total_skipped} unchanged files, ingested {report.total_ingested}")
+    if settings.dedup_enabled:
+        logger.info(
+            f"Deduplicated {report.chunks_duplicate} of {report.chunks_checked} chunks ({report.dedup_ratio:.1%})"
+        )
+    if isinstance(vector_store, FlatVectorStore) and vector_store.dead_ratio >= settings.flat_compact_dead_ratio:
+        vector_store.compact()
+    if isinstance(embedder, CachedTextEmbedder):
+        logger.info(f"Embedding cache stats: {embedder.stats()}")
 
 
 if __name__ == "__main__":
@@ -1,4 +1,6 @@
-from docuflow.schemas.raw_document import RawDocument
+from docuflow.schemas.ingestion_report import IngestionReport
+from docuflow.schemas.ocr_result import OCRResult
+from docuflow.schemas.raw_document import FileContent, RawDocument
 from docuflow.schemas.retrieved_chunk import RetrievedChunk
 
-__all__ = ["RetrievedChunk", "RawDocument"]
+__all__ = ["RetrievedChunk", "RawDocument", "FileContent", "IngestionReport", "OCRResult"]
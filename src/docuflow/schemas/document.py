@@ -1,4 +1,4 @@
-from typing import Dict
+from typing import Dict, Optional
 
 from pydantic import BaseModel, Field
 
@@ -15,3 +15,7 @@ class Document(BaseModel):
         default_factory=dict,
         description="Optional metadata about the document (source, page number, etc.)",
     )
+
+    # Kept out of metadata so chunk ids (content + metadata hash) do not depend on position
+    start_index: Optional[int] = Field(default=None, description="Offset in the source markdown where the chunk starts")
+    end_index: Optional[int] = Field(default=None, description="Offset in the source markdown where the chunk ends")
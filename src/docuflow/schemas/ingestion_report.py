@@ -0,0 +1,43 @@
+from dataclasses import dataclass, field
+from typing import Dict
+
+
+@dataclass
+class IngestionReport:
+    """
+    Outcome of one ingestion run over a set of files.
+    Counters are keyed by the reason the manifest gave for each file.
+    """
+
+    ingested: Dict[str, int] = field(default_factory=dict)  # reason -> count ("new", "modified", ...)
+    skipped: Dict[str, int] = field(default_factory=dict)  # reason -> count ("unchanged", ...)
+    purged: int = 0  # files removed from disk whose chunks were deleted
+    failed: Dict[str, str] = field(default_factory=dict)  # source -> error message
+    chunks_checked: int = 0  # new chunks that went through deduplication
+    chunks_duplicate: int = 0  # of those, exact or near duplicates that were not embedded
+
+    def count_ingested(self, reason: str) -> None:
+        self.ingested[reason] = self.ingested.get(reason, 0) + 1
+
+    def count_skipped(self, reason: str) -> None:
+        self.skipped[reason] = self.skipped.get(reason, 0) + 1
+
+    @property
+    def total_ingested(self) -> int:
+        return sum(self.ingested.values())
+
+    @property
+    def total_skipped(self) -> int:
+        return sum(self.skipped.values())
+
+    @property
+    def dedup_ratio(self) -> float:
+        return self.chunks_duplicate / self.chunks_checked if self.chunks_checked else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"ingested={self.total_ingested} {self.ingested} | "
+            f"skipped={self.total_skipped} {self.skipped} | "
+            f"purged={self.purged} | failed={len(self.failed)} | "
+            f"duplicates={self.chunks_duplicate}/{self.chunks_checked} ({self.dedup_ratio:.1%})"
+        )
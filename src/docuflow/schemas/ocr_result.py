@@ -0,0 +1,13 @@
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class OCRResult:
+    """Text extracted from one image by batch OCR, with per-image timing"""
+
+    source: str  # File path
+    text: str
+    decode_seconds: float
+    ocr_seconds: float
+    error: Optional[str] = None  # set instead of raising, so one bad image does not stop a batch
@@ -1,4 +1,53 @@
+import mmap
+from contextlib import contextmanager
 from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Iterator, Union
+
+
+class FileContent:
+    """
+    Lazy handle on a file's bytes - nothing is read until a parser asks for it.
+    buffer() memory-maps the file, so large files are paged in on demand
+    instead of being copied into RAM up front.
+    """
+
+    def __init__(self, path: Union[str, Path], size: int):
+        self.path = Path(path)
+        self.size = size
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __repr__(self) -> str:
+        return f"FileContent({str(self.path)!r}, size={self.size})"
+
+    def open(self) -> BinaryIO:
+        """Binary stream over the file, for parsers that read incrementally"""
+        return self.path.open("rb")
+
+    def read(self) -> bytes:
+        """Whole file as bytes (copies it into memory)"""
+        return self.path.read_bytes()
+
+    @contextmanager
+    def buffer(self) -> Iterator[memoryview]:
+        """Read-only memory-mapped view of the file, valid inside the with block"""
+        if self.size == 0:
+            # mmap cannot map an empty file
+            yield memoryview(b"")
+            return
+
+        with self.open() as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                yield view
+            finally:
+                view.release()
+
+    def text(self, encoding: str = "utf-8") -> str:
+        with self.buffer() as view:
+            return str(view, encoding)
 
 
 @dataclass
@@ -9,6 +58,15 @@ class RawDocument:
     Input to data processing layer.
     """
 
-    content: str  # Raw extracted text
+    content: Union[FileContent, bytes]  # Lazy file handle from loaders, or in-memory bytes
     source: str  # File path
     metadata: dict  # File metadata
+
+    @contextmanager
+    def buffer(self) -> Iterator[memoryview]:
+        """Content as a buffer, whether it is a file handle or in-memory bytes"""
+        if isinstance(self.content, FileContent):
+            with self.content.buffer() as view:
+                yield view
+        else:
+            yield memoryview(self.content)
@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 
 @dataclass
@@ -7,3 +7,4 @@ class RetrievedChunk:
     content: str
     score: float
     metadata: Dict[str, Any]
+    id: Optional[str] = None  # chunk id in the vector store
@@ -1,5 +1,42 @@
-from .bge_text_embedder import BGETextEmbedder
-from .chroma_vector_store import ChromaVectorStore
-from .retriever_chain import VectorRetriever
+from typing import TYPE_CHECKING
 
-__all__ = ["ChromaVectorStore", "BGETextEmbedder", "VectorRetriever"]
+from docuflow.utils.lazy import lazy_exports
+
+if TYPE_CHECKING:
+    from .bge_text_embedder import BGETextEmbedder
+    from .bm25_index import BM25Index
+    from .cached_text_embedder import CachedTextEmbedder
+    from .chroma_vector_store import ChromaVectorStore
+    from .flat_vector_store import FlatVectorStore
+    from .onnx_text_embedder import ONNXTextEmbedder
+    from .query_server import MicroBatcher, QueryServer
+    from .retriever_chain import HybridRetriever, VectorRetriever
+
+# Resolved on first use: importing docuflow.services must not pull in torch or chromadb
+_EXPORTS = {
+    "BGETextEmbedder": ".bge_text_embedder",
+    "BM25Index": ".bm25_index",
+    "CachedTextEmbedder": ".cached_text_embedder",
+    "ChromaVectorStore": ".chroma_vector_store",
+    "FlatVectorStore": ".flat_vector_store",
+    "HybridRetriever": ".retriever_chain",
+    "ONNXTextEmbedder": ".onnx_text_embedder",
+    "MicroBatcher": ".query_server",
+    "QueryServer": ".query_server",
+    "VectorRetriever": ".retriever_chain",
+}
+
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
+
+__all__ = [
+    "ChromaVectorStore",
+    "FlatVectorStore",
+    "BGETextEmbedder",
+    "ONNXTextEmbedder",
+    "CachedTextEmbedder",
+    "VectorRetriever",
+    "HybridRetriever",
+    "BM25Index",
+    "MicroBatcher",
+    "QueryServer",
+]
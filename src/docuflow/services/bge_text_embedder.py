@@ -1,25 +1,54 @@
-from typing import List, Sequence
+from typing import List, Optional, Sequence
 
 import numpy as np
-from FlagEmbedding import FlagModel
 
 from docuflow.configs import settings
-from docuflow.interfaces import ITextEmbedder
+from docuflow.interfaces import EmbeddingMatrix, ITextEmbedder
 from docuflow.utils import get_logger
 
+# Prepended to queries (not passages) by BGE retrieval models
+QUERY_INSTRUCTION = "Represent this sentence for searching relevant passages:"
+
+
+def bucket_by_length(lengths: Sequence[int], max_batch_tokens: int) -> List[List[int]]:
+    """Index batches whose padded size (batch size x longest text) stays within the token budget"""
+    # Ascending length: each new text is the longest so far, so the padded
+    # cost of the batch is simply (batch size x its length)
+    order = sorted(range(len(lengths)), key=lengths.__getitem__)
+
+    batches: List[List[int]] = []
+    current: List[int] = []
+    for i in order:
+        if current and (len(current) + 1) * lengths[i] > max_batch_tokens:
+            batches.append(current)
+            current = []
+        current.append(i)
+    if current:
+        batches.append(current)
+    return batches
+
 
 class BGETextEmbedder(ITextEmbedder):
-    def __init__(self, batch_size: int = 64):
+    def __init__(self, batch_size: int = 64, max_batch_tokens: Optional[int] = None):
         self.logger = get_logger(__name__)
 
         self.logger.info("Initializing BGE text embedding phase")
         self.batch_size = batch_size
+        # Token budget per batch (padded length x batch size); 0 keeps fixed-size batches
+        self.max_batch_tokens = (
+            max_batch_tokens if max_batch_tokens is not None else settings.embedding_max_batch_tokens
+        )
+
+        # FlagEmbedding pulls in torch + transformers, load it with the model only
+        from FlagEmbedding import FlagModel
 
         self.logger.info(f"Using {settings.embedding_model} model")
+        self.model_id = f"{settings.embedding_model}|fp16={settings.use_fp16}"
         self.model = FlagModel(
             settings.embedding_model,
-            query_instruction_for_retrieval=("Represent this sentence for searching relevant passages:"),
+            query_instruction_for_retrieval=QUERY_INSTRUCTION,
             use_fp16=settings.use_fp16,
+            passage_max_length=settings.embedding_max_length,
         )
 
     def embed(self, texts: Sequence[str]) -> List[List[float]]:
@@ -28,22 +57,70 @@ class BGETextEmbedder(ITextEmbedder):
             self.logger.error("No texts provided, returning empty list.")
             return []
 
+        return self.embed_array(texts).tolist()
+
+    def embed_array(self, texts: Sequence[str]) -> EmbeddingMatrix:
+        """Embed batch by batch into one preallocated float32 matrix"""
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
         try:
-            all_embeddings = []
+            all_embeddings: Optional[EmbeddingMatrix] = None
             self.logger.info("Started creating Embeddings")
-            for i in range(0, len(texts), self.batch_size):
-                batch = texts[i : i + self.batch_size]
-                embeddings = self.model.encode(list(batch))
-
-                if isinstance(embeddings, np.ndarray):
-                    all_embeddings.extend(embeddings.tolist())
-                elif isinstance(embeddings, list):
-                    all_embeddings.extend(embeddings)
-                else:
+            for indices in self._batches(texts):
+                batch = [texts[i] for i in indices]
+                embeddings = self.model.encode(batch, batch_size=len(batch))
+
+                if not isinstance(embeddings, (np.ndarray, list)):
                     raise ValueError("Embedding model output is in an unexpected format.")
+                # no copy when the model already returns float32
+                embeddings = np.asarray(embeddings, dtype=np.float32).reshape(len(batch), -1)
+
+                if all_embeddings is None:
+                    all_embeddings = np.empty((len(texts), embeddings.shape[1]), dtype=np.float32)
+                # scatter back so results keep the input order
+                all_embeddings[indices] = embeddings
+
+            assert all_embeddings is not None
             self.logger.info("Embeddings created Successfully")
             return all_embeddings
 
         except Exception as e:
             self.logger.error(f"Embedding failed for {len(texts)} texts: {e}")
             raise
+
+    def embed_queries(self, queries: Sequence[str]) -> EmbeddingMatrix:
+        """Embed queries with the retrieval instruction prepended (FlagModel.encode_queries)"""
+        if not queries:
+            return np.empty((0, 0), dtype=np.float32)
+
+        try:
+            embeddings = self.model.encode_queries(list(queries), batch_size=self.batch_size)
+            return np.asarray(embeddings, dtype=np.float32).reshape(len(queries), -1)
+        except Exception as e:
+            self.logger.error(f"Query embedding failed for {len(queries)} queries: {e}")
+            raise
+
+    def _batches(self, texts: Sequence[str]) -> List[List[int]]:
+        """Index batches: fixed-size in input order, or length-bucketed under the token budget"""
+        if not self.max_batch_tokens:
+            return [list(range(i, min(i + self.batch_size, len(texts)))) for i in range(0, len(texts), self.batch_size)]
+
+        batches = bucket_by_length(self._token_lengths(texts), self.max_batch_tokens)
+        self.logger.info(
+            f"Bucketed {len(texts)} texts into {len(batches)} batches of <= {self.max_batch_tokens} tokens"
+        )
+        return batches
+
+    def _token_lengths(self, texts: Sequence[str]) -> List[int]:
+        """Token counts (incl. special tokens, capped at the model max length) in one batched call"""
+        max_length = getattr(self.model, "passage_max_length", settings.embedding_max_length)
+        encoded = self.model.tokenizer(
+            list(texts),
+            add_special_tokens=True,
+            truncation=True,
+            max_length=max_length,
+            return_attention_mask=False,
+            return_token_type_ids=False,
+        )
+        return [len(ids) for ids in encoded["input_ids"]]
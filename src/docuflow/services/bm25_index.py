@@ -0,0 +1,229 @@
+import heapq
+import math
+import re
+import sqlite3
+import threading
+from collections import Counter
+from operator import itemgetter
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from docuflow.configs import settings
+from docuflow.interfaces import IVectorStore
+from docuflow.utils import get_logger
+
+# SQLite limits the number of bound parameters per statement
+_SQL_BATCH = 500
+
+_WORD_PATTERN = re.compile(r"\w+")
+# Codes joined by - . / : ("err-4021", "7.3.2", "xj/900")
+_CODE_PATTERN = re.compile(r"\w+(?:[-./:]\w+)+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased words; a code is indexed by its parts and also whole, so either form matches"""
+    text = text.lower()
+    return _WORD_PATTERN.findall(text) + _CODE_PATTERN.findall(text)
+
+
+class BM25Index:
+    """
+    Persistent BM25 inverted index over chunks, kept next to the vector store.
+    Postings are clustered by term in SQLite (one b-tree range per posting list),
+    so a query reads only the lists of its own terms. Updates are incremental:
+    adding a chunk id again replaces it, deleting removes its postings.
+
+    A query reads at most `max_postings` postings per term, highest tf first, so its
+    cost is bounded by terms x max_postings instead of the corpus size. Scores are
+    exact while every list fits; past that, a chunk beyond the cap of a common term
+    is scored without that term (its contribution there is the smallest of the list).
+    """
+
+    def __init__(
+        self,
+        db_file: Path,
+        k1: Optional[float] = None,
+        b: Optional[float] = None,
+        max_df: Optional[float] = None,
+        max_postings: Optional[int] = None,
+    ):
+        self.logger = get_logger(__name__)
+        self.k1 = k1 if k1 is not None else settings.bm25_k1
+        self.b = b if b is not None else settings.bm25_b
+        # terms in a larger share of the chunks carry almost no signal and have the longest lists
+        self.max_df = max_df if max_df is not None else settings.bm25_max_df
+        self.max_postings = max_postings if max_postings is not None else settings.bm25_max_postings
+
+        self.db_file = Path(db_file)
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_file, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT NOT NULL,
+                chunk_id TEXT NOT NULL,
+                tf INTEGER NOT NULL,
+                PRIMARY KEY (term, chunk_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS postings_by_tf ON postings (term, tf DESC);
+            CREATE TABLE IF NOT EXISTS terms (
+                term TEXT PRIMARY KEY,
+                df INTEGER NOT NULL
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS chunks (
+                chunk_id TEXT PRIMARY KEY,
+                source TEXT NOT NULL,
+                length INTEGER NOT NULL,
+                terms TEXT NOT NULL
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS stats (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO stats (key, value) VALUES ('chunks', 0), ('tokens', 0);
+            """
+        )
+        self._conn.commit()
+
+    def add(self, ids: Sequence[str], documents: Sequence[str], sources: Sequence[str]) -> None:
+        """Index chunks; ids already in the index are replaced"""
+        if not ids:
+            return
+
+        with self._lock:
+            try:
+                self._remove(ids)
+                # last occurrence of an id wins, like an upsert
+                latest = {chunk_id: position for position, chunk_id in enumerate(ids)}
+                chunks, postings = [], []
+                dfs: Counter = Counter()
+                for chunk_id, position in latest.items():
+                    counts = Counter(tokenize(documents[position]))
+                    chunks.append((chunk_id, sources[position], sum(counts.values()), " ".join(counts)))
+                    postings.extend((term, chunk_id, tf) for term, tf in counts.items())
+                    dfs.update(counts.keys())
+
+                # in key order, so each posting list is appended to once per batch
+                postings.sort(key=itemgetter(0))
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO chunks (chunk_id, source, length, terms) VALUES (?, ?, ?, ?)", chunks
+                )
+                self._conn.executemany("INSERT INTO postings (term, chunk_id, tf) VALUES (?, ?, ?)", postings)
+                self._conn.executemany(
+                    "INSERT INTO terms (term, df) VALUES (?, ?) ON CONFLICT (term) DO UPDATE SET df = df + excluded.df",
+                    sorted(dfs.items()),
+                )
+                self._bump_stats(len(chunks), sum(chunk[2] for chunk in chunks))
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                self.logger.error("Failed to index chunks", exc_info=True)
+                raise
+        self.logger.debug(f"Indexed {len(ids)} chunks for lexical search")
+
+    def delete(self, ids: Sequence[str]) -> None:
+        with self._lock:
+            try:
+                self._remove(ids)
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                self.logger.error("Failed to remove chunks from the lexical index", exc_info=True)
+                raise
+
+    def search(self, query: str, top_k: int = 5) -> List[Tuple[str, float]]:
+        """(chunk id, BM25 score) of the best `top_k` chunks, best first"""
+        query_terms = list(dict.fromkeys(tokenize(query)))
+        if not query_terms or top_k < 1:
+            return []
+
+        with self._lock:
+            n_chunks, n_tokens = self._stats()
+            if not n_chunks:
+                return []
+            marks = ",".join("?" * len(query_terms))
+            dfs = dict(self._conn.execute(f"SELECT term, df FROM terms WHERE term IN ({marks})", query_terms))
+            selective = [term for term in dfs if dfs[term] <= self.max_df * n_chunks]
+            terms = selective or list(dfs)
+            if not terms:
+                return []
+
+            # each list is a range of postings_by_tf, cut at max_postings (a negative LIMIT is none)
+            limit = self.max_postings if self.max_postings > 0 else -1
+            postings = [
+                (term, *posting)
+                for term in terms
+                for posting in self._conn.execute(
+                    """
+                    SELECT p.chunk_id, p.tf, c.length FROM postings p
+                    JOIN chunks c ON c.chunk_id = p.chunk_id
+                    WHERE p.term = ? ORDER BY p.tf DESC LIMIT ?
+                    """,
+                    (term, limit),
+                )
+            ]
+
+        average_length = n_tokens / n_chunks
+        idf = {term: math.log(1.0 + (n_chunks - dfs[term] + 0.5) / (dfs[term] + 0.5)) for term in terms}
+        scores: Dict[str, float] = {}
+        for term, chunk_id, tf, length in postings:
+            norm = self.k1 * (1.0 - self.b + self.b * length / average_length)
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + idf[term] * tf * (self.k1 + 1.0) / (tf + norm)
+
+        return heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+
+    def missing(self, ids: Sequence[str]) -> List[str]:
+        """Ids of `ids` that are not in the index"""
+        indexed = set()
+        with self._lock:
+            for start in range(0, len(ids), _SQL_BATCH):
+                batch = list(ids[start : start + _SQL_BATCH])
+                marks = ",".join("?" * len(batch))
+                rows = self._conn.execute(f"SELECT chunk_id FROM chunks WHERE chunk_id IN ({marks})", batch)
+                indexed.update(chunk_id for (chunk_id,) in rows)
+        return [chunk_id for chunk_id in ids if chunk_id not in indexed]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._stats()[0]
+
+    def rebuild_from(self, vector_store: IVectorStore) -> None:
+        """Index every chunk already in the vector store (when lexical search is turned on later)"""
+        records = vector_store.get(include=("documents", "metadatas"))
+        sources = [str((metadata or {}).get("source", "")) for metadata in records["metadatas"]]
+        self.logger.info(f"Building lexical index from {len(records['ids'])} stored chunks")
+        for start in range(0, len(records["ids"]), _SQL_BATCH):
+            end = start + _SQL_BATCH
+            self.add(records["ids"][start:end], records["documents"][start:end], sources[start:end])
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _remove(self, ids: Sequence[str]) -> None:
+        unique = list(dict.fromkeys(ids))
+        for start in range(0, len(unique), _SQL_BATCH):
+            batch = unique[start : start + _SQL_BATCH]
+            marks = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT chunk_id, length, terms FROM chunks WHERE chunk_id IN ({marks})", batch
+            ).fetchall()
+            if not rows:
+                continue
+
+            removed = [(term, chunk_id) for chunk_id, _, terms in rows for term in terms.split(" ") if term]
+            self._conn.executemany("DELETE FROM postings WHERE term = ? AND chunk_id = ?", removed)
+            self._conn.executemany("UPDATE terms SET df = df - 1 WHERE term = ?", [(term,) for term, _ in removed])
+            self._conn.executemany("DELETE FROM terms WHERE term = ? AND df <= 0", [(term,) for term, _ in removed])
+            self._conn.execute(f"DELETE FROM chunks WHERE chunk_id IN ({marks})", batch)
+            self._bump_stats(-len(rows), -sum(length for _, length, _ in rows))
+
+    def _bump_stats(self, chunks: int, tokens: int) -> None:
+        self._conn.executemany(
+            "UPDATE stats SET value = value + ? WHERE key = ?", [(chunks, "chunks"), (tokens, "tokens")]
+        )
+
+    def _stats(self) -> Tuple[int, int]:
+        stats = dict(self._conn.execute("SELECT key, value FROM stats"))
+        return stats["chunks"], stats["tokens"]
@@ -0,0 +1,179 @@
+import hashlib
+import sqlite3
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from docuflow.configs import settings
+from docuflow.interfaces import EmbeddingMatrix, ITextEmbedder
+from docuflow.utils import get_logger
+
+# SQLite limits the number of bound parameters per statement
+_SQL_BATCH = 500
+
+
+def normalize_text(text: str) -> str:
+    """Whitespace-insensitive form of a text, the tokenizer treats both the same"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class CachedTextEmbedder(ITextEmbedder):
+    """
+    Wraps any ITextEmbedder with an on-disk cache of float32 vectors.
+    Entries are keyed by (namespace, normalized text hash); the namespace defaults
+    to the wrapped embedder's model_id (model + precision), so switching either never
+    reuses stale vectors. The cache is capped in size and evicts least recently used entries.
+    """
+
+    def __init__(
+        self,
+        embedder: ITextEmbedder,
+        cache_path: Optional[Path] = None,
+        namespace: Optional[str] = None,
+        max_bytes: Optional[int] = None,
+    ):
+        self.logger = get_logger(__name__)
+        self.embedder = embedder
+        namespace = namespace or embedder.model_id
+        if not namespace:
+            raise ValueError(f"{type(embedder).__name__} has no model_id, pass the cache namespace explicitly")
+        self.namespace = namespace
+        self.max_bytes = max_bytes if max_bytes is not None else settings.embedding_cache_max_mb * 1024 * 1024
+
+        self.cache_path = Path(cache_path or settings.embedding_cache_path)
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.cache_path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key BLOB PRIMARY KEY,
+                vector BLOB NOT NULL,
+                last_used INTEGER NOT NULL
+            ) WITHOUT ROWID
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_lru ON embeddings (last_used)")
+        self._conn.commit()
+
+        row = self._conn.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0), COALESCE(MAX(last_used), 0) FROM embeddings")
+        self._total_bytes, self._clock = row.fetchone()
+        self.logger.info(f"Embedding cache at {self.cache_path}: {self._total_bytes / 1e6:.1f} MB")
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return self.embed_array(texts).tolist()
+
+    def embed_array(self, texts: Sequence[str]) -> EmbeddingMatrix:
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        keys = [self._key(text) for text in texts]
+        with self._lock:
+            found = self._lookup(set(keys))
+
+            # Embed each distinct missing text once, even if it repeats within the call
+            missing: Dict[bytes, str] = {}
+            for key, text in zip(keys, texts):
+                if key not in found and key not in missing:
+                    missing[key] = text
+
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            vectors = self.embedder.embed_array(list(missing.values()))
+            new_entries = dict(zip(missing, vectors))
+            with self._lock:
+                self._store(new_entries)
+            found.update(new_entries)
+
+        self.logger.info(f"Embedding cache: {len(texts) - len(missing)} hits, {len(missing)} misses")
+        dim = len(next(iter(found.values())))
+        out = np.empty((len(texts), dim), dtype=np.float32)
+        for row, key in enumerate(keys):
+            out[row] = found[key]
+        return out
+
+    def embed_queries(self, queries: Sequence[str]) -> EmbeddingMatrix:
+        # Query vectors differ from passage vectors; the retriever keeps its own query cache
+        return self.embedder.embed_queries(queries)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            hits, misses, total_bytes = self.hits, self.misses, self._total_bytes
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "size_mb": total_bytes / 1e6,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _key(self, text: str) -> bytes:
+        payload = f"{self.namespace}\x00{normalize_text(text)}"
+        return hashlib.sha256(payload.encode("utf-8")).digest()
+
+    def _lookup(self, keys: set[bytes]) -> Dict[bytes, np.ndarray]:
+        found: Dict[bytes, np.ndarray] = {}
+        key_list = list(keys)
+        for i in range(0, len(key_list), _SQL_BATCH):
+            batch = key_list[i : i + _SQL_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch)
+            for key, blob in rows:
+                found[key] = np.frombuffer(blob, dtype=np.float32)
+
+        if found:
+            # Touch hits so eviction drops the least recently used entries first
+            self._clock += 1
+            self._conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE key = ?", [(self._clock, key) for key in found]
+            )
+            self._conn.commit()
+        return found
+
+    def _store(self, entries: Dict[bytes, np.ndarray]) -> None:
+        # Another caller may have stored the same text meanwhile: replaced entries do not grow the cache
+        key_list = list(entries)
+        for i in range(0, len(key_list), _SQL_BATCH):
+            batch = key_list[i : i + _SQL_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(f"SELECT LENGTH(vector) FROM embeddings WHERE key IN ({placeholders})", batch)
+            self._total_bytes -= sum(size for (size,) in rows)
+
+        self._clock += 1
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+            [(key, vector.tobytes(), self._clock) for key, vector in entries.items()],
+        )
+        self._total_bytes += sum(vector.nbytes for vector in entries.values())
+        self._conn.commit()
+
+        if self._total_bytes > self.max_bytes:
+            self._evict()
+
+    def _evict(self) -> None:
+        # Evict down to 90% of the cap so we do not evict again on the next insert
+        target = int(self.max_bytes * 0.9)
+        victims = []
+        for key, size in self._conn.execute("SELECT key, LENGTH(vector) FROM embeddings ORDER BY last_used"):
+            if self._total_bytes <= target:
+                break
+            victims.append((key,))
+            self._total_bytes -= size
+
+        self._conn.executemany("DELETE FROM embeddings WHERE key = ?", victims)
+        self._conn.commit()
+        self.logger.info(f"Embedding cache evicted {len(victims)} entries")
@@ -1,57 +1,127 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, List, Mapping
+from typing import Any, List, Mapping, Optional, Sequence
 
-import chromadb
 import numpy as np
 
-from docuflow.interfaces import IVectorStore
+from docuflow.configs import settings
+from docuflow.interfaces import Embeddings, IVectorStore, MetadataFilter
 from docuflow.utils import get_logger
 
 
+def _chroma_where(where: MetadataFilter) -> dict:
+    """
+    Chroma accepts one key per filter dict and one operator per condition, and wants at
+    least two parts in an $and/$or: several keys or operators become an explicit $and.
+    """
+    parts: List[dict] = []
+    for key, condition in where.items():
+        if key in ("$and", "$or"):
+            if not condition:
+                raise ValueError(f"Empty {key} filter")
+            parts.append(_join(key, [_chroma_where(part) for part in condition]))
+        elif isinstance(condition, Mapping):
+            if not condition:
+                raise ValueError(f"Empty condition for {key!r}")
+            # a range such as {"$gte": 2, "$lte": 4} is one $and part per bound
+            parts.extend(
+                {key: {operator: list(value) if operator in ("$in", "$nin") else value}}
+                for operator, value in condition.items()
+            )
+        else:
+            parts.append({key: condition})
+    return _join("$and", parts)
+
+
+def _join(operator: str, parts: List[dict]) -> dict:
+    return parts[0] if len(parts) == 1 else {operator: parts}
+
+
 class ChromaVectorStore(IVectorStore):
-    def __init__(self, db_path: Path, collection_name: str):
+    def __init__(
+        self,
+        db_path: Path,
+        collection_name: str,
+        batch_size: Optional[int] = None,
+        write_workers: Optional[int] = None,
+    ):
         self.logger = get_logger(__name__)
 
+        import chromadb
+
         self.logger.info("Initializing Chroma Persistent Client")
         self.client = chromadb.PersistentClient(path=db_path)
 
         self.logger.info(f"Creating or loading collection: {collection_name}")
         self.collection = self.client.get_or_create_collection(name=collection_name, embedding_function=None)
 
+        # Chroma rejects an upsert larger than the client's max batch size
+        max_batch_size = self.client.get_max_batch_size()
+        batch_size = batch_size or settings.chroma_write_batch_size
+        self.batch_size = min(batch_size, max_batch_size) if batch_size else max_batch_size
+        self.write_workers = write_workers or settings.chroma_write_workers
+        self.write_retries = max(settings.chroma_write_retries, 1)
+        self.retry_backoff = settings.chroma_retry_backoff
+
     def add(
         self,
         ids: List[str],
         documents: List[str],
         metadata: List[Mapping[str, Any]],
-        embeddings: List[List[float]],
+        embeddings: Embeddings,
     ) -> None:
+        """
+        Upsert in batches of at most `batch_size` rows, `write_workers` batches in flight.
+        A failed batch is retried on its own; if it still fails the error is raised and
+        the batches already written stay (upserts are idempotent, so re-adding is safe).
+        """
         self.logger.debug(f"Adding {len(ids)} documents to collection")
-        # # Get the text and metadata from documents
-        # doc_data = get_meta_content_id(documents)
-
-        # # Generate embeddings using the embed_text method
-        # embeddings = self.embedding_service.embed_texts(doc_data["documents"])
+        # no copy when the embedder already produced a float32 matrix; batches are views of it
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        spans = [(start, min(start + self.batch_size, len(ids))) for start in range(0, len(ids), self.batch_size)]
+        if not spans:
+            return
 
-        # embeddings = np.array(embeddings)
+        started = time.perf_counter()
         try:
-            self.collection.upsert(
-                ids=ids,
-                documents=documents,
-                embeddings=np.array(embeddings),
-                metadatas=metadata,
-            )
-            self.logger.info(f"Successfully upserted {len(ids)} documents")
+            if len(spans) <= 1 or self.write_workers <= 1:
+                for start, end in spans:
+                    self._upsert_batch(ids, documents, metadata, embeddings, start, end)
+            else:
+                workers = min(self.write_workers, len(spans))
+                with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chroma-write") as executor:
+                    futures = [
+                        executor.submit(self._upsert_batch, ids, documents, metadata, embeddings, start, end)
+                        for start, end in spans
+                    ]
+                    try:
+                        for future in futures:
+                            future.result()
+                    except Exception:
+                        # batches not started yet are dropped
+                        for future in futures:
+                            future.cancel()
+                        raise
         except Exception:
             self.logger.error("Failed to add documents", exc_info=True)
             raise
 
-    def query(self, query_embedding: List[float], n_results: int = 5):
-        self.logger.debug(f"Querying collection with top {n_results} results")
+        elapsed = time.perf_counter() - started
+        self.logger.info(
+            f"Successfully upserted {len(ids)} documents in {len(spans)} batches "
+            f"({len(ids) / max(elapsed, 1e-9):.0f} rows/s)"
+        )
+
+    def query(self, query_embedding: List[float], n_results: int = 5, where: Optional[MetadataFilter] = None):
+        self.logger.debug(f"Querying collection with top {n_results} results (where={where})")
 
         try:
+            # filtered natively by Chroma's metadata index before the vector search
             results = self.collection.query(
                 query_embeddings=[query_embedding],
                 n_results=n_results,
+                where=_chroma_where(where) if where else None,
             )
             self.logger.info("Query executed successfully")
             return results
@@ -60,12 +130,79 @@ class ChromaVectorStore(IVectorStore):
             self.logger.error("Query failed", exc_info=True)
             raise
 
+    def query_batch(
+        self, query_embeddings: Embeddings, n_results: int = 5, where: Optional[MetadataFilter] = None
+    ) -> dict[str, Any]:
+        """All queries in one collection.query call, one result list per query"""
+        query_embeddings = np.asarray(query_embeddings, dtype=np.float32)
+        self.logger.debug(f"Querying collection with {len(query_embeddings)} queries, top {n_results} results")
+
+        try:
+            results = self.collection.query(
+                query_embeddings=query_embeddings,
+                n_results=n_results,
+                where=_chroma_where(where) if where else None,
+            )
+            self.logger.info(f"Batch query of {len(query_embeddings)} executed successfully")
+            return results
+
+        except Exception:
+            self.logger.error("Batch query failed", exc_info=True)
+            raise
+
+    def get(
+        self,
+        ids: Optional[List[str]] = None,
+        where: Optional[MetadataFilter] = None,
+        include: Sequence[str] = ("documents", "metadatas"),
+    ):
+        self.logger.debug(f"Fetching records (ids={len(ids) if ids else None}, where={where})")
+
+        try:
+            return self.collection.get(
+                ids=ids,
+                where=_chroma_where(where) if where else None,
+                include=list(include),
+            )
+        except Exception:
+            self.logger.error("Get operation failed", exc_info=True)
+            raise
+
     def delete(self, ids: List[str]):
         self.logger.debug(f"Deleting {len(ids)} documents")
 
         try:
-            self.collection.delete(ids=ids)
+            for start in range(0, len(ids), self.batch_size):
+                self.collection.delete(ids=ids[start : start + self.batch_size])
             self.logger.info(f"Deleted {len(ids)} documents")
         except Exception:
-            self.logger.error("Delete operation failed", exec_info=True)
+            self.logger.error("Delete operation failed", exc_info=True)
             raise
+
+    def _upsert_batch(
+        self,
+        ids: List[str],
+        documents: List[str],
+        metadata: List[Mapping[str, Any]],
+        embeddings: np.ndarray,
+        start: int,
+        end: int,
+    ) -> None:
+        for attempt in range(1, self.write_retries + 1):
+            try:
+                self.collection.upsert(
+                    ids=ids[start:end],
+                    documents=documents[start:end],
+                    embeddings=embeddings[start:end],
+                    metadatas=metadata[start:end],
+                )
+                return
+            except Exception as exc:
+                if attempt == self.write_retries:
+                    raise
+                delay = self.retry_backoff * 2 ** (attempt - 1)
+                self.logger.warning(
+                    f"Upsert of rows {start}-{end} failed (attempt {attempt}/{self.write_retries}): {exc}; "
+                    f"retrying in {delay:.1f}s"
+                )
+                time.sleep(delay)
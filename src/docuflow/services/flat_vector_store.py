@@ -0,0 +1,568 @@
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from docuflow.configs import settings
+from docuflow.interfaces import Embeddings, IVectorStore, MetadataFilter
+from docuflow.utils import get_logger
+
+# SQLite limits the number of bound parameters per statement
+_SQL_BATCH = 500
+
+_COMPARISONS = {"$eq": "=", "$ne": "!=", "$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}
+
+
+def _where_sql(where: MetadataFilter) -> Tuple[str, List[Any]]:
+    """SQL condition on `row` for a metadata filter, resolved through the metadata index"""
+    clauses: List[str] = []
+    params: List[Any] = []
+    for key, condition in where.items():
+        if key in ("$and", "$or"):
+            if not condition:
+                raise ValueError(f"Empty {key} filter")
+            parts = [_where_sql(part) for part in condition]
+            clauses.append("(" + (" AND " if key == "$and" else " OR ").join(sql for sql, _ in parts) + ")")
+            params.extend(param for _, part_params in parts for param in part_params)
+            continue
+
+        if not isinstance(condition, Mapping):
+            condition = {"$eq": condition}
+        for operator, value in condition.items():
+            if operator in ("$in", "$nin"):
+                values = list(value)
+                test = f"value {'NOT IN' if operator == '$nin' else 'IN'} ({','.join('?' * len(values))})"
+            elif operator in _COMPARISONS:
+                values = [value]
+                test = f"value {_COMPARISONS[operator]} ?"
+            else:
+                raise ValueError(f"Unsupported filter operator {operator!r}")
+            clauses.append(f"row IN (SELECT row FROM metadata_index WHERE key = ? AND {test})")
+            params.extend([key, *values])
+    return " AND ".join(clauses) or "1", params
+
+
+# First-pass codes kept next to the float32 vectors
+QUANTIZATIONS = ("none", "int8", "binary")
+# int8 codes are converted to float32 this many rows at a time, small enough to stay in cache
+_INT8_SUBBLOCK = 4096
+
+
+def _code_bytes(quantization: str, dim: int) -> int:
+    # int8 rows end with the float32 inverse norm of the code
+    return dim + 4 if quantization == "int8" else (dim + 7) // 8
+
+
+def _encode(quantization: str, vectors: np.ndarray) -> np.ndarray:
+    """int8: each row scaled to its max component; binary: sign bits packed 8 per byte"""
+    if quantization == "int8":
+        scale = 127.0 / np.maximum(np.abs(vectors).max(axis=1, keepdims=True), 1e-12)
+        codes = np.rint(vectors * scale).astype(np.int8)
+        inverse_norms = 1.0 / np.maximum(np.linalg.norm(codes.astype(np.float32), axis=1, keepdims=True), 1e-12)
+        return np.hstack([codes, inverse_norms.astype(np.float32).view(np.int8)])
+    return np.packbits(vectors > 0, axis=1)
+
+
+def _code_scores(quantization: str, codes: np.ndarray, queries: np.ndarray, dim: int) -> np.ndarray:
+    """Approximate cosine scores (rows, queries) of a block of codes"""
+    if quantization == "int8":
+        scores = np.empty((len(codes), len(queries)), dtype=np.float32)
+        for start in range(0, len(codes), _INT8_SUBBLOCK):
+            block = codes[start : start + _INT8_SUBBLOCK]
+            # a code is its unit vector scaled per row, the stored inverse norm undoes the scale
+            inverse_norms = np.ascontiguousarray(block[:, dim:]).view(np.float32)
+            scores[start : start + len(block)] = (block[:, :dim].astype(np.float32) @ queries.T) * inverse_norms
+        return scores
+
+    query_bits = np.packbits(queries > 0, axis=1)
+    scores = np.empty((len(codes), len(queries)), dtype=np.float32)
+    for q, bits in enumerate(query_bits):
+        hamming = np.bitwise_count(codes ^ bits).sum(axis=1, dtype=np.int32)
+        scores[:, q] = 1.0 - 2.0 * hamming / dim
+    return scores
+
+
+class FlatVectorStore(IVectorStore):
+    """
+    Exact in-process vector index: normalized float32 vectors in a memory-mapped
+    file, ids/documents/metadata in a SQLite side table.
+
+    Row i of the vector file belongs to the record with `row = i`; rows without a
+    record are tombstones (deleted or replaced by an upsert) until `compact()`
+    rewrites the file. Opening the store maps the file, nothing is copied.
+
+    With `quantization` "int8" or "binary" the first pass scans compact codes instead
+    (4x / 32x smaller) and only the best `n_results * oversample` candidates are
+    rescored against the float32 vectors, which then stay on disk except for the
+    pages of those candidates.
+
+    Distances are squared L2 between unit vectors (2 - 2 * cosine), as Chroma reports them.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        collection_name: str,
+        block_rows: Optional[int] = None,
+        quantization: Optional[str] = None,
+        oversample: Optional[int] = None,
+    ):
+        self.logger = get_logger(__name__)
+
+        self.directory = Path(db_path) / collection_name
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Rows scored per matrix multiply, bounds the temporary score matrix
+        self.block_rows = block_rows or settings.flat_query_block_rows
+        self.quantization = quantization or settings.flat_quantization
+        if self.quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization {self.quantization!r}, expected one of {QUANTIZATIONS}")
+        self.oversample = oversample or settings.flat_oversample
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.directory / "index.sqlite3", check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS records (
+                row INTEGER PRIMARY KEY,
+                id TEXT NOT NULL UNIQUE,
+                document TEXT,
+                metadata TEXT NOT NULL
+            );
+            DROP INDEX IF EXISTS records_source;
+            CREATE TABLE IF NOT EXISTS metadata_index (
+                key TEXT NOT NULL,
+                value,
+                row INTEGER NOT NULL,
+                PRIMARY KEY (key, value, row)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS metadata_index_row ON metadata_index (row);
+            CREATE TABLE IF NOT EXISTS info (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+
+        info = dict(self._conn.execute("SELECT key, value FROM info"))
+        self.dim: Optional[int] = int(info["dim"]) if "dim" in info else None
+        self._generation = int(info.get("generation", 0))
+        if (
+            self._conn.execute("SELECT 1 FROM records").fetchone()
+            and not self._conn.execute("SELECT 1 FROM metadata_index").fetchone()
+        ):
+            # index created before metadata filtering
+            self._index_metadata(0)
+            self._conn.commit()
+        self._open_vectors()
+        self.logger.info(f"Opened flat index {self.directory} ({self.count()} vectors, {len(self._ids)} rows)")
+
+    def add(
+        self,
+        ids: List[str],
+        documents: List[str],
+        metadata: List[Mapping[str, Any]],
+        embeddings: Embeddings,
+    ) -> None:
+        """Append vectors; an existing id is replaced (its old row becomes a tombstone)"""
+        if not ids:
+            return
+
+        vectors = self._normalize(np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1))
+        self.logger.debug(f"Adding {len(ids)} documents to flat index")
+        # last occurrence wins, like an upsert
+        latest = {chunk_id: position for position, chunk_id in enumerate(ids)}
+        positions = sorted(latest.values())
+        # serialized before any file is touched, so bad metadata fails cleanly
+        records = [(ids[position], documents[position], json.dumps(dict(metadata[position]))) for position in positions]
+
+        with self._lock:
+            new_index = self.dim is None
+            if new_index:
+                self.dim = vectors.shape[1]
+                self._conn.execute("INSERT OR REPLACE INTO info (key, value) VALUES ('dim', ?)", (str(self.dim),))
+                self._open_vectors()
+            if vectors.shape[1] != self.dim:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match the index ({self.dim})")
+
+            first_row = len(self._ids)
+            try:
+                replaced = self._rows_of(list(latest))
+                # vectors first: rows without a record are ignored if we crash before the commit
+                with open(self._vectors_path(), "ab") as f:
+                    f.write(vectors[positions].tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+                if self.quantization != "none":
+                    # rebuilt from the vectors on open if this append is lost
+                    with open(self._codes_path(), "ab") as f:
+                        f.write(_encode(self.quantization, vectors[positions]).tobytes())
+
+                if replaced:
+                    self._delete_rows(list(replaced.values()))
+                self._conn.executemany(
+                    "INSERT INTO records (row, id, document, metadata) VALUES (?, ?, ?, ?)",
+                    [(first_row + offset, *record) for offset, record in enumerate(records)],
+                )
+                self._index_metadata(first_row)
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                # drop the appended rows, or the next add would number its records from the wrong row
+                self._truncate_files(first_row)
+                if new_index:
+                    self.dim = None
+                    self._open_vectors()
+                self.logger.error("Failed to add documents", exc_info=True)
+                raise
+
+            self._ids.extend(ids[position] for position in positions)
+            self._open_vectors(reload_ids=False)
+            self._live[list(replaced.values())] = False
+        self.logger.info(f"Successfully upserted {len(positions)} documents")
+
+    def query(
+        self, query_embedding: List[float], n_results: int = 5, where: Optional[MetadataFilter] = None
+    ) -> dict[str, Any]:
+        self.logger.debug(f"Querying flat index with top {n_results} results")
+        return self.query_batch([query_embedding], n_results, where)
+
+    def query_batch(
+        self, query_embeddings: Embeddings, n_results: int = 5, where: Optional[MetadataFilter] = None
+    ) -> dict[str, Any]:
+        """
+        Top `n_results` for each row of a query matrix, one result list per query.
+        With `where`, only the rows matching the filter are scored.
+        """
+        queries = self._normalize(np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32)))
+        with self._lock:
+            if self.dim is not None and queries.shape[1] != self.dim:
+                raise ValueError(f"Query dimension {queries.shape[1]} does not match the index ({self.dim})")
+            candidates = None
+            if where:
+                sql, params = _where_sql(where)
+                candidates = np.fromiter(
+                    (row for (row,) in self._conn.execute(f"SELECT row FROM records WHERE {sql} ORDER BY row", params)),
+                    dtype=np.int64,
+                )
+            rows, scores = self._top_k(queries, n_results, candidates)
+            ids = [[self._ids[row] for row in query_rows] for query_rows in rows]
+            records = self._records([chunk_id for query_ids in ids for chunk_id in query_ids])
+
+        return {
+            "ids": ids,
+            "documents": [[records[chunk_id][0] for chunk_id in query_ids] for query_ids in ids],
+            "metadatas": [[records[chunk_id][1] for chunk_id in query_ids] for query_ids in ids],
+            "distances": [(2.0 - 2.0 * query_scores).tolist() for query_scores in scores],
+        }
+
+    def get(
+        self,
+        ids: Optional[List[str]] = None,
+        where: Optional[MetadataFilter] = None,
+        include: Sequence[str] = ("documents", "metadatas"),
+    ) -> dict[str, Any]:
+        self.logger.debug(f"Fetching records (ids={len(ids) if ids else None}, where={where})")
+
+        clauses: List[str] = []
+        params: List[Any] = []
+        if where:
+            sql, params = _where_sql(where)
+            clauses.append(sql)
+
+        if ids is None:
+            batches: List[Optional[List[str]]] = [None]
+        else:
+            batches = [ids[start : start + _SQL_BATCH] for start in range(0, len(ids), _SQL_BATCH)]
+        rows = []
+        with self._lock:
+            for batch in batches:
+                batch_clauses = list(clauses)
+                if batch is not None:
+                    batch_clauses.append(f"id IN ({','.join('?' * len(batch))})")
+                sql = "SELECT id, document, metadata, row FROM records"
+                if batch_clauses:
+                    sql += " WHERE " + " AND ".join(batch_clauses)
+                rows.extend(self._conn.execute(sql + " ORDER BY row", params + (batch or [])).fetchall())
+            if "embeddings" in include:
+                # unit vectors, as stored
+                embeddings = np.array(self._vectors[[row[3] for row in rows]], dtype=np.float32)
+
+        result: Dict[str, Any] = {"ids": [row[0] for row in rows]}
+        if "documents" in include:
+            result["documents"] = [row[1] for row in rows]
+        if "metadatas" in include:
+            result["metadatas"] = [json.loads(row[2]) for row in rows]
+        if "embeddings" in include:
+            result["embeddings"] = embeddings
+        return result
+
+    def delete(self, ids: List[str]) -> None:
+        """Tombstone the rows of `ids`; the vectors stay in the file until compact()"""
+        self.logger.debug(f"Deleting {len(ids)} documents")
+        with self._lock:
+            rows = list(self._rows_of(ids).values())
+            try:
+                self._delete_rows(rows)
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                self.logger.error("Delete operation failed", exc_info=True)
+                raise
+            self._live[rows] = False
+        self.logger.info(f"Deleted {len(rows)} documents")
+
+    def count(self) -> int:
+        """Live vectors"""
+        return int(self._live.sum())
+
+    @property
+    def dead_ratio(self) -> float:
+        """Share of the vector file taken by tombstones"""
+        return 1.0 - self.count() / len(self._ids) if self._ids else 0.0
+
+    def compact(self) -> None:
+        """Rewrite the vector file with live rows only and renumber the records"""
+        with self._lock:
+            live_rows = np.flatnonzero(self._live)
+            if len(live_rows) == len(self._ids):
+                return
+
+            self.logger.info(f"Compacting flat index: {len(self._ids)} -> {len(live_rows)} rows")
+            old_path = self._vectors_path()
+            self._generation += 1
+            new_path = self._vectors_path()
+            with open(new_path, "wb") as f:
+                for start in range(0, len(live_rows), self.block_rows):
+                    f.write(np.ascontiguousarray(self._vectors[live_rows[start : start + self.block_rows]]).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            if self.quantization != "none":
+                with open(self._codes_path(), "wb") as f:
+                    for start in range(0, len(live_rows), self.block_rows):
+                        f.write(np.ascontiguousarray(self._codes[live_rows[start : start + self.block_rows]]).tobytes())
+
+            # One transaction switches records and file; a crash leaves the old generation intact
+            try:
+                self._conn.execute("UPDATE records SET row = -1 - row")
+                self._conn.executemany(
+                    "UPDATE records SET row = ? WHERE row = ?",
+                    [(new_row, -1 - int(old_row)) for new_row, old_row in enumerate(live_rows)],
+                )
+                self._conn.execute("DELETE FROM metadata_index")
+                self._index_metadata(0)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO info (key, value) VALUES ('generation', ?)", (str(self._generation),)
+                )
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                self._generation -= 1
+                new_path.unlink(missing_ok=True)
+                self._codes_path(self._generation + 1).unlink(missing_ok=True)
+                self.logger.error("Compaction failed", exc_info=True)
+                raise
+
+            self._vectors = self._codes = None
+            old_path.unlink(missing_ok=True)
+            self._codes_path(self._generation - 1).unlink(missing_ok=True)
+            self._open_vectors()
+
+    def close(self) -> None:
+        with self._lock:
+            self._vectors = self._codes = None
+            self._conn.close()
+
+    def _vectors_path(self) -> Path:
+        return self.directory / f"vectors-{self._generation}.f32"
+
+    def _codes_path(self, generation: Optional[int] = None) -> Path:
+        generation = self._generation if generation is None else generation
+        return self.directory / f"codes-{generation}.{self.quantization}"
+
+    def _open_vectors(self, reload_ids: bool = True) -> None:
+        """Map the vector file (no copy) and rebuild the row -> id table and live mask"""
+        path = self._vectors_path()
+        for stale in [*self.directory.glob("vectors-*.f32"), *self.directory.glob("codes-*")]:
+            if stale not in (path, self._codes_path()):
+                # left over from an interrupted compaction or another quantization
+                stale.unlink()
+
+        n_rows = 0
+        if self.dim:
+            row_bytes = self.dim * 4
+            path.touch(exist_ok=True)
+            size = path.stat().st_size
+            n_rows = size // row_bytes
+            if size % row_bytes:
+                # torn append
+                with open(path, "r+b") as f:
+                    f.truncate(n_rows * row_bytes)
+
+        if n_rows:
+            self._vectors = np.memmap(path, dtype=np.float32, mode="r", shape=(n_rows, self.dim))
+        else:
+            self._vectors = np.empty((0, self.dim or 0), dtype=np.float32)
+        self._open_codes(n_rows)
+
+        if reload_ids:
+            self._ids: List[Optional[str]] = [None] * n_rows
+            self._live = np.zeros(n_rows, dtype=bool)
+            for row, chunk_id in self._conn.execute("SELECT row, id FROM records"):
+                if row < n_rows:
+                    self._ids[row] = chunk_id
+                    self._live[row] = True
+        else:
+            # rows appended since the last mapping are all live
+            self._live = np.concatenate([self._live, np.ones(n_rows - len(self._live), dtype=bool)])
+            self._ids.extend([None] * (n_rows - len(self._ids)))
+
+    def _truncate_files(self, n_rows: int) -> None:
+        """Cut the vector and code files back to `n_rows` rows"""
+        assert self.dim is not None
+        files = [(self._vectors_path(), self.dim * 4)]
+        if self.quantization != "none":
+            files.append((self._codes_path(), _code_bytes(self.quantization, self.dim)))
+        for path, row_bytes in files:
+            if path.exists() and path.stat().st_size > n_rows * row_bytes:
+                with open(path, "r+b") as f:
+                    f.truncate(n_rows * row_bytes)
+
+    def _open_codes(self, n_rows: int) -> None:
+        """Map the first-pass codes, encoding rows the code file is missing"""
+        self._codes: Optional[np.ndarray] = None
+        if self.quantization == "none" or not self.dim:
+            return
+
+        path = self._codes_path()
+        row_bytes = _code_bytes(self.quantization, self.dim)
+        path.touch(exist_ok=True)
+        n_codes = min(path.stat().st_size // row_bytes, n_rows)
+        with open(path, "r+b") as f:
+            f.truncate(n_codes * row_bytes)
+            f.seek(0, os.SEEK_END)
+            if n_codes < n_rows:
+                self.logger.info(f"Encoding {n_rows - n_codes} vectors as {self.quantization} codes")
+            for start in range(n_codes, n_rows, self.block_rows):
+                f.write(_encode(self.quantization, self._vectors[start : start + self.block_rows]).tobytes())
+
+        if n_rows:
+            dtype = np.int8 if self.quantization == "int8" else np.uint8
+            self._codes = np.memmap(path, dtype=dtype, mode="r", shape=(n_rows, row_bytes))
+
+    def _top_k(
+        self, queries: np.ndarray, k: int, candidates: Optional[np.ndarray] = None
+    ) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+        """Rows and cosine scores of the best `k` live vectors per query (among `candidates`), best first"""
+        if self._codes is None:
+            return self._scan(queries, k, lambda selection: self._vectors[selection] @ queries.T, candidates)
+
+        # First pass over the codes, then exact scores for the candidates only
+        shortlist, _ = self._scan(
+            queries,
+            k * self.oversample,
+            lambda selection: _code_scores(self.quantization, self._codes[selection], queries, self.dim),
+            candidates,
+        )
+        rows, scores = [], []
+        for query, query_rows in zip(queries, shortlist):
+            query_rows = np.sort(query_rows)  # sequential reads from the vector file
+            exact = self._vectors[query_rows] @ query
+            order = np.argsort(-exact, kind="stable")[:k]
+            rows.append(query_rows[order])
+            scores.append(exact[order])
+        return rows, scores
+
+    def _scan(
+        self,
+        queries: np.ndarray,
+        k: int,
+        score_block: Callable[[Any], np.ndarray],
+        candidates: Optional[np.ndarray] = None,
+    ) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+        """
+        Block-wise top `k` live rows per query, `score_block(selection) -> (rows, queries)`.
+        Blocks are slices of the whole file, or of the `candidates` rows when filtered.
+        """
+        n_queries = len(queries)
+        if k < 1:
+            return [np.empty(0, dtype=np.int64)] * n_queries, [np.empty(0, dtype=np.float32)] * n_queries
+
+        best_rows = np.empty((0, n_queries), dtype=np.int64)
+        best_scores = np.empty((0, n_queries), dtype=np.float32)
+
+        n_rows = len(self._ids) if candidates is None else len(candidates)
+        for start in range(0, n_rows, self.block_rows):
+            end = min(start + self.block_rows, n_rows)
+            if candidates is None:
+                selection: Any = slice(start, end)
+                block_rows = np.arange(start, end)
+            else:
+                selection = block_rows = candidates[start:end]
+            scores = score_block(selection)
+            scores[~self._live[selection]] = -np.inf
+
+            keep = min(k, end - start)
+            top = np.argpartition(-scores, keep - 1, axis=0)[:keep]
+            best_rows = np.concatenate([best_rows, block_rows[top]])
+            best_scores = np.concatenate([best_scores, np.take_along_axis(scores, top, axis=0)])
+
+            if len(best_rows) > k:
+                top = np.argpartition(-best_scores, k - 1, axis=0)[:k]
+                best_rows = np.take_along_axis(best_rows, top, axis=0)
+                best_scores = np.take_along_axis(best_scores, top, axis=0)
+
+        rows, scores = [], []
+        for q in range(n_queries):
+            order = np.argsort(-best_scores[:, q], kind="stable")
+            order = order[np.isfinite(best_scores[order, q])]
+            rows.append(best_rows[order, q])
+            scores.append(best_scores[order, q])
+        return rows, scores
+
+    def _rows_of(self, ids: Sequence[str]) -> Dict[str, int]:
+        rows: Dict[str, int] = {}
+        for start in range(0, len(ids), _SQL_BATCH):
+            batch = list(ids[start : start + _SQL_BATCH])
+            marks = ",".join("?" * len(batch))
+            rows.update(self._conn.execute(f"SELECT id, row FROM records WHERE id IN ({marks})", batch))
+        return rows
+
+    def _records(self, ids: Sequence[str]) -> Dict[str, Tuple[str, dict]]:
+        records: Dict[str, Tuple[str, dict]] = {}
+        unique = list(dict.fromkeys(ids))
+        for start in range(0, len(unique), _SQL_BATCH):
+            batch = unique[start : start + _SQL_BATCH]
+            marks = ",".join("?" * len(batch))
+            for chunk_id, document, metadata in self._conn.execute(
+                f"SELECT id, document, metadata FROM records WHERE id IN ({marks})", batch
+            ):
+                records[chunk_id] = (document, json.loads(metadata))
+        return records
+
+    def _delete_rows(self, rows: Sequence[int]) -> None:
+        for start in range(0, len(rows), _SQL_BATCH):
+            batch = list(rows[start : start + _SQL_BATCH])
+            marks = ",".join("?" * len(batch))
+            self._conn.execute(f"DELETE FROM records WHERE row IN ({marks})", batch)
+            self._conn.execute(f"DELETE FROM metadata_index WHERE row IN ({marks})", batch)
+
+    def _index_metadata(self, first_row: int) -> None:
+        """(key, value, row) entries of the scalar metadata of records from `first_row` on"""
+        self._conn.execute(
+            """
+            INSERT OR IGNORE INTO metadata_index (key, value, row)
+            SELECT j.key, j.value, r.row FROM records r, json_each(r.metadata) j
+            WHERE r.row >= ? AND j.type IN ('integer', 'real', 'text', 'true', 'false')
+            """,
+            (first_row,),
+        )
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
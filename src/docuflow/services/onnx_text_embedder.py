@@ -0,0 +1,174 @@
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from docuflow.configs import settings
+from docuflow.interfaces import EmbeddingMatrix, ITextEmbedder
+from docuflow.services.bge_text_embedder import QUERY_INSTRUCTION, bucket_by_length
+from docuflow.utils import get_logger
+
+MODEL_FILE = "model.onnx"
+QUANTIZED_MODEL_FILE = "model.int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+
+logger = get_logger(__name__)
+
+
+class ONNXTextEmbedder(ITextEmbedder):
+    """
+    The BGE model on ONNX Runtime, for CPU-only nodes.
+    Loads the model written by export_onnx_model (fp32, or int8 dynamically quantized)
+    with its tokenizer. Pooling (CLS token, L2-normalized) and the query instruction
+    match BGETextEmbedder, so both backends can serve the same collection.
+    """
+
+    def __init__(
+        self,
+        model_dir: Optional[Path] = None,
+        quantized: Optional[bool] = None,
+        intra_op_threads: Optional[int] = None,
+        batch_size: int = 64,
+        max_batch_tokens: Optional[int] = None,
+    ):
+        self.logger = get_logger(__name__)
+
+        self.logger.info("Initializing ONNX text embedding phase")
+        self.batch_size = batch_size
+        # Token budget per batch (padded length x batch size); 0 keeps fixed-size batches
+        self.max_batch_tokens = (
+            max_batch_tokens if max_batch_tokens is not None else settings.embedding_max_batch_tokens
+        )
+        self.model_dir = Path(model_dir or settings.onnx_model_dir)
+        self.quantized = quantized if quantized is not None else settings.onnx_quantized
+        self.model_id = f"{self.model_dir.resolve()}|onnx|int8={self.quantized}"
+        threads = intra_op_threads if intra_op_threads is not None else settings.onnx_intra_op_threads
+
+        model_file = self.model_dir / (QUANTIZED_MODEL_FILE if self.quantized else MODEL_FILE)
+        if not model_file.exists():
+            raise FileNotFoundError(f"No ONNX model at {model_file}, create it with export_onnx_model()")
+
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads > 0:
+            options.intra_op_num_threads = threads
+        self.logger.info(f"Loading {model_file} ({threads or 'default'} intra-op threads)")
+        self.session = ort.InferenceSession(str(model_file), sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(str(self.model_dir / TOKENIZER_FILE))
+        self.tokenizer.no_padding()  # padded per batch, to the batch's longest text
+        self.tokenizer.enable_truncation(settings.embedding_max_length)
+        pad_id = self.tokenizer.token_to_id("[PAD]")
+        self.pad_id = pad_id if pad_id is not None else 0
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        if not texts:
+            self.logger.error("No texts provided, returning empty list.")
+            return []
+
+        return self.embed_array(texts).tolist()
+
+    def embed_array(self, texts: Sequence[str]) -> EmbeddingMatrix:
+        """Embed batch by batch into one preallocated float32 matrix"""
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        try:
+            encodings = self.tokenizer.encode_batch(list(texts))
+            if self.max_batch_tokens:
+                batches = bucket_by_length([len(encoding.ids) for encoding in encodings], self.max_batch_tokens)
+            else:
+                batches = [
+                    list(range(i, min(i + self.batch_size, len(texts)))) for i in range(0, len(texts), self.batch_size)
+                ]
+
+            all_embeddings: Optional[EmbeddingMatrix] = None
+            for indices in batches:
+                embeddings = self._forward([encodings[i].ids for i in indices])
+                if all_embeddings is None:
+                    all_embeddings = np.empty((len(texts), embeddings.shape[1]), dtype=np.float32)
+                # scatter back so results keep the input order
+                all_embeddings[indices] = embeddings
+
+            assert all_embeddings is not None
+            return all_embeddings
+
+        except Exception as e:
+            self.logger.error(f"Embedding failed for {len(texts)} texts: {e}")
+            raise
+
+    def embed_queries(self, queries: Sequence[str]) -> EmbeddingMatrix:
+        """Embed queries with the retrieval instruction prepended, as FlagModel.encode_queries does"""
+        return self.embed_array([QUERY_INSTRUCTION + query for query in queries])
+
+    def _forward(self, token_ids: List[List[int]]) -> EmbeddingMatrix:
+        """One padded batch through the model -> normalized CLS embeddings"""
+        length = max(len(ids) for ids in token_ids)
+        input_ids = np.full((len(token_ids), length), self.pad_id, dtype=np.int64)
+        attention_mask = np.zeros((len(token_ids), length), dtype=np.int64)
+        for row, ids in enumerate(token_ids):
+            input_ids[row, : len(ids)] = ids
+            attention_mask[row, : len(ids)] = 1
+
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+        hidden = self.session.run(None, feeds)[0]
+
+        embeddings = np.ascontiguousarray(hidden[:, 0] if hidden.ndim == 3 else hidden, dtype=np.float32)
+        embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        return embeddings
+
+
+def export_onnx_model(
+    model_name: Optional[str] = None, model_dir: Optional[Path] = None, quantize: bool = True, opset: int = 17
+) -> Path:
+    """
+    Export the Hugging Face model to `model_dir` for ONNXTextEmbedder: model.onnx,
+    tokenizer.json and, with `quantize`, model.int8.onnx. Needs torch + transformers
+    (and the onnx package to quantize); run it once on a machine that has them.
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    model_name = model_name or settings.embedding_model
+    model_dir = Path(model_dir or settings.onnx_model_dir)
+    model_dir.mkdir(parents=True, exist_ok=True)
+
+    logger.info(f"Exporting {model_name} to {model_dir / MODEL_FILE}")
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    tokenizer.save_pretrained(model_dir)
+    model = AutoModel.from_pretrained(model_name).eval()
+
+    sample = tokenizer(["an export sample", "a longer export sample sentence"], padding=True, return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in [*input_names, "last_hidden_state"]}
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            str(model_dir / MODEL_FILE),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+        )
+
+    if quantize:
+        quantize_onnx_model(model_dir)
+    return model_dir
+
+
+def quantize_onnx_model(model_dir: Optional[Path] = None) -> Path:
+    """Int8 dynamic quantization of the exported model (weights int8, activations quantized at run time)"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    model_dir = Path(model_dir or settings.onnx_model_dir)
+    output = model_dir / QUANTIZED_MODEL_FILE
+    logger.info(f"Quantizing {model_dir / MODEL_FILE} to {output}")
+    quantize_dynamic(model_dir / MODEL_FILE, output, weight_type=QuantType.QInt8)
+    return output
@@ -0,0 +1,292 @@
+import asyncio
+import json
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from http import HTTPStatus
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from docuflow.configs import settings
+from docuflow.interfaces import IRetriever, MetadataFilter
+from docuflow.schemas import RetrievedChunk
+from docuflow.utils import get_logger
+
+
+@dataclass
+class _PendingQuery:
+    query: str
+    top_k: int
+    where: Optional[MetadataFilter]
+    future: "asyncio.Future[List[RetrievedChunk]]"
+    arrived: float
+
+
+class MicroBatcher:
+    """
+    Collects concurrent queries and retrieves them together.
+
+    A batch closes when `max_batch_size` queries are waiting or the oldest has waited
+    `max_wait_ms`; it is embedded in one model call and searched in one store call,
+    then each caller gets its own results. Each closed batch runs as its own task while
+    collection goes on, so a slow batch does not hold up the queries queued behind it.
+    """
+
+    def __init__(
+        self,
+        retriever: IRetriever,
+        max_wait_ms: Optional[float] = None,
+        max_batch_size: Optional[int] = None,
+        latency_window: Optional[int] = None,
+    ):
+        self.logger = get_logger(__name__)
+        self.retriever = retriever
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else settings.server_max_wait_ms) / 1000
+        self.max_batch_size = max_batch_size or settings.server_max_batch_size
+
+        self._pending: List[_PendingQuery] = []
+        self._arrived = asyncio.Event()
+        self._full = asyncio.Event()
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._running: Set["asyncio.Task[None]"] = set()
+
+        self._latencies: Deque[float] = deque(maxlen=latency_window or settings.server_latency_window)
+        self.requests = 0
+        self.batches = 0
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._collect())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        # batches already handed off still answer their callers
+        await asyncio.gather(*self._running, return_exceptions=True)
+        for pending in self._pending:
+            pending.future.cancel()
+        self._pending.clear()
+
+    async def submit(self, query: str, top_k: int = 5, where: Optional[MetadataFilter] = None) -> List[RetrievedChunk]:
+        self.start()
+        arrived = time.perf_counter()
+        future: "asyncio.Future[List[RetrievedChunk]]" = asyncio.get_running_loop().create_future()
+        self._pending.append(_PendingQuery(query, top_k, where, future, arrived))
+        self._arrived.set()
+        if len(self._pending) >= self.max_batch_size:
+            self._full.set()
+
+        chunks = await future
+        self._latencies.append(time.perf_counter() - arrived)
+        return chunks
+
+    def stats(self) -> Dict[str, float]:
+        latencies = np.array(self._latencies) * 1000 if self._latencies else np.zeros(1)
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch_size": self.requests / self.batches if self.batches else 0.0,
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p99_ms": float(np.percentile(latencies, 99)),
+        }
+
+    async def _collect(self) -> None:
+        while True:
+            await self._arrived.wait()
+            remaining = self._pending[0].arrived + self.max_wait - time.perf_counter()
+            if remaining > 0 and len(self._pending) < self.max_batch_size:
+                try:
+                    await asyncio.wait_for(self._full.wait(), remaining)
+                except TimeoutError:
+                    pass
+
+            batch = self._pending[: self.max_batch_size]
+            del self._pending[: self.max_batch_size]
+            if not self._pending:
+                self._arrived.clear()
+            if len(self._pending) < self.max_batch_size:
+                self._full.clear()
+
+            # callers that gave up while waiting are not embedded
+            batch = [pending for pending in batch if not pending.future.done()]
+            if batch:
+                task = asyncio.create_task(self._run(batch))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: List[_PendingQuery]) -> None:
+        self.requests += len(batch)
+        self.batches += 1
+
+        # one retrieval per filter; the largest top_k serves the smaller ones (results are ranked)
+        groups: Dict[str, List[_PendingQuery]] = {}
+        for pending in batch:
+            groups.setdefault(json.dumps(pending.where, sort_keys=True, default=str), []).append(pending)
+
+        for group in groups.values():
+            top_k = max(pending.top_k for pending in group)
+            try:
+                results = await self.retriever.aretrieve_many(
+                    [pending.query for pending in group], top_k, group[0].where
+                )
+            except Exception as exc:
+                self.logger.error(f"Batch of {len(group)} queries failed", exc_info=True)
+                for pending in group:
+                    if not pending.future.done():
+                        pending.future.set_exception(exc)
+                continue
+
+            for pending, chunks in zip(group, results):
+                if not pending.future.done():
+                    pending.future.set_result(chunks[: pending.top_k])
+
+
+class QueryServer:
+    """
+    Minimal HTTP/1.1 query service (TCP or Unix socket) in front of a retriever.
+
+        POST /query   {"query": "...", "top_k": 5, "where": {...}}  -> {"chunks": [...]}
+        GET  /stats   request count, mean batch size, p50/p99 latency
+        GET  /health
+
+    Concurrent requests are micro-batched (see MicroBatcher). Bodies larger than
+    `max_body_bytes` are rejected with 413 before they are read.
+    """
+
+    def __init__(
+        self,
+        retriever: IRetriever,
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+        unix_socket: Optional[Path] = None,
+        max_wait_ms: Optional[float] = None,
+        max_batch_size: Optional[int] = None,
+        max_body_bytes: Optional[int] = None,
+    ):
+        self.logger = get_logger(__name__)
+        self.host = host or settings.server_host
+        self.port = port if port is not None else settings.server_port
+        self.unix_socket = unix_socket if unix_socket is not None else settings.server_unix_socket
+        self.max_body_bytes = max_body_bytes if max_body_bytes is not None else settings.server_max_body_bytes
+        self.batcher = MicroBatcher(retriever, max_wait_ms, max_batch_size)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._reporter: Optional["asyncio.Task[None]"] = None
+
+    async def start(self) -> None:
+        if self.unix_socket is not None:
+            self._server = await asyncio.start_unix_server(self._handle, path=str(self.unix_socket))
+            self.logger.info(f"Query server listening on {self.unix_socket}")
+        else:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port)
+            # port 0 picks a free port
+            self.port = self._server.sockets[0].getsockname()[1]
+            self.logger.info(f"Query server listening on http://{self.host}:{self.port}")
+        self.batcher.start()
+        if settings.server_stats_interval > 0:
+            self._reporter = asyncio.create_task(self._report(settings.server_stats_interval))
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        assert self._server is not None
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    async def close(self) -> None:
+        if self._reporter is not None:
+            self._reporter.cancel()
+            self._reporter = None
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+            self.logger.info(f"Query server stopped: {self.batcher.stats()}")
+        await self.batcher.close()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            # keep-alive: serve requests until the client closes or asks to
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers: Dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                if length < 0:
+                    raise ValueError("negative content-length")
+                if length > self.max_body_bytes:
+                    # the body is never read, so the connection cannot be reused
+                    error = {"error": f"request body over {self.max_body_bytes} bytes"}
+                    self._respond(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, error, keep_alive=False)
+                    await writer.drain()
+                    break
+                body = await reader.readexactly(length)
+
+                status, payload = await self._route(method, path.split("?", 1)[0], body)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                self._respond(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except ValueError:
+            self._respond(writer, HTTPStatus.BAD_REQUEST, {"error": "malformed request"}, keep_alive=False)
+        finally:
+            writer.close()
+
+    async def _route(self, method: str, path: str, body: bytes) -> Tuple[HTTPStatus, Any]:
+        if path == "/query" and method == "POST":
+            try:
+                request = json.loads(body)
+                query = request["query"]
+                top_k = int(request.get("top_k", 5))
+                where = request.get("where")
+                if not isinstance(query, str) or top_k < 1 or not (where is None or isinstance(where, dict)):
+                    raise ValueError
+            except (ValueError, KeyError, TypeError):
+                return HTTPStatus.BAD_REQUEST, {"error": 'expected {"query": str, "top_k": int >= 1, "where": object}'}
+            try:
+                chunks = await self.batcher.submit(query, top_k, where)
+            except Exception as exc:
+                return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(exc)}
+            return HTTPStatus.OK, {"chunks": [asdict(chunk) for chunk in chunks]}
+        if path == "/stats" and method == "GET":
+            return HTTPStatus.OK, self.batcher.stats()
+        if path == "/health" and method == "GET":
+            return HTTPStatus.OK, {"status": "ok"}
+        return HTTPStatus.NOT_FOUND, {"error": f"no route for {method} {path}"}
+
+    @staticmethod
+    def _respond(writer: asyncio.StreamWriter, status: HTTPStatus, payload: Any, keep_alive: bool) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        head = [
+            f"HTTP/1.1 {status.value} {status.phrase}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(body)}",
+        ]
+        if not keep_alive:
+            head.append("Connection: close")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+
+    async def _report(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            stats = self.batcher.stats()
+            self.logger.info(
+                f"{stats['requests']} queries in {stats['batches']} batches "
+                f"(mean {stats['mean_batch_size']:.1f}), p50 {stats['p50_ms']:.1f} ms, p99 {stats['p99_ms']:.1f} ms"
+            )
@@ -1,34 +1,226 @@
-from typing import List
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
 
-from docuflow.interfaces import IRetriever, ITextEmbedder, IVectorStore
+import numpy as np
+
+from docuflow.configs import settings
+from docuflow.interfaces import IRetriever, ITextEmbedder, IVectorStore, MetadataFilter
 from docuflow.schemas import RetrievedChunk
+from docuflow.services.bm25_index import BM25Index
+from docuflow.services.cached_text_embedder import normalize_text
 from docuflow.utils import get_logger
+from docuflow.utils.aio import store_runner
 
 
 class VectorRetriever(IRetriever):
-    def __init__(self, embedder: ITextEmbedder, vector_store: IVectorStore):
+    def __init__(self, embedder: ITextEmbedder, vector_store: IVectorStore, cache_size: Optional[int] = None):
         self.logger = get_logger(__name__)
         self.embedder = embedder
         self.vector_store = vector_store
 
-    def retrieve(self, query: str, top_k: int = 5) -> List[RetrievedChunk]:
-        self.logger.info("Retrieving top {top_k} chunks for query")
-
-        # Generate query embeddings
-        query_embedding = self.embedder.embed([query])[0]
-        print(query_embedding)
-
-    #     # Query vector store
-    #     raw_results = self.vector_store.query(
-    #         query_embedding=query_embedding,
-    #         n_results=top_k,
-    #     )
-    #     print(raw_results)
-    #     # # # Extract and flatten results
-    #     # documents = raw_results.get("documents", [[]])[0]
-    #     # distances = raw_results.get("distances", [[]])[0]
-    #     # metadatas = raw_results.get("metadatas", [[]])[0]
-
-    #     # # Build structured output
-    #     # retrieved_chunks: List[RetrievedChunk] = []
-    #     # return retrieved_chunks
+        # Bounded LRU of query vectors, keyed by normalized query text
+        self.cache_size = cache_size if cache_size is not None else settings.query_cache_size
+        self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def retrieve(self, query: str, top_k: int = 5, where: Optional[MetadataFilter] = None) -> List[RetrievedChunk]:
+        return self.retrieve_many([query], top_k, where)[0]
+
+    def retrieve_many(
+        self, queries: Sequence[str], top_k: int = 5, where: Optional[MetadataFilter] = None
+    ) -> List[List[RetrievedChunk]]:
+        """Top_k chunks per query; uncached queries are embedded together in one batch"""
+        if not queries:
+            return []
+
+        self.logger.info(f"Retrieving top {top_k} chunks for {len(queries)} queries")
+        query_embeddings = self.embed_queries(queries)
+
+        if len(query_embeddings) == 1:
+            raw_results = self.vector_store.query(
+                query_embedding=query_embeddings[0].tolist(), n_results=top_k, where=where
+            )
+        else:
+            # one search call for the whole batch
+            raw_results = self.vector_store.query_batch(query_embeddings, n_results=top_k, where=where)
+        return [self._to_chunks(raw_results, position) for position in range(len(queries))]
+
+    async def aretrieve_many(
+        self, queries: Sequence[str], top_k: int = 5, where: Optional[MetadataFilter] = None
+    ) -> List[List[RetrievedChunk]]:
+        """retrieve_many with the embedding and the search awaited on the shared runners"""
+        if not queries:
+            return []
+
+        query_embeddings = await self.aembed_queries(queries)
+        if len(query_embeddings) == 1:
+            raw_results = await self.vector_store.aquery(query_embeddings[0].tolist(), top_k, where)
+        else:
+            raw_results = await self.vector_store.aquery_batch(query_embeddings, top_k, where)
+        return [self._to_chunks(raw_results, position) for position in range(len(queries))]
+
+    def embed_queries(self, queries: Sequence[str]) -> np.ndarray:
+        """Query vectors from the LRU cache, embedding only the misses"""
+        keys, found, missing = self._cached(queries)
+        if missing:
+            self._remember(found, missing, self.embedder.embed_queries(list(missing.values())))
+        return np.stack([found[key] for key in keys])
+
+    async def aembed_queries(self, queries: Sequence[str]) -> np.ndarray:
+        keys, found, missing = self._cached(queries)
+        if missing:
+            self._remember(found, missing, await self.embedder.aembed_queries(list(missing.values())))
+        return np.stack([found[key] for key in keys])
+
+    def cache_stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "size": len(self._cache),
+        }
+
+    def _cached(self, queries: Sequence[str]) -> Tuple[List[str], Dict[str, np.ndarray], Dict[str, str]]:
+        """Cache keys of the queries, vectors found in the cache, and missing key -> query text"""
+        keys = [normalize_text(query) for query in queries]
+
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for key in keys:
+                vector = self._cache.get(key)
+                if vector is not None:
+                    self._cache.move_to_end(key)
+                    found[key] = vector
+
+        # first original text of each missing key, in query order
+        missing: Dict[str, str] = {}
+        for key, query in zip(keys, queries):
+            if key not in found:
+                missing.setdefault(key, query)
+        self.hits += len(keys) - len(missing)
+        self.misses += len(missing)
+        return keys, found, missing
+
+    def _remember(self, found: Dict[str, np.ndarray], missing: Dict[str, str], embeddings: np.ndarray) -> None:
+        with self._lock:
+            for key, vector in zip(missing, embeddings):
+                found[key] = vector
+                self._cache[key] = vector
+                self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    @staticmethod
+    def _to_chunks(raw_results, position: int = 0) -> List[RetrievedChunk]:
+        # one result list per query embedding
+        ids = raw_results["ids"][position]
+        documents = raw_results["documents"][position]
+        distances = raw_results["distances"][position]
+        metadatas = raw_results["metadatas"][position]
+
+        return [
+            RetrievedChunk(
+                content=document,
+                # squared L2 between unit vectors, 1 - d / 2 is the cosine similarity
+                score=1.0 - float(distance) / 2.0,
+                metadata=dict(metadata or {}),
+                id=chunk_id,
+            )
+            for chunk_id, document, distance, metadata in zip(ids, documents, distances, metadatas)
+        ]
+
+
+class HybridRetriever(IRetriever):
+    """
+    Dense + lexical retrieval fused by reciprocal rank fusion: each chunk scores
+    sum(1 / (rrf_k + rank)) over the candidate lists it appears in.
+    Exact tokens (part codes, error numbers, clause ids) reach the top through
+    the BM25 list even when their embeddings are not close to the query.
+    """
+
+    def __init__(
+        self,
+        vector_retriever: VectorRetriever,
+        lexical_index: BM25Index,
+        candidates: Optional[int] = None,
+        rrf_k: Optional[int] = None,
+    ):
+        self.logger = get_logger(__name__)
+        self.vector_retriever = vector_retriever
+        self.lexical_index = lexical_index
+        self.candidates = candidates or settings.hybrid_candidates
+        self.rrf_k = rrf_k or settings.hybrid_rrf_k
+
+    def retrieve(self, query: str, top_k: int = 5, where: Optional[MetadataFilter] = None) -> List[RetrievedChunk]:
+        return self.retrieve_many([query], top_k, where)[0]
+
+    def retrieve_many(
+        self, queries: Sequence[str], top_k: int = 5, where: Optional[MetadataFilter] = None
+    ) -> List[List[RetrievedChunk]]:
+        if not queries:
+            return []
+
+        dense = self.vector_retriever.retrieve_many(queries, max(top_k, self.candidates), where)
+        return self._fuse(queries, dense, top_k, where)
+
+    async def aretrieve_many(
+        self, queries: Sequence[str], top_k: int = 5, where: Optional[MetadataFilter] = None
+    ) -> List[List[RetrievedChunk]]:
+        if not queries:
+            return []
+
+        dense = await self.vector_retriever.aretrieve_many(queries, max(top_k, self.candidates), where)
+        return await store_runner().run(self._fuse, queries, dense, top_k, where)
+
+    def _fuse(
+        self,
+        queries: Sequence[str],
+        dense: List[List[RetrievedChunk]],
+        top_k: int,
+        where: Optional[MetadataFilter],
+    ) -> List[List[RetrievedChunk]]:
+        """Reciprocal rank fusion of the dense results with BM25 candidates of each query"""
+        n_candidates = max(top_k, self.candidates)
+        chunks: Dict[str, RetrievedChunk] = {chunk.id: chunk for results in dense for chunk in results if chunk.id}
+
+        fused: List[List[Tuple[str, float]]] = []
+        for query, dense_chunks in zip(queries, dense):
+            lexical = self.lexical_index.search(query, n_candidates)
+            if where and lexical:
+                # the BM25 index has no metadata, the store applies the filter to its candidates
+                allowed = set(
+                    self.vector_retriever.vector_store.get(
+                        ids=[chunk_id for chunk_id, _ in lexical], where=where, include=()
+                    )["ids"]
+                )
+                lexical = [(chunk_id, score) for chunk_id, score in lexical if chunk_id in allowed]
+            scores: Dict[str, float] = {}
+            for ranked in ([chunk.id for chunk in dense_chunks], [chunk_id for chunk_id, _ in lexical]):
+                for rank, chunk_id in enumerate(ranked, start=1):
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (self.rrf_k + rank)
+            fused.append(sorted(scores.items(), key=lambda item: -item[1])[:top_k])
+
+        # content of lexical-only hits, one lookup for all queries
+        missing = list({chunk_id for results in fused for chunk_id, _ in results if chunk_id not in chunks})
+        if missing:
+            records = self.vector_retriever.vector_store.get(ids=missing)
+            for chunk_id, document, metadata in zip(records["ids"], records["documents"], records["metadatas"]):
+                chunks[chunk_id] = RetrievedChunk(
+                    content=document, score=0.0, metadata=dict(metadata or {}), id=chunk_id
+                )
+
+        return [
+            [
+                RetrievedChunk(
+                    content=chunks[chunk_id].content, score=score, metadata=chunks[chunk_id].metadata, id=chunk_id
+                )
+                for chunk_id, score in results
+                # lexical hits whose chunk is gone from the store
+                if chunk_id in chunks
+            ]
+            for results in fused
+        ]
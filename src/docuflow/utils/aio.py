@@ -0,0 +1,128 @@
+import asyncio
+import functools
+import multiprocessing
+import threading
+import weakref
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, MutableMapping, Optional, TypeVar
+
+from docuflow.configs import settings
+from docuflow.utils.logger import get_logger
+
+T = TypeVar("T")
+
+logger = get_logger(__name__)
+
+
+class AsyncRunner:
+    """
+    Runs blocking calls from async code on a bounded executor.
+
+    At most `max_pending` calls are admitted at once per event loop; further callers
+    wait on a semaphore instead of piling up in the executor queue. A caller cancelled
+    while waiting (or while its call is still queued) drops the call; a call already
+    running in a worker finishes there, still holding its slot, and its result is discarded.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_workers: int,
+        max_pending: int,
+        processes: bool = False,
+        initializer: Optional[Callable[[], None]] = None,
+    ):
+        self.name = name
+        self.max_pending = max_pending
+        if processes:
+            # spawn: the parent holds torch/chroma threads, which fork does not survive
+            self.executor: Executor = ProcessPoolExecutor(
+                max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"), initializer=initializer
+            )
+        else:
+            self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"docuflow-{name}")
+        self._semaphores: MutableMapping[asyncio.AbstractEventLoop, asyncio.Semaphore] = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        async with self._semaphore():
+            call = self.executor.submit(functools.partial(fn, *args, **kwargs))
+            result = asyncio.wrap_future(call)
+            try:
+                return await asyncio.shield(result)
+            except asyncio.CancelledError:
+                if not call.cancel():
+                    # already running: the slot is only free once the worker is
+                    await self._drain(result)
+                raise
+
+    @staticmethod
+    async def _drain(result: "asyncio.Future[Any]") -> None:
+        while not result.done():
+            try:
+                await asyncio.wait([result])
+            except asyncio.CancelledError:
+                pass
+        if not result.cancelled():
+            result.exception()  # discarded, but retrieved so asyncio does not warn about it
+
+    def shutdown(self, wait: bool = True) -> None:
+        self.executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            semaphore = self._semaphores.get(loop)
+            if semaphore is None:
+                semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_pending)
+        return semaphore
+
+
+# Process-wide registry: one runner per stage, shared by every component and request
+_runners: Dict[str, AsyncRunner] = {}
+_registry_lock = threading.Lock()
+
+
+def get_runner(
+    name: str, max_workers: int, processes: bool = False, initializer: Optional[Callable[[], None]] = None
+) -> AsyncRunner:
+    """Runner of a stage, created on first use (later arguments are ignored)"""
+    with _registry_lock:
+        runner = _runners.get(name)
+        if runner is None:
+            logger.info(f"Starting async runner {name!r} with {max_workers} {'processes' if processes else 'threads'}")
+            runner = _runners[name] = AsyncRunner(name, max_workers, settings.async_max_pending, processes, initializer)
+    return runner
+
+
+def init_conversion_worker() -> None:
+    """Process pool initializer: a conversion worker converts pdfs serially instead of starting its own pool"""
+    settings.pdf_parallel_page_threshold = 0
+
+
+def embedding_runner() -> AsyncRunner:
+    """Embedding calls; few workers, concurrent callers share the one model"""
+    return get_runner("embedding", settings.async_embed_workers)
+
+
+def store_runner() -> AsyncRunner:
+    """Vector store, lexical index and manifest calls"""
+    return get_runner("store", settings.async_store_workers)
+
+
+def conversion_runner() -> AsyncRunner:
+    """Document conversion + chunking, CPU bound, in worker processes"""
+    return get_runner("conversion", settings.async_convert_workers, processes=True, initializer=init_conversion_worker)
+
+
+def ingest_runner() -> AsyncRunner:
+    """Whole-file ingestion that cannot be split into stages (streamed pdfs)"""
+    return get_runner("ingest", settings.async_convert_workers)
+
+
+def shutdown_runners(wait: bool = True) -> None:
+    with _registry_lock:
+        runners = list(_runners.values())
+        _runners.clear()
+    for runner in runners:
+        runner.shutdown(wait=wait)
@@ -0,0 +1,27 @@
+import importlib
+import sys
+from typing import Any, Callable, List, Mapping, Tuple
+
+
+def lazy_exports(package: str, exports: Mapping[str, str]) -> Tuple[Callable[[str], Any], Callable[[], List[str]]]:
+    """
+    Module-level __getattr__/__dir__ (PEP 562) for a package whose public names
+    live in submodules with heavy dependencies (torch, chromadb, pymupdf, easyocr).
+    The submodule is imported on first attribute access, then cached on the package.
+
+    `exports` maps public name -> submodule, relative to `package`.
+    """
+
+    def __getattr__(name: str) -> Any:
+        module_name = exports.get(name)
+        if module_name is None:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+
+        value = getattr(importlib.import_module(module_name, package), name)
+        setattr(sys.modules[package], name, value)
+        return value
+
+    def __dir__() -> List[str]:
+        return sorted(exports)
+
+    return __getattr__, __dir__
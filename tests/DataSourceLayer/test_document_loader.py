@@ -2,11 +2,13 @@
 Tests for DocumentLoader - Data Source Layer
 """
 
+import os
+
 import pytest
 from docx import Document
 
 from docuflow.core.loaders import DocumentLoader
-from docuflow.schemas import RawDocument
+from docuflow.schemas import FileContent, RawDocument
 
 
 @pytest.fixture
@@ -94,7 +96,7 @@ class TestDocumentLoaderLoading:
         # Check content
         assert raw_doc.content is not None
         assert len(raw_doc.content) > 0
-        assert "introduction" in raw_doc.content.lower()
+        assert "introduction" in raw_doc.content.text().lower()
 
     def test_load_md_file(self, loader, md_file):
         """Test loading a MD file returns RawDocument"""
@@ -106,7 +108,7 @@ class TestDocumentLoaderLoading:
         raw_doc = result[0]
 
         assert isinstance(raw_doc, RawDocument)
-        assert "# introduction to md" in raw_doc.content.lower()
+        assert "# introduction to md" in raw_doc.content.text().lower()
 
     def test_load_docx_file(self, loader, docx_file):
         """Test loading a DOCX file (converts to markdown)"""
@@ -119,3 +121,45 @@ class TestDocumentLoaderLoading:
         assert raw_doc.content is not None
         # DOCX converted to markdown should have some content
         assert len(raw_doc.content) > 0
+
+    def test_load_is_lazy_and_buffers_content(self, loader, txt_file):
+        """Test content is a lazy handle that reads the file on demand"""
+        raw_doc = loader.load(str(txt_file))[0]
+
+        assert isinstance(raw_doc.content, FileContent)
+        assert len(raw_doc.content) == txt_file.stat().st_size
+
+        with raw_doc.buffer() as content:
+            assert bytes(content[:5]) == b"Intro"
+        assert raw_doc.content.text() == txt_file.read_text()
+
+    def test_load_metadata_fast_path(self, loader, txt_file):
+        """Test metadata-only load"""
+        metadata = loader.load_metadata(str(txt_file))
+
+        assert metadata["filename"] == "sample_test.txt"
+        assert metadata["file_size"] == txt_file.stat().st_size
+        assert metadata["format"] == ".txt"
+        assert loader.load_metadata("/nonexistent/file.txt") is None
+
+    def test_load_respects_validate(self, loader, txt_file, monkeypatch):
+        """Test files rejected by validate() are not loaded"""
+        monkeypatch.setattr(loader, "validate", lambda source_path: False)
+
+        assert loader.load(str(txt_file)) == []
+
+    def test_load_stats_file_once(self, loader, txt_file, monkeypatch):
+        """Test the default path validates and reads metadata from a single os.stat"""
+        size = txt_file.stat().st_size
+        stats = []
+        real_stat = os.stat
+
+        def counting_stat(path, *args, **kwargs):
+            stats.append(str(path))
+            return real_stat(path, *args, **kwargs)
+
+        monkeypatch.setattr(os, "stat", counting_stat)
+        docs = loader.load(str(txt_file))
+
+        assert len(docs) == 1 and docs[0].metadata["file_size"] == size
+        assert stats.count(str(txt_file)) == 1
@@ -0,0 +1,123 @@
+import asyncio
+import threading
+from typing import List, Sequence
+
+import numpy as np
+
+from docuflow.interfaces import ITextEmbedder
+from docuflow.services import FlatVectorStore, VectorRetriever
+from docuflow.utils.aio import AsyncRunner
+
+
+class AxisEmbedder(ITextEmbedder):
+    """Unit vectors along the axis picked by the first word"""
+
+    AXES = {"alpha": 0, "beta": 1, "gamma": 2}
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        vectors = []
+        for text in texts:
+            vector = [0.0, 0.0, 0.0]
+            vector[self.AXES[text.split()[0]]] = 1.0
+            vectors.append(vector)
+        return vectors
+
+
+def make_store(tmp_path, embedder: ITextEmbedder) -> FlatVectorStore:
+    store = FlatVectorStore(db_path=tmp_path / "flat", collection_name="async")
+    texts = ["alpha chunk", "beta chunk", "gamma chunk"]
+    store.add(
+        ids=["a", "b", "c"],
+        documents=texts,
+        metadata=[{"source": "doc.md"}] * 3,
+        embeddings=embedder.embed_array(texts),
+    )
+    return store
+
+
+def test_concurrent_aretrieve_returns_each_query_its_own_chunks(tmp_path) -> None:
+    embedder = AxisEmbedder()
+    retriever = VectorRetriever(embedder=embedder, vector_store=make_store(tmp_path, embedder))
+
+    async def main():
+        queries = ["gamma query", "alpha query", "beta query"] * 10
+        return queries, await asyncio.gather(*(retriever.aretrieve(query, top_k=1) for query in queries))
+
+    queries, results = asyncio.run(main())
+    expected = {"alpha": "a", "beta": "b", "gamma": "c"}
+    assert [chunks[0].id for chunks in results] == [expected[query.split()[0]] for query in queries]
+
+
+def test_aadd_and_aquery_round_trip(tmp_path) -> None:
+    embedder = AxisEmbedder()
+    store = FlatVectorStore(db_path=tmp_path / "flat", collection_name="async")
+
+    async def main():
+        embeddings = await embedder.aembed_array(["alpha doc", "beta doc"])
+        await store.aadd(["x", "y"], ["alpha doc", "beta doc"], [{"source": "a"}, {"source": "b"}], embeddings)
+        query = np.array([0.0, 1.0, 0.0], dtype=np.float32)
+        return await store.aquery(query, n_results=1), await store.aquery(query, n_results=2, where={"source": "a"})
+
+    nearest, filtered = asyncio.run(main())
+    assert nearest["ids"] == [["y"]]
+    assert filtered["ids"] == [["x"]]
+
+
+def test_cancelled_queued_call_never_runs() -> None:
+    runner = AsyncRunner("test", max_workers=1, max_pending=8)
+    release = threading.Event()
+    ran: List[str] = []
+
+    def work(name: str) -> str:
+        if name == "blocker":
+            release.wait(timeout=5)
+        ran.append(name)
+        return name
+
+    async def main():
+        blocker = asyncio.ensure_future(runner.run(work, "blocker"))
+        queued = asyncio.ensure_future(runner.run(work, "queued"))
+        await asyncio.sleep(0.05)
+        queued.cancel()
+        await asyncio.wait([queued])
+        release.set()
+        assert await blocker == "blocker"
+        assert queued.cancelled()
+        return await runner.run(work, "after")
+
+    try:
+        assert asyncio.run(main()) == "after"
+    finally:
+        runner.shutdown()
+    assert ran == ["blocker", "after"]
+
+
+def test_cancelled_running_call_keeps_its_slot_until_it_returns() -> None:
+    runner = AsyncRunner("test", max_workers=2, max_pending=1)
+    release = threading.Event()
+    events: List[str] = []
+
+    def work(name: str) -> str:
+        events.append(f"start {name}")
+        if name == "running":
+            release.wait(timeout=5)
+        events.append(f"end {name}")
+        return name
+
+    async def main():
+        running = asyncio.ensure_future(runner.run(work, "running"))
+        await asyncio.sleep(0.05)
+        running.cancel()
+        waiting = asyncio.ensure_future(runner.run(work, "next"))
+        await asyncio.sleep(0.05)
+        # a free worker, but the only slot is still taken by the cancelled call
+        assert events == ["start running"]
+        release.set()
+        await asyncio.wait([running])
+        return await waiting
+
+    try:
+        assert asyncio.run(main()) == "next"
+    finally:
+        runner.shutdown()
+    assert events == ["start running", "end running", "start next", "end next"]
@@ -0,0 +1,83 @@
+from typing import List, Sequence
+
+from docuflow.interfaces import ITextEmbedder
+from docuflow.services import BM25Index, FlatVectorStore, HybridRetriever, VectorRetriever
+from docuflow.services.bm25_index import tokenize
+
+CHUNKS = {
+    "a": "Replace the pump seal when error ERR-4021 is shown on the display.",
+    "b": "The pump must be serviced every six months by a certified technician.",
+    "c": "Clause 7.3.2 limits the warranty to parts supplied by the manufacturer.",
+    "d": "Warranty claims are handled by the service desk within ten days.",
+}
+
+
+class TopicEmbedder(ITextEmbedder):
+    """Embeds by topic words only, blind to codes like a dense model often is"""
+
+    TOPICS = ("pump", "warranty")
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        return [[float(topic in text.lower()) for topic in self.TOPICS] + [0.1] for text in texts]
+
+
+def test_tokenize_keeps_codes_whole_and_split() -> None:
+    tokens = tokenize("See ERR-4021, clause 7.3.2.")
+    assert tokens == ["see", "err", "4021", "clause", "7", "3", "2", "err-4021", "7.3.2"]
+
+
+def test_bm25_index_ranks_and_updates_incrementally(tmp_path) -> None:
+    index = BM25Index(tmp_path / "lexical.sqlite3")
+    index.add(list(CHUNKS), list(CHUNKS.values()), ["manual.pdf"] * len(CHUNKS))
+
+    assert index.search("err-4021", top_k=2)[0][0] == "a"
+    assert index.search("4021", top_k=2)[0][0] == "a"
+    assert [chunk_id for chunk_id, _ in index.search("warranty clause 7.3.2", top_k=2)] == ["c", "d"]
+
+    # re-adding replaces, deleting removes; persisted across reopen
+    index.add(["a"], ["The pump seal needs no replacement."], ["manual.pdf"])
+    index.delete(["c"])
+    index.close()
+    reopened = BM25Index(tmp_path / "lexical.sqlite3")
+    assert reopened.search("err-4021") == []
+    assert [chunk_id for chunk_id, _ in reopened.search("7.3.2 warranty")] == ["d"]
+    assert reopened.count() == 3
+
+
+def test_bm25_search_reads_a_bounded_prefix_of_each_posting_list(tmp_path) -> None:
+    # "pump" is in every chunk, chunk i repeats it i + 1 times
+    ids = [f"c{i}" for i in range(20)]
+    documents = [" ".join(["pump"] * (i + 1) + ["filler"] * (20 - i)) for i in range(20)]
+    index = BM25Index(tmp_path / "lexical.sqlite3", max_df=1.0, max_postings=3)
+    index.add(ids, documents, ["manual.pdf"] * len(ids))
+
+    # only the three highest-tf postings are read and scored
+    assert [chunk_id for chunk_id, _ in index.search("pump", top_k=10)] == ["c19", "c18", "c17"]
+
+    index.max_postings = 0
+    assert len(index.search("pump", top_k=10)) == 10
+    assert index.search("pump", top_k=3) == BM25Index(tmp_path / "lexical.sqlite3", max_df=1.0).search("pump", top_k=3)
+
+
+def test_hybrid_retriever_fuses_dense_and_lexical_hits(tmp_path) -> None:
+    embedder = TopicEmbedder()
+    store = FlatVectorStore(db_path=tmp_path, collection_name="hybrid")
+    store.add(
+        list(CHUNKS),
+        list(CHUNKS.values()),
+        [{"source": "manual.pdf"}] * len(CHUNKS),
+        embedder.embed_array(list(CHUNKS.values())),
+    )
+    index = BM25Index(tmp_path / "lexical.sqlite3")
+    index.rebuild_from(store)
+
+    hybrid = HybridRetriever(VectorRetriever(embedder, store), index, candidates=2)
+    [results] = hybrid.retrieve_many(["pump error ERR-4021"], top_k=2)
+
+    # "a" is first in both lists; "b" comes only from the dense side
+    assert [chunk.id for chunk in results] == ["a", "b"]
+    assert results[0].content == CHUNKS["a"] and results[0].metadata == {"source": "manual.pdf"}
+    assert results[0].score > results[1].score
+    # a code the embedder cannot see is still found through BM25
+    assert "c" not in [chunk.id for chunk in hybrid.vector_retriever.retrieve("clause 7.3.2", top_k=2)]
+    assert "c" in [chunk.id for chunk in hybrid.retrieve("clause 7.3.2", top_k=2)]
@@ -0,0 +1,53 @@
+from docuflow.core.ingestion.dedup import EXACT, NEAR, ChunkDeduplicator
+from docuflow.schemas.document import Document
+
+POLICY = (
+    "Employees must submit expense reports within thirty days of travel completion "
+    "and attach all receipts so that finance can review and approve the reimbursement."
+)
+
+
+def test_dedup_finds_exact_and_near_duplicates(tmp_path) -> None:
+    dedup = ChunkDeduplicator(tmp_path / "dedup.sqlite3")
+
+    assert dedup.assign("/v1.pdf", ["a"], [Document(page_content=POLICY)]) == {}
+
+    revision = [
+        Document(page_content=POLICY.upper()),
+        Document(page_content=POLICY.replace("reimbursement", "refund")),
+        Document(page_content="Remote work requires a signed agreement with your manager."),
+    ]
+    matches = dedup.assign("/v2.pdf", ["b", "c", "d"], revision)
+
+    assert matches[0].canonical_id == "a" and matches[0].kind == EXACT
+    assert matches[1].canonical_id == "a" and matches[1].kind == NEAR
+    assert 2 not in matches
+
+    # Deleting the canonical chunk orphans the sources deduplicated onto it
+    dedup.record_duplicates("/v2.pdf", {"b": ("a", {}), "c": ("a", {})})
+    assert [chunk_id for chunk_id, _ in dedup.duplicates_of("a")] == ["b", "c"]
+    assert dedup.remove(["c"]) == set() and dedup.duplicate_ids_of(["a"]) == ["b"]
+    assert dedup.remove(["a"]) == {"/v2.pdf"} and dedup.duplicate_ids_of(["a"]) == []
+    assert dedup.assign("/v2.pdf", ["b"], [revision[0]]) == {}
+
+
+def test_canonicals_are_reserved_until_their_write_commits(tmp_path) -> None:
+    dedup = ChunkDeduplicator(tmp_path / "dedup.sqlite3")
+
+    # two files in flight together: the second is caught against the first's reservation
+    assert dedup.assign("/one.pdf", ["a"], [Document(page_content=POLICY)]) == {}
+    assert dedup.assign("/two.pdf", ["b"], [Document(page_content=POLICY)])[0].canonical_id == "a"
+    dedup.record_duplicates("/two.pdf", {"b": ("a", {})})
+
+    # the first file's write failed: nothing may point at its chunk any more
+    assert dedup.release(["a"]) == {"/two.pdf"}
+    assert dedup.assign("/three.pdf", ["c"], [Document(page_content=POLICY)]) == {}
+    dedup.commit(["c"])
+    assert dedup.assign("/four.pdf", ["d"], [Document(page_content="Remote work needs a signed agreement.")]) == {}
+    dedup.close()
+
+    # only committed canonicals are persisted
+    dedup = ChunkDeduplicator(tmp_path / "dedup.sqlite3")
+    assert dedup.assign("/six.pdf", ["f"], [Document(page_content="Remote work needs a signed agreement.")]) == {}
+    match = dedup.assign("/five.pdf", ["e"], [Document(page_content=POLICY.replace("reimbursement", "refund"))])[0]
+    assert match.canonical_id == "c" and match.kind == NEAR
@@ -0,0 +1,24 @@
+from docuflow.core.ingestion.chunk_ids import ChunkIdAssigner
+from docuflow.schemas.document import Document
+
+
+def test_chunk_ids_are_stable_and_content_derived() -> None:
+    docs = [
+        Document(page_content="intro", metadata={"Header 1": "A"}),
+        Document(page_content="body", metadata={"Header 1": "A"}),
+        Document(page_content="intro", metadata={"Header 1": "A"}),
+    ]
+
+    ids = ChunkIdAssigner("/data/manual.pdf").assign(docs)
+
+    # Same input -> same ids, repeated chunk stays unique
+    assert ids == ChunkIdAssigner("/data/manual.pdf").assign(docs)
+    assert len(set(ids)) == 3
+
+    # Editing one chunk changes only that chunk's id
+    edited = [docs[0], Document(page_content="body v2", metadata={"Header 1": "A"}), docs[2]]
+    edited_ids = ChunkIdAssigner("/data/manual.pdf").assign(edited)
+    assert [a == b for a, b in zip(ids, edited_ids)] == [True, False, True]
+
+    # Same content from another source never collides
+    assert set(ids).isdisjoint(ChunkIdAssigner("/data/other.pdf").assign(docs))
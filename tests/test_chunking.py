@@ -0,0 +1,59 @@
+from docuflow.core.ingestion.chunking import MarkdownChunker, get_sections, get_sections_langchain, iter_sections
+
+
+def test_streamed_sections_keep_headers_across_windows() -> None:
+    windows = [
+        "# Manual\n\nIntro text.\n\n## Install\n\nStep one.\n",
+        "Step two, continued on the next page.\n\n```\n# not a header\n```\n",
+        "### Linux\n\nUse the package.\n\n**Uninstall**\n\nRemove it.\n",
+    ]
+
+    streamed = [doc for batch in iter_sections(windows) for doc in batch]
+
+    assert [doc.metadata for doc in streamed] == [
+        {"Header 1": "Manual"},
+        {"Header 1": "Manual", "Header 2": "Install"},
+        {"Header 1": "Manual", "Header 2": "Install"},
+        {"Header 1": "Manual", "Header 2": "Install", "Header 3": "Linux"},
+        {"Header 1": "Manual", "Header 2": "Uninstall"},
+    ]
+    # Same headers as chunking the whole text at once
+    whole = get_sections("".join(windows))
+    assert {tuple(doc.metadata.items()) for doc in streamed} == {tuple(doc.metadata.items()) for doc in whole}
+
+
+def test_native_chunker_matches_langchain_and_records_offsets() -> None:
+    sentence = "Retrieval quality depends on chunk boundaries. "
+    markdown = (
+        "# Guide\n\nShort intro.\n\n"
+        "## Details\n\n" + sentence * 30 + "\n\n"
+        "**Bold section** with text\n\n"
+        "  indented line\n```\n# code, not a header\n\n```\n"
+        "### Deep\n\n" + "x" * 1200 + "\n"
+    )
+
+    native = get_sections(markdown)
+    reference = get_sections_langchain(markdown)
+
+    assert [(d.page_content, d.metadata) for d in native] == [(d.page_content, d.metadata) for d in reference]
+    for doc in native:
+        assert doc.start_index is not None and doc.end_index is not None
+        assert 0 <= doc.start_index < doc.end_index <= len(markdown)
+        if "\n" not in doc.page_content:
+            assert markdown[doc.start_index : doc.end_index] == doc.page_content
+
+
+def test_chunker_packs_to_length_function_budget() -> None:
+    def count_words(texts):
+        return [len(text.split()) for text in texts]
+
+    body = " ".join(f"word{i}" for i in range(1000))
+    chunker = MarkdownChunker(chunk_size=50, chunk_overlap=10, length_function=count_words)
+    documents = chunker.split(f"# Title\n\n{body}")
+
+    sizes = count_words([doc.page_content for doc in documents])
+    # Never over budget, and packed close to it rather than cut short
+    assert max(sizes) <= 50
+    assert min(sizes[:-1]) >= 40
+    assert documents[0].page_content.startswith("word0 ")
+    assert documents[-1].page_content.endswith("word999")
@@ -0,0 +1,95 @@
+import threading
+from typing import List, Sequence
+
+import pytest
+
+from docuflow.interfaces import ITextEmbedder
+from docuflow.services import CachedTextEmbedder
+
+
+class CountingEmbedder(ITextEmbedder):
+    def __init__(self) -> None:
+        self.embedded: List[str] = []
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        self.embedded.extend(texts)
+        return [[float(len(text)), 1.0, 0.0] for text in texts]
+
+
+def test_cache_reuses_vectors_across_calls_and_restarts(tmp_path) -> None:
+    inner = CountingEmbedder()
+    cache = CachedTextEmbedder(inner, cache_path=tmp_path / "cache.sqlite3", namespace="test-model")
+
+    first = cache.embed(["legal footer", "intro", "legal  footer"])
+    assert inner.embedded == ["legal footer", "intro"]
+    assert first[0] == first[2]
+
+    # Persisted: a new instance serves everything from disk
+    cache.close()
+    reopened = CachedTextEmbedder(inner, cache_path=tmp_path / "cache.sqlite3", namespace="test-model")
+    assert reopened.embed(["intro", "legal footer"]) == [first[1], first[0]]
+    assert len(inner.embedded) == 2
+    assert reopened.stats()["hits"] == 2
+
+    # Another model never sees these vectors
+    other = CachedTextEmbedder(inner, cache_path=tmp_path / "cache.sqlite3", namespace="other-model")
+    other.embed(["intro"])
+    assert len(inner.embedded) == 3
+
+
+def test_cache_evicts_least_recently_used(tmp_path) -> None:
+    inner = CountingEmbedder()
+    # each vector is 3 float32 = 12 bytes, room for two entries
+    cache = CachedTextEmbedder(inner, cache_path=tmp_path / "cache.sqlite3", namespace="m", max_bytes=30)
+
+    cache.embed(["a"])
+    cache.embed(["b"])
+    cache.embed(["a"])  # a is now more recent than b
+    cache.embed(["c"])  # over the cap -> evicts b
+
+    inner.embedded.clear()
+    cache.embed(["a", "b"])
+    assert inner.embedded == ["b"]
+
+
+def test_namespace_comes_from_the_wrapped_embedder(tmp_path) -> None:
+    with pytest.raises(ValueError, match="namespace"):
+        CachedTextEmbedder(CountingEmbedder(), cache_path=tmp_path / "cache.sqlite3")
+
+    inner = CountingEmbedder()
+    inner.model_id = "bge-small|fp16=True"
+    cache = CachedTextEmbedder(inner, cache_path=tmp_path / "cache.sqlite3")
+    cache.embed(["intro"])
+
+    other = CountingEmbedder()
+    other.model_id = "bge-small|onnx|int8=True"
+    CachedTextEmbedder(other, cache_path=tmp_path / "cache.sqlite3").embed(["intro"])
+    assert cache.namespace == inner.model_id and other.embedded == ["intro"]
+
+
+class BarrierEmbedder(CountingEmbedder):
+    """Holds each call until `parties` callers are embedding at once"""
+
+    def __init__(self, parties: int) -> None:
+        super().__init__()
+        self.barrier = threading.Barrier(parties, timeout=5)
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        self.barrier.wait()
+        return super().embed(texts)
+
+
+def test_concurrent_misses_of_one_text_are_counted_once_in_the_size(tmp_path) -> None:
+    inner = BarrierEmbedder(parties=2)
+    cache = CachedTextEmbedder(inner, cache_path=tmp_path / "cache.sqlite3", namespace="m")
+
+    # both callers miss, embed and store the same entry
+    threads = [threading.Thread(target=cache.embed, args=(["intro"],)) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = cache.stats()
+    assert stats["misses"] == 2 and stats["hits"] == 0
+    assert stats["size_mb"] == 12 / 1e6
@@ -1,3 +1,5 @@
+import numpy as np
+
 from docuflow.services import BGETextEmbedder
 
 
@@ -12,3 +14,13 @@ def test_embed_text() -> None:
     assert isinstance(embed[0], list)
     assert all(isinstance(x, float) for x in embed[0])
     assert len(embed[0]) == 384
+
+
+def test_token_budget_batching_keeps_input_order() -> None:
+    texts = ["ai", "machine learning " * 60, "ml", "deep learning models " * 20, "data"]
+
+    fixed = np.array(BGETextEmbedder(batch_size=2, max_batch_tokens=0).embed(texts))
+    bucketed = np.array(BGETextEmbedder(max_batch_tokens=256).embed(texts))
+
+    # Same vectors in the same positions, whatever batch each text landed in
+    assert np.allclose(fixed, bucketed, atol=1e-4)
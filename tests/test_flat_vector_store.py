@@ -0,0 +1,136 @@
+import numpy as np
+import pytest
+
+from docuflow.services import FlatVectorStore
+
+
+def test_flat_store_exact_top_k_upsert_and_delete(tmp_path) -> None:
+    store = FlatVectorStore(db_path=tmp_path, collection_name="flat", block_rows=2)
+    store.add(
+        ["a", "b", "c"],
+        ["alpha", "beta", "gamma"],
+        [{"source": "x.pdf"}, {"source": "y.pdf"}, {"source": "x.pdf"}],
+        [[1.0, 0.0, 0.0], [0.0, 2.0, 0.0], [0.6, 0.8, 0.0]],
+    )
+
+    results = store.query([1.0, 0.0, 0.0], n_results=2)
+    assert results["ids"] == [["a", "c"]]
+    assert results["documents"] == [["alpha", "gamma"]]
+    # squared L2 between unit vectors
+    assert np.allclose(results["distances"][0], [0.0, 0.8])
+
+    batch = store.query_batch(np.array([[0.0, 1.0, 0.0], [1.0, 0.0, 0.0]]), n_results=1)
+    assert batch["ids"] == [["b"], ["a"]]
+
+    # upsert replaces the vector, delete tombstones it
+    store.add(["a"], ["alpha v2"], [{"source": "x.pdf"}], [[0.0, 0.0, 1.0]])
+    store.delete(["b"])
+    assert store.query([0.0, 1.0, 0.0], n_results=5)["ids"] == [["c", "a"]]
+    assert store.get(where={"source": "x.pdf"}, include=())["ids"] == ["c", "a"]
+    assert store.count() == 2 and store.dead_ratio == 0.5
+    # stored vectors are the unit vectors, row per returned id
+    records = store.get(ids=["a", "c"], include=("embeddings",))
+    assert records["ids"] == ["c", "a"] and np.allclose(records["embeddings"], [[0.6, 0.8, 0.0], [0.0, 0.0, 1.0]])
+
+
+def test_flat_store_compacts_and_reopens_from_disk(tmp_path) -> None:
+    store = FlatVectorStore(db_path=tmp_path, collection_name="flat")
+    vectors = np.eye(4, dtype=np.float32)
+    store.add(["a", "b", "c", "d"], ["1", "2", "3", "4"], [{"n": i} for i in range(4)], vectors)
+    store.delete(["a", "c"])
+    store.compact()
+    assert store.dead_ratio == 0.0
+    assert len(list((tmp_path / "flat").glob("vectors-*.f32"))) == 1
+    store.close()
+
+    reopened = FlatVectorStore(db_path=tmp_path, collection_name="flat")
+    assert isinstance(reopened._vectors, np.memmap)
+    assert reopened.query(vectors[3], n_results=1)["ids"] == [["d"]]
+    assert reopened.get(ids=["b"])["metadatas"] == [{"n": 1}]
+    assert reopened.get(ids=[])["ids"] == []
+
+
+def test_quantized_first_pass_rescores_to_exact_results(tmp_path) -> None:
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((500, 64)).astype(np.float32)
+    queries = vectors[:20] + 0.1 * rng.standard_normal((20, 64)).astype(np.float32)
+    ids = [str(i) for i in range(len(vectors))]
+
+    exact = FlatVectorStore(db_path=tmp_path, collection_name="exact")
+    exact.add(ids, ids, [{}] * len(ids), vectors)
+    expected = exact.query_batch(queries, n_results=5)
+
+    for quantization in ("int8", "binary"):
+        store = FlatVectorStore(
+            db_path=tmp_path, collection_name=quantization, quantization=quantization, oversample=10
+        )
+        store.add(ids, ids, [{}] * len(ids), vectors)
+        results = store.query_batch(queries, n_results=5)
+        assert [query_ids[0] for query_ids in results["ids"]] == ids[:20]
+        # rescored distances are exact for the candidates found
+        assert np.allclose(results["distances"][0][0], expected["distances"][0][0], atol=1e-5)
+
+    # codes are rebuilt from the float32 vectors when missing
+    store.close()
+    for path in (tmp_path / "binary").glob("codes-*"):
+        path.unlink()
+    reopened = FlatVectorStore(db_path=tmp_path, collection_name="binary", quantization="binary", oversample=10)
+    assert reopened.query(queries[3], n_results=1)["ids"] == [["3"]]
+
+
+def test_flat_store_filters_before_scoring(tmp_path) -> None:
+    store = FlatVectorStore(db_path=tmp_path, collection_name="flat")
+    metadata = [
+        {"source": "a.pdf", "Header 1": "Intro", "page": 1},
+        {"source": "a.pdf", "Header 1": "Scope", "page": 4},
+        {"source": "b.pdf", "Header 1": "Intro", "page": 2},
+        {"source": "b.pdf", "page": 9},
+    ]
+    store.add(["a1", "a2", "b1", "b2"], ["1", "2", "3", "4"], metadata, np.ones((4, 3), dtype=np.float32))
+
+    def ids(where):
+        return store.query([1.0, 1.0, 1.0], n_results=10, where=where)["ids"][0]
+
+    assert sorted(ids({"source": "b.pdf"})) == ["b1", "b2"]
+    assert sorted(ids({"source": "a.pdf", "Header 1": "Intro"})) == ["a1"]
+    assert sorted(ids({"page": {"$gte": 2, "$lt": 9}})) == ["a2", "b1"]
+    assert sorted(ids({"Header 1": {"$in": ["Scope", "Outro"]}})) == ["a2"]
+    assert sorted(ids({"$or": [{"page": 9}, {"Header 1": {"$ne": "Intro"}}]})) == ["a2", "b2"]
+    assert ids({"source": "c.pdf"}) == []
+
+    # the metadata index follows deletes and compaction
+    store.delete(["b1"])
+    store.compact()
+    assert ids({"Header 1": "Intro"}) == ["a1"]
+    assert store.get(where={"page": {"$gt": 3}}, include=())["ids"] == ["a2", "b2"]
+    with pytest.raises(ValueError):
+        ids({"$and": []})
+
+
+def test_failed_add_leaves_no_orphaned_rows(tmp_path, monkeypatch) -> None:
+    store = FlatVectorStore(db_path=tmp_path, collection_name="flat", quantization="int8")
+    vectors = np.eye(3, dtype=np.float32)
+
+    # the very first add fails: nothing may survive, not even the dimension
+    with pytest.raises(TypeError):
+        store.add(["a"], ["1"], [{"bad": object()}], vectors[:1])
+    assert store.dim is None
+    store.add(["a"], ["1"], [{"n": 0}], vectors[:1])
+
+    # a failure after the vectors were appended cuts them off again
+    def broken_index(first_row: int) -> None:
+        raise RuntimeError("disk I/O error")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(store, "_index_metadata", broken_index)
+        with pytest.raises(RuntimeError):
+            store.add(["b"], ["2"], [{"n": 1}], vectors[1:2])
+    store.add(["c"], ["3"], [{"n": 2}], vectors[2:3])
+
+    assert store.query(vectors[2], n_results=3)["ids"] == [["c", "a"]]
+    assert store.count() == 2 and store.dead_ratio == 0.0
+    store.close()
+
+    reopened = FlatVectorStore(db_path=tmp_path, collection_name="flat", quantization="int8")
+    assert reopened.query(vectors[2], n_results=3)["ids"] == [["c", "a"]]
+    assert reopened.get(include=("metadatas",))["metadatas"] == [{"n": 0}, {"n": 2}]
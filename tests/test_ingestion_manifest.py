@@ -0,0 +1,34 @@
+import os
+
+from docuflow.core.ingestion.manifest import (
+    CONTENT_UNCHANGED,
+    MODIFIED,
+    NEW,
+    UNCHANGED,
+    IngestionManifest,
+)
+
+
+def test_manifest_skips_unchanged_and_detects_changes(tmp_path) -> None:
+    manifest = IngestionManifest(tmp_path / "manifest.sqlite3")
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"first version")
+
+    decision = manifest.check(pdf)
+    assert decision.reason == NEW
+    manifest.record(decision, pdf, ["a", "b"])
+
+    assert manifest.check(pdf).reason == UNCHANGED
+
+    # touched but same bytes -> content hash fallback
+    stat = pdf.stat()
+    os.utime(pdf, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert manifest.check(pdf).reason == CONTENT_UNCHANGED
+    assert manifest.check(pdf).reason == UNCHANGED
+
+    pdf.write_bytes(b"second version")
+    assert manifest.check(pdf).reason == MODIFIED
+
+    entry = manifest.get(decision.source)
+    assert entry is not None
+    assert entry.chunk_ids == ["a", "b"]
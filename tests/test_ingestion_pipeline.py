@@ -0,0 +1,312 @@
+import asyncio
+import hashlib
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Set
+
+import numpy as np
+import pytest
+
+from docuflow.configs import settings
+from docuflow.core.ingestion import ingestion_pipeline
+from docuflow.core.ingestion.dedup import ChunkDeduplicator
+from docuflow.core.ingestion.ingestion_pipeline import IngestionPipeline
+from docuflow.core.ingestion.manifest import IngestionManifest, source_key
+from docuflow.interfaces import Embeddings, ITextEmbedder, IVectorStore, MetadataFilter
+from docuflow.services.bm25_index import BM25Index
+from docuflow.utils.aio import shutdown_runners
+
+
+class MemoryStore(IVectorStore):
+    """Dict-backed vector store, `where` supports plain equality"""
+
+    def __init__(self) -> None:
+        self.records: Dict[str, tuple] = {}
+        self.deleted: List[str] = []
+
+    def add(self, ids, documents, metadata, embeddings: Embeddings) -> None:
+        for chunk_id, document, meta, vector in zip(ids, documents, metadata, embeddings):
+            self.records[chunk_id] = (document, dict(meta), np.asarray(vector, dtype=np.float32))
+
+    def query(self, query_embedding, n_results: int = 5, where: Optional[MetadataFilter] = None) -> dict[str, Any]:
+        ids = self._match(where)
+        ids.sort(key=lambda chunk_id: -float(np.dot(self.records[chunk_id][2], query_embedding)))
+        ids = ids[:n_results]
+        return {"ids": [ids], "documents": [[self.records[i][0] for i in ids]]}
+
+    def get(
+        self, ids=None, where: Optional[MetadataFilter] = None, include: Sequence[str] = ("documents", "metadatas")
+    ):
+        matched = [chunk_id for chunk_id in self._match(where) if ids is None or chunk_id in ids]
+        result = {
+            "ids": matched,
+            "documents": [self.records[i][0] for i in matched],
+            "metadatas": [self.records[i][1] for i in matched],
+        }
+        if "embeddings" in include:
+            result["embeddings"] = [self.records[i][2] for i in matched]
+        return result
+
+    def delete(self, ids: List[str]) -> None:
+        for chunk_id in ids:
+            self.records.pop(chunk_id, None)
+        self.deleted.extend(ids)
+
+    def _match(self, where: Optional[Mapping[str, Any]]) -> List[str]:
+        where = where or {}
+        return [
+            chunk_id
+            for chunk_id, (_, meta, _) in self.records.items()
+            if all(meta.get(key) == value for key, value in where.items())
+        ]
+
+    def sources(self) -> List[str]:
+        return sorted({meta["source"] for _, meta, _ in self.records.values()})
+
+
+class FailingStore(MemoryStore):
+    """Rejects writes of the sources in `failing`"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.failing: Set[str] = set()
+
+    def add(self, ids, documents, metadata, embeddings: Embeddings) -> None:
+        if any(meta["source"] in self.failing for meta in metadata):
+            raise OSError("disk full")
+        super().add(ids, documents, metadata, embeddings)
+
+
+class FailingLexicalIndex(BM25Index):
+    """Fails the next `failures` adds"""
+
+    def __init__(self, db_file: Path) -> None:
+        super().__init__(db_file)
+        self.failures = 0
+
+    def add(self, ids, documents, sources) -> None:
+        if self.failures:
+            self.failures -= 1
+            raise OSError("disk full")
+        super().add(ids, documents, sources)
+
+
+class CountingEmbedder(ITextEmbedder):
+    """Deterministic vectors from the text hash, records every text it embeds"""
+
+    def __init__(self) -> None:
+        self.embedded: List[str] = []
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        self.embedded.extend(texts)
+        vectors = []
+        for text in texts:
+            digest = np.frombuffer(hashlib.sha256(text.encode()).digest(), dtype=np.uint8)[:8].astype(np.float32)
+            vectors.append((digest / np.linalg.norm(digest)).tolist())
+        return vectors
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch) -> IngestionPipeline:
+    # markdown inputs, read as-is instead of going through pdf conversion
+    monkeypatch.setattr(ingestion_pipeline, "convert_pdf_to_md", lambda path: Path(path).read_text(encoding="utf-8"))
+    monkeypatch.setattr(settings, "md_dir", tmp_path / "markdown")
+    return IngestionPipeline(
+        embedder=CountingEmbedder(),
+        vector_store=MemoryStore(),
+        manifest=IngestionManifest(tmp_path / "manifest.sqlite3"),
+    )
+
+
+@pytest.fixture
+def dedup_pipeline(tmp_path, pipeline) -> IngestionPipeline:
+    pipeline.vector_store = FailingStore()
+    pipeline.deduplicator = ChunkDeduplicator(tmp_path / "dedup.sqlite3")
+    return pipeline
+
+
+POLICY = (
+    "Employees must submit expense reports within thirty days of travel completion "
+    "and attach all receipts so that finance can review and approve the reimbursement."
+)
+
+
+def write_doc(path: Path, *sections: str) -> Path:
+    path.write_text("\n\n".join(f"# {title}\n\n{title} body text." for title in sections), encoding="utf-8")
+    return path
+
+
+def test_sync_skips_reingests_and_purges_only_when_asked(tmp_path, pipeline) -> None:
+    store: MemoryStore = pipeline.vector_store  # type: ignore[assignment]
+    a = write_doc(tmp_path / "a.md", "Alpha", "Beta")
+    b = write_doc(tmp_path / "b.md", "Gamma")
+
+    report = pipeline.sync([a, b])
+    assert report.ingested == {"new": 2} and not report.failed
+    assert store.sources() == sorted([source_key(a), source_key(b)])
+
+    report = pipeline.sync([a, b])
+    assert report.total_ingested == 0 and report.skipped == {"unchanged": 2}
+
+    write_doc(a, "Alpha", "Beta", "Delta")
+    report = pipeline.sync([a, b])
+    assert report.ingested == {"modified": 1} and report.skipped == {"unchanged": 1}
+
+    # purging is opt-in
+    b.unlink()
+    report = pipeline.sync([a])
+    assert report.purged == 0 and source_key(b) in store.sources()
+
+    report = pipeline.sync([a], purge_missing=True)
+    assert report.purged == 1 and store.sources() == [source_key(a)]
+
+
+def test_sync_of_no_files_never_purges(tmp_path, pipeline) -> None:
+    store: MemoryStore = pipeline.vector_store  # type: ignore[assignment]
+    a = write_doc(tmp_path / "a.md", "Alpha")
+    pipeline.sync([a])
+
+    # e.g. an unmounted pdf directory: the file looks gone, but nothing was listed
+    a.unlink()
+    report = pipeline.sync([], purge_missing=True)
+    assert report.purged == 0 and store.sources() == [source_key(a)]
+
+
+def test_reingest_embeds_only_changed_chunks_and_deletes_stale_ids(tmp_path, pipeline) -> None:
+    store: MemoryStore = pipeline.vector_store  # type: ignore[assignment]
+    embedder: CountingEmbedder = pipeline.embedder  # type: ignore[assignment]
+    doc = write_doc(tmp_path / "doc.md", "Alpha", "Beta", "Gamma")
+    pipeline.sync([doc])
+    before = store.get(where={"source": source_key(doc)}, include=())["ids"]
+    assert len(before) == 3
+
+    embedder.embedded.clear()
+    doc.write_text(
+        doc.read_text(encoding="utf-8").replace("Beta body text.", "Beta body, rewritten."), encoding="utf-8"
+    )
+    report = pipeline.sync([doc])
+
+    after = store.get(where={"source": source_key(doc)}, include=())["ids"]
+    assert report.ingested == {"modified": 1}
+    assert embedder.embedded == [text for text in store.get(ids=after)["documents"] if "rewritten" in text]
+    assert len(set(before) & set(after)) == 2
+    assert store.deleted == sorted(set(before) - set(after))
+
+
+def test_failed_lexical_write_is_repaired_on_the_next_run(tmp_path, pipeline) -> None:
+    store: MemoryStore = pipeline.vector_store  # type: ignore[assignment]
+    index = FailingLexicalIndex(tmp_path / "lexical.sqlite3")
+    pipeline.lexical_index = index
+    doc = write_doc(tmp_path / "doc.md", "Alpha", "Beta")
+    index.failures = 1
+
+    # the store write went through, the index write did not
+    report = pipeline.sync([doc])
+    assert set(report.failed) == {source_key(doc)} and len(store.records) == 2 and index.count() == 0
+
+    # the chunks are unchanged in the store, they still reach the index
+    report = pipeline.sync([doc])
+    assert report.ingested == {"new": 1} and not report.failed
+    assert index.missing(list(store.records)) == []
+    assert index.search("beta body", top_k=1)[0][0] in store.records
+
+
+def test_duplicates_are_not_embedded_but_stored_for_their_source(tmp_path, dedup_pipeline) -> None:
+    store: MemoryStore = dedup_pipeline.vector_store  # type: ignore[assignment]
+    embedder: CountingEmbedder = dedup_pipeline.embedder  # type: ignore[assignment]
+    dedup: ChunkDeduplicator = dedup_pipeline.deduplicator  # type: ignore[assignment]
+    original = tmp_path / "original.md"
+    original.write_text(f"# Expenses\n\n{POLICY}", encoding="utf-8")
+    # a near duplicate: one word differs
+    copy = tmp_path / "copy.md"
+    copy.write_text(f"# Expenses\n\n{POLICY.replace('reimbursement', 'refund')}", encoding="utf-8")
+
+    report = dedup_pipeline.sync([original, copy])
+    assert report.ingested == {"new": 2} and report.chunks_duplicate == 1
+    assert len(embedder.embedded) == 1
+
+    # the duplicate is a record of its own source, with the canonical chunk's vector
+    (canonical_id,) = store.get(where={"source": source_key(original)}, include=())["ids"]
+    (duplicate_id,) = store.get(where={"source": source_key(copy)}, include=())["ids"]
+    document, metadata, vector = store.records[duplicate_id]
+    assert "refund" in document and metadata["duplicate_of"] == canonical_id
+    np.testing.assert_array_equal(vector, store.records[canonical_id][2])
+    assert [chunk_id for chunk_id, _ in dedup.duplicates_of(canonical_id)] == [duplicate_id]
+
+    # unchanged on the next run; deleting the canonical takes the duplicate along and re-ingests its source
+    report = dedup_pipeline.sync([original, copy])
+    assert report.total_ingested == 0 and len(embedder.embedded) == 1
+    original.write_text("# Expenses\n\nExpenses are reimbursed monthly.", encoding="utf-8")
+    report = dedup_pipeline.sync([original, copy])
+    assert report.ingested == {"modified": 1, "canonical_removed": 1} and report.chunks_duplicate == 0
+    (copy_id,) = store.get(where={"source": source_key(copy)}, include=())["ids"]
+    assert copy_id == duplicate_id and "duplicate_of" not in store.records[copy_id][1]
+    assert dedup.duplicates_of(canonical_id) == []
+
+
+def test_failed_write_does_not_leave_a_canonical_behind(tmp_path, dedup_pipeline) -> None:
+    store: FailingStore = dedup_pipeline.vector_store  # type: ignore[assignment]
+    first = tmp_path / "first.md"
+    first.write_text(f"# Expenses\n\n{POLICY}", encoding="utf-8")
+    second = tmp_path / "second.md"
+    second.write_text(f"# Expenses\n\n{POLICY}", encoding="utf-8")
+    store.failing.add(source_key(first))
+
+    report = dedup_pipeline.sync([first, second])
+
+    # the second file stored the chunk itself instead of pointing at the unwritten one
+    assert set(report.failed) == {source_key(first)} and report.chunks_duplicate == 0
+    assert store.sources() == [source_key(second)]
+
+    store.failing.clear()
+    report = dedup_pipeline.sync([first, second])
+    assert report.ingested == {"new": 1} and report.chunks_duplicate == 1
+    (duplicate_id,) = store.get(where={"source": source_key(first)}, include=())["ids"]
+    (canonical_id,) = store.get(where={"source": source_key(second)}, include=())["ids"]
+    assert store.records[duplicate_id][1]["duplicate_of"] == canonical_id
+
+
+def test_parallel_sync_isolates_failures_and_dedups_chunks_in_flight(tmp_path, dedup_pipeline) -> None:
+    # pool workers convert for real: markdown goes through pymupdf, the corrupt pdf fails to open
+    store: MemoryStore = dedup_pipeline.vector_store  # type: ignore[assignment]
+    embedder: CountingEmbedder = dedup_pipeline.embedder  # type: ignore[assignment]
+    docs = [write_doc(tmp_path / f"{name}.md", name.title(), "Shared") for name in ("alpha", "beta", "gamma")]
+    broken = tmp_path / "broken.pdf"
+    broken.write_bytes(b"%PDF-1.7 not really")
+
+    report = dedup_pipeline.sync([*docs, broken], workers=2)
+
+    assert report.ingested == {"new": 3} and set(report.failed) == {source_key(broken)}
+    # the shared section is embedded once, even though all three files were in flight together
+    assert report.chunks_checked == 6 and report.chunks_duplicate == 2
+    assert len(embedder.embedded) == 4 and sum(text.startswith("Shared") for text in embedder.embedded) == 1
+    # embeddings batched across documents still line up with their chunks
+    for document, _, vector in store.records.values():
+        np.testing.assert_allclose(vector, embedder.embed([document])[0], rtol=1e-6)
+    assert sorted(dedup_pipeline.manifest.sources()) == sorted(source_key(doc) for doc in docs)
+
+
+def test_aingest_reingests_sources_that_lost_their_canonical_chunk(tmp_path, dedup_pipeline, monkeypatch) -> None:
+    # conversion worker processes read their settings from the environment
+    monkeypatch.setenv("MD_DIR", str(tmp_path / "markdown"))
+    store: MemoryStore = dedup_pipeline.vector_store  # type: ignore[assignment]
+    original = tmp_path / "original.md"
+    original.write_text(f"# Expenses\n\n{POLICY}", encoding="utf-8")
+    copy = tmp_path / "copy.md"
+    copy.write_text(f"# Expenses\n\n{POLICY}", encoding="utf-8")
+
+    async def main():
+        await dedup_pipeline.aingest(original)
+        await dedup_pipeline.aingest(copy)
+        assert all(
+            "duplicate_of" in metadata for metadata in store.get(where={"source": source_key(copy)})["metadatas"]
+        )
+        # the canonical chunk vanishes from the original, the copy must now store its own
+        original.write_text("# Expenses\n\nExpenses are reimbursed monthly.", encoding="utf-8")
+        await dedup_pipeline.aingest(original)
+
+    try:
+        asyncio.run(main())
+    finally:
+        shutdown_runners()
+    assert store.sources() == sorted([source_key(original), source_key(copy)])
+    assert not any("duplicate_of" in metadata for _, metadata, _ in store.records.values())
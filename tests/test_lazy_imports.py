@@ -0,0 +1,15 @@
+import subprocess
+import sys
+
+HEAVY = ["torch", "FlagEmbedding", "chromadb", "onnxruntime", "easyocr", "pymupdf4llm", "langchain_text_splitters"]
+
+
+def test_importing_entry_points_does_not_load_heavy_dependencies() -> None:
+    code = (
+        "import sys\n"
+        "import docuflow.core.ingestion, docuflow.services, docuflow.main\n"
+        f"print([name for name in {HEAVY!r} if name in sys.modules])\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+
+    assert result.stdout.strip() == "[]"
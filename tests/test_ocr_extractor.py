@@ -0,0 +1,95 @@
+import threading
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+from docuflow.core.processing.parsers import ocr_extractor  # noqa: E402
+from docuflow.core.providers import ocr_provider  # noqa: E402
+from docuflow.schemas import RawDocument  # noqa: E402
+from docuflow.schemas.raw_document import FileContent  # noqa: E402
+
+
+class ColorReader:
+    """Reads an image's mean colour as its text; image files are loaded as RGB, like easyocr"""
+
+    def readtext(self, image, batch_size: int = 1):
+        if isinstance(image, str):
+            image = cv2.imread(image, cv2.IMREAD_COLOR)
+            if image is None:
+                raise ValueError(f"unreadable image {image}")
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        red, green, blue = (int(value) for value in image.reshape(-1, 3).mean(axis=0))
+        return [([0, 0, 0, 0], f"red {red}", 0.9), ([0, 0, 0, 0], f"green {green} blue {blue}", 0.9)]
+
+
+@pytest.fixture
+def parser(monkeypatch) -> ocr_extractor.ImageParser:
+    monkeypatch.setattr(ocr_extractor, "get_ocr_reader", lambda languages=None: ColorReader())
+    monkeypatch.setattr(ocr_provider, "_load_reader", lambda languages: ColorReader())
+    monkeypatch.setattr(ocr_provider, "_pools", {})
+    return ocr_extractor.ImageParser()
+
+
+def raw_image(path: Path, format: str = ".png") -> RawDocument:
+    return RawDocument(FileContent(path, path.stat().st_size), str(path), {"format": format})
+
+
+def write_image(path: Path, rgb) -> Path:
+    image = np.zeros((8, 8, 3), dtype=np.uint8)
+    image[:] = rgb[::-1]  # cv2 writes BGR
+    cv2.imwrite(str(path), image)
+    return path
+
+
+def test_parse_many_matches_parse_and_isolates_errors(tmp_path, parser) -> None:
+    images = [raw_image(write_image(tmp_path / f"{i}.png", (10 * i, 100, 250 - i))) for i in range(12)]
+    broken = tmp_path / "broken.png"
+    broken.write_bytes(b"not an image")
+    images.insert(5, raw_image(broken))
+    images.insert(9, raw_image(write_image(tmp_path / "slide.png", (1, 2, 3)), format=".gif"))
+
+    results = {result.source: result for result in parser.parse_many(images, workers=2)}
+
+    assert sorted(results) == sorted(image.source for image in images)
+    for image in images:
+        result = results[image.source]
+        try:
+            expected = parser.parse(image)
+        except Exception:
+            assert result.error and result.text == ""
+        else:
+            assert result.error is None and result.text == expected
+    assert sum(result.error is not None for result in results.values()) == 2
+    assert results[images[0].source].text == "red 0\ngreen 100 blue 250"
+
+
+class SlowRedReader(ColorReader):
+    """Holds pure-red images until `release` is set"""
+
+    def __init__(self) -> None:
+        self.release = threading.Event()
+
+    def readtext(self, image, batch_size: int = 1):
+        result = super().readtext(image, batch_size)
+        if result[0][1] == "red 255":
+            self.release.wait(timeout=5)
+        return result
+
+
+def test_parse_many_yields_results_as_they_finish(tmp_path, parser, monkeypatch) -> None:
+    reader = SlowRedReader()
+    monkeypatch.setattr(ocr_provider, "_load_reader", lambda languages: reader)
+    slow = raw_image(write_image(tmp_path / "slow.png", (255, 0, 0)))
+    images = [slow] + [raw_image(write_image(tmp_path / f"{i}.png", (0, i, 0))) for i in range(4)]
+
+    results = parser.parse_many(images, workers=2)
+    try:
+        # the other reader works through the rest while the first image is still held
+        early = [next(results).source for _ in range(4)]
+        assert slow.source not in early
+    finally:
+        reader.release.set()
+    assert [result.source for result in results] == [slow.source]
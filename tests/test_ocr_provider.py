@@ -0,0 +1,97 @@
+import threading
+import time
+from typing import List
+
+import pytest
+
+from docuflow.core.providers import ocr_provider
+from docuflow.core.providers.ocr_provider import OCRReaderPool, get_ocr_reader
+
+
+class FakeLoader:
+    """Stands in for easyocr: records loads, can hold them or fail the first `failures`"""
+
+    def __init__(self, failures: int = 0) -> None:
+        self.loaded: List[tuple] = []
+        self.failures = failures
+        self.hold: dict = {}  # language key -> event the load waits for
+        self.lock = threading.Lock()
+
+    def __call__(self, languages: tuple) -> object:
+        if languages in self.hold:
+            self.hold[languages].wait(timeout=5)
+        with self.lock:
+            if self.failures:
+                self.failures -= 1
+                raise RuntimeError("model download failed")
+            self.loaded.append(languages)
+        return object()
+
+
+@pytest.fixture
+def loader(monkeypatch) -> FakeLoader:
+    fake = FakeLoader()
+    monkeypatch.setattr(ocr_provider, "_load_reader", fake)
+    monkeypatch.setattr(ocr_provider, "_readers", {})
+    monkeypatch.setattr(ocr_provider, "_load_locks", {})
+    monkeypatch.setattr(ocr_provider, "_pools", {})
+    return fake
+
+
+def test_registry_loads_once_and_does_not_block_other_languages(loader) -> None:
+    assert get_ocr_reader(["en"]) is get_ocr_reader(["en"])
+    assert loader.loaded == [("en",)]
+
+    loader.hold[("fr",)] = threading.Event()
+    slow = threading.Thread(target=get_ocr_reader, args=(["fr"],))
+    slow.start()
+    try:
+        # a reader of another language set loads while French is still loading
+        done = threading.Thread(target=get_ocr_reader, args=(["de"],))
+        done.start()
+        done.join(timeout=2)
+        assert not done.is_alive() and ("de",) in loader.loaded
+    finally:
+        loader.hold[("fr",)].set()
+        slow.join()
+    assert sorted(loader.loaded) == [("de",), ("en",), ("fr",)]
+
+
+def test_pool_readers_are_its_own_and_bounded(loader) -> None:
+    shared = get_ocr_reader(["en"])
+    pool = OCRReaderPool(size=2, languages=["en"])
+
+    with pool.acquire() as first, pool.acquire() as second:
+        assert shared not in (first, second) and first is not second
+    pool.warm()
+    with pool.acquire() as again:
+        assert again in (first, second)
+    assert len(loader.loaded) == 3
+
+
+def test_failed_load_frees_its_slot(loader) -> None:
+    pool = OCRReaderPool(size=1, languages=["en"])
+    loader.failures = 1
+    loader.hold[("en",)] = threading.Event()
+    errors: List[Exception] = []
+    acquired: List[object] = []
+
+    def use_reader() -> None:
+        try:
+            with pool.acquire() as reader:
+                acquired.append(reader)
+        except RuntimeError as e:
+            errors.append(e)
+
+    # one caller loads the only reader, the other waits for the full pool
+    callers = [threading.Thread(target=use_reader) for _ in range(2)]
+    for caller in callers:
+        caller.start()
+    time.sleep(0.1)
+    loader.hold[("en",)].set()
+    for caller in callers:
+        caller.join(timeout=5)
+
+    # the failed load gave its slot back: the waiting caller loaded a reader instead of hanging
+    assert not any(caller.is_alive() for caller in callers)
+    assert len(errors) == 1 and len(acquired) == 1 and len(loader.loaded) == 1
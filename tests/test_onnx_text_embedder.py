@@ -0,0 +1,82 @@
+from types import SimpleNamespace
+from typing import List
+
+import numpy as np
+import pytest
+
+ort = pytest.importorskip("onnxruntime")
+tokenizers = pytest.importorskip("tokenizers")
+
+from docuflow.services import ONNXTextEmbedder  # noqa: E402
+from docuflow.services.bge_text_embedder import QUERY_INSTRUCTION  # noqa: E402
+
+VOCAB = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "alpha", "beta", "gamma", "delta"]
+
+
+class FakeSession:
+    """Stands in for a BERT export: the CLS state is the bag of the attended token ids"""
+
+    batches: List[np.ndarray] = []
+
+    def __init__(self, path, sess_options=None, providers=None) -> None:
+        self.path = path
+
+    def get_inputs(self):
+        return [SimpleNamespace(name=name) for name in ("input_ids", "attention_mask", "token_type_ids")]
+
+    def run(self, output_names, feeds):
+        input_ids, mask = feeds["input_ids"], feeds["attention_mask"]
+        assert feeds["token_type_ids"].shape == input_ids.shape
+        FakeSession.batches.append(input_ids)
+        hidden = np.zeros((*input_ids.shape, len(VOCAB)), dtype=np.float32)
+        for row in range(len(input_ids)):
+            np.add.at(hidden[row, 0], input_ids[row][mask[row] == 1], 1.0)
+        return [hidden]
+
+
+@pytest.fixture
+def model_dir(tmp_path, monkeypatch):
+    from tokenizers import Tokenizer, models, pre_tokenizers, processors
+
+    tokenizer = Tokenizer(models.WordLevel({token: i for i, token in enumerate(VOCAB)}, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    tokenizer.post_processor = processors.TemplateProcessing(
+        single="[CLS] $A [SEP]", special_tokens=[("[CLS]", 2), ("[SEP]", 3)]
+    )
+    tokenizer.save(str(tmp_path / "tokenizer.json"))
+    (tmp_path / "model.onnx").write_bytes(b"")
+
+    FakeSession.batches = []
+    monkeypatch.setattr(ort, "InferenceSession", FakeSession)
+    return tmp_path
+
+
+def test_embed_array_pads_per_batch_and_keeps_order(model_dir) -> None:
+    embedder = ONNXTextEmbedder(model_dir, quantized=False, max_batch_tokens=8)
+    texts = ["alpha beta gamma delta alpha", "beta", "gamma gamma", "delta"]
+
+    embeddings = embedder.embed_array(texts)
+
+    assert embeddings.shape == (4, len(VOCAB)) and embeddings.dtype == np.float32
+    np.testing.assert_allclose(np.linalg.norm(embeddings, axis=1), 1.0, rtol=1e-6)
+    # [CLS] beta [SEP] -> equal weight on 3 tokens
+    np.testing.assert_allclose(embeddings[1, [2, 3, 5]], 1 / np.sqrt(3), rtol=1e-6)
+    assert embeddings[0, 4] > embeddings[0, 5]
+    # 3, 3, 4 and 7 tokens under a budget of 8: the short two share a batch, nothing is padded to 7
+    assert sorted(batch.shape for batch in FakeSession.batches) == [(1, 4), (1, 7), (2, 3)]
+
+
+def test_embed_queries_prepends_the_retrieval_instruction(model_dir) -> None:
+    embedder = ONNXTextEmbedder(model_dir, quantized=False, max_batch_tokens=0)
+
+    embedder.embed_queries(["alpha"])
+
+    (batch,) = FakeSession.batches
+    expected = len(embedder.tokenizer.encode(QUERY_INSTRUCTION + "alpha").ids)
+    assert batch.shape == (1, expected)
+    assert expected > 3
+
+
+def test_missing_model_file_is_reported(model_dir) -> None:
+    with pytest.raises(FileNotFoundError, match="model.int8.onnx"):
+        ONNXTextEmbedder(model_dir, quantized=True)
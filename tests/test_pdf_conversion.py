@@ -0,0 +1,78 @@
+from pathlib import Path
+
+import pytest
+
+pymupdf = pytest.importorskip("pymupdf")
+pytest.importorskip("pymupdf4llm")
+
+from docuflow.configs import settings  # noqa: E402
+from docuflow.core.ingestion import conversion  # noqa: E402
+from docuflow.core.ingestion.chunking import get_sections, iter_sections  # noqa: E402
+from docuflow.core.ingestion.conversion import convert_pdf_to_md, iter_pdf_pages  # noqa: E402
+
+BODY = "This section describes the policy in detail. " * 6
+
+
+@pytest.fixture(scope="module")
+def handbook(tmp_path_factory) -> Path:
+    """Title on the first page only, one section header per page"""
+    path = tmp_path_factory.mktemp("pdf") / "handbook.pdf"
+    doc = pymupdf.open()
+    for i in range(6):
+        page = doc.new_page()
+        y = 72
+        if i == 0:
+            page.insert_text((72, y), "Employee Handbook", fontsize=24)
+            y += 50
+        page.insert_text((72, y), f"Section {i + 1} Rules", fontsize=16)
+        page.insert_textbox(pymupdf.Rect(72, y + 30, 520, y + 230), BODY, fontsize=10)
+    doc.save(path)
+    return path
+
+
+def test_streamed_pdf_ranks_headers_over_the_whole_document(handbook, monkeypatch) -> None:
+    monkeypatch.setattr(settings, "pdf_parallel_page_threshold", 0)
+
+    streamed = [doc for batch in iter_sections(iter_pdf_pages(handbook, pages_per_window=2)) for doc in batch]
+    whole = get_sections(convert_pdf_to_md(handbook))
+
+    assert [doc.metadata for doc in streamed] == [doc.metadata for doc in whole]
+    # later windows hold no title, their sections still sit under it
+    assert streamed[-1].metadata == {"Header 1": "Employee Handbook", "Header 2": "Section 6 Rules"}
+
+
+def test_streamed_pdf_yields_a_window_before_analysing_the_rest(handbook, monkeypatch) -> None:
+    analysed = []
+    parse_page_range = conversion._parse_page_range
+
+    def recording_parse(pdf_file, pages):
+        analysed.append(pages)
+        return parse_page_range(pdf_file, pages)
+
+    monkeypatch.setattr(conversion, "_parse_page_range", recording_parse)
+    windows = iter_pdf_pages(handbook, pages_per_window=2)
+
+    first = next(windows)
+    assert first.startswith("# Employee Handbook") and analysed == [[0, 1]]
+    assert len(list(windows)) == 2 and analysed[-1] == [4, 5]
+
+
+def test_parallel_conversion_matches_serial(handbook, monkeypatch) -> None:
+    monkeypatch.setattr(settings, "pdf_parallel_page_threshold", 0)
+    serial = convert_pdf_to_md(handbook)
+
+    monkeypatch.setattr(settings, "pdf_parallel_page_threshold", 2)
+    monkeypatch.setattr(settings, "pdf_pages_per_range", 2)
+    monkeypatch.setattr(settings, "pdf_parallel_workers", 2)
+    assert convert_pdf_to_md(handbook) == serial
+
+
+def test_conversion_without_layout_helpers_falls_back_to_to_markdown(handbook, monkeypatch) -> None:
+    monkeypatch.setattr(settings, "pdf_parallel_page_threshold", 0)
+    serial = convert_pdf_to_md(handbook)
+
+    monkeypatch.setattr(conversion, "_document_layout", lambda: None)
+    monkeypatch.setattr(settings, "pdf_parallel_page_threshold", 2)
+    assert convert_pdf_to_md(handbook) == serial
+    windows = list(iter_pdf_pages(handbook, pages_per_window=2))
+    assert len(windows) == 3 and windows[0].startswith("# Employee Handbook")
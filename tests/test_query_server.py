@@ -0,0 +1,191 @@
+import asyncio
+import json
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from docuflow.interfaces import IRetriever, ITextEmbedder
+from docuflow.schemas import RetrievedChunk
+from docuflow.services import FlatVectorStore, MicroBatcher, QueryServer, VectorRetriever
+
+
+class BatchCountingEmbedder(ITextEmbedder):
+    """Unit vectors along the axis picked by the first word, records query batches"""
+
+    AXES = {"alpha": 0, "beta": 1, "gamma": 2}
+
+    def __init__(self) -> None:
+        self.query_batches: List[List[str]] = []
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        vectors = []
+        for text in texts:
+            vector = [0.0, 0.0, 0.0]
+            vector[self.AXES[text.split()[0]]] = 1.0
+            vectors.append(vector)
+        return vectors
+
+    def embed_queries(self, queries: Sequence[str]) -> np.ndarray:
+        self.query_batches.append(list(queries))
+        return self.embed_array(queries)
+
+
+def make_retriever(tmp_path) -> Tuple[VectorRetriever, BatchCountingEmbedder]:
+    embedder = BatchCountingEmbedder()
+    store = FlatVectorStore(db_path=tmp_path / "flat", collection_name="server")
+    texts = ["alpha chunk", "beta chunk", "gamma chunk"]
+    store.add(
+        ids=["a", "b", "c"],
+        documents=texts,
+        metadata=[{"source": "one.md"}, {"source": "one.md"}, {"source": "two.md"}],
+        embeddings=embedder.embed_array(texts),
+    )
+    return VectorRetriever(embedder=embedder, vector_store=store, cache_size=0), embedder
+
+
+def test_concurrent_queries_share_one_batch(tmp_path) -> None:
+    retriever, embedder = make_retriever(tmp_path)
+    batcher = MicroBatcher(retriever, max_wait_ms=50, max_batch_size=16)
+
+    async def main():
+        queries = ["beta one", "gamma two", "alpha three", "beta four"]
+        results = await asyncio.gather(*(batcher.submit(query, top_k=1) for query in queries))
+        await batcher.close()
+        return results
+
+    results = asyncio.run(main())
+    assert [chunks[0].id for chunks in results] == ["b", "c", "a", "b"]
+    assert embedder.query_batches == [["beta one", "gamma two", "alpha three", "beta four"]]
+    stats = batcher.stats()
+    assert stats["requests"] == 4 and stats["batches"] == 1
+    assert stats["p99_ms"] >= stats["p50_ms"] > 0
+
+
+def test_full_batches_do_not_wait(tmp_path) -> None:
+    retriever, embedder = make_retriever(tmp_path)
+    # a wait far longer than the test: only the batch size can close the first two batches
+    batcher = MicroBatcher(retriever, max_wait_ms=200, max_batch_size=2)
+
+    async def main():
+        queries = ["alpha 1", "beta 2", "gamma 3", "alpha 4", "beta 5"]
+        tasks = [asyncio.ensure_future(batcher.submit(query, top_k=2)) for query in queries]
+        first = await asyncio.wait_for(asyncio.gather(*tasks[:4]), timeout=0.15)
+        rest = await asyncio.gather(*tasks[4:])
+        await batcher.close()
+        return first + rest
+
+    results = asyncio.run(main())
+    assert [len(chunks) for chunks in results] == [2] * 5
+    assert [len(batch) for batch in embedder.query_batches] == [2, 2, 1]
+
+
+def test_queries_with_different_filters_and_top_k(tmp_path) -> None:
+    retriever, _ = make_retriever(tmp_path)
+    batcher = MicroBatcher(retriever, max_wait_ms=20, max_batch_size=8)
+
+    async def main():
+        results = await asyncio.gather(
+            batcher.submit("gamma x", top_k=1),
+            batcher.submit("gamma y", top_k=3),
+            batcher.submit("gamma z", top_k=3, where={"source": "one.md"}),
+        )
+        await batcher.close()
+        return results
+
+    top1, top3, filtered = asyncio.run(main())
+    assert [chunk.id for chunk in top1] == ["c"]
+    assert len(top3) == 3 and top3[0].id == "c"
+    assert sorted(chunk.id for chunk in filtered) == ["a", "b"]
+
+
+class GatedRetriever(IRetriever):
+    """Answers each query with a chunk named after it; queries starting with "slow" wait for the gate"""
+
+    def __init__(self) -> None:
+        self.gate = asyncio.Event()
+
+    def retrieve(self, query, top_k=5, where=None) -> List[RetrievedChunk]:
+        raise NotImplementedError
+
+    async def aretrieve_many(self, queries, top_k=5, where=None) -> List[List[RetrievedChunk]]:
+        if any(query.startswith("slow") for query in queries):
+            await self.gate.wait()
+        return [[RetrievedChunk(content=query, score=1.0, metadata={}, id=query)] for query in queries]
+
+
+def test_slow_batch_does_not_hold_up_later_batches() -> None:
+    retriever = GatedRetriever()
+    batcher = MicroBatcher(retriever, max_wait_ms=5, max_batch_size=8)
+
+    async def main():
+        slow = asyncio.ensure_future(batcher.submit("slow query"))
+        await asyncio.sleep(0.05)
+        # the slow batch is still running, a later one is answered meanwhile
+        fast = await asyncio.wait_for(batcher.submit("fast query"), timeout=1)
+        assert not slow.done()
+        retriever.gate.set()
+        results = [(await slow)[0].id, fast[0].id]
+        await batcher.close()
+        return results
+
+    assert asyncio.run(main()) == ["slow query", "fast query"]
+    assert batcher.stats()["batches"] == 2
+
+
+async def http(port: int, method: str, path: str, payload=None) -> Tuple[int, dict]:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(payload).encode() if payload is not None else b""
+    head = f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n"
+    writer.write(head.encode() + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, data = response.partition(b"\r\n\r\n")
+    return int(head.split(b" ")[1]), json.loads(data)
+
+
+def test_http_query_and_stats(tmp_path) -> None:
+    retriever, _ = make_retriever(tmp_path)
+    server = QueryServer(retriever, host="127.0.0.1", port=0, unix_socket=None, max_wait_ms=5)
+
+    async def main():
+        await server.start()
+        try:
+            answers = await asyncio.gather(
+                *(http(server.port, "POST", "/query", {"query": query, "top_k": 1}) for query in ["alpha", "gamma"])
+            )
+            bad = await http(server.port, "POST", "/query", {"top_k": 1})
+            missing = await http(server.port, "GET", "/nowhere")
+            stats = await http(server.port, "GET", "/stats")
+        finally:
+            await server.close()
+        return answers, bad, missing, stats
+
+    answers, bad, missing, stats = asyncio.run(main())
+    assert [(status, body["chunks"][0]["id"]) for status, body in answers] == [(200, "a"), (200, "c")]
+    assert answers[0][1]["chunks"][0]["content"] == "alpha chunk"
+    assert bad[0] == 400 and missing[0] == 404
+    assert stats[0] == 200 and stats[1]["requests"] == 2
+
+
+def test_oversized_body_is_rejected_unread(tmp_path) -> None:
+    retriever, embedder = make_retriever(tmp_path)
+    server = QueryServer(retriever, host="127.0.0.1", port=0, unix_socket=None, max_body_bytes=64)
+
+    async def main():
+        await server.start()
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            # announces far more than it sends: the server must answer without waiting for it
+            writer.write(b"POST /query HTTP/1.1\r\nHost: localhost\r\nContent-Length: 100000000\r\n\r\n{")
+            await writer.drain()
+            response = await asyncio.wait_for(reader.read(), timeout=1)
+            writer.close()
+            small = await http(server.port, "POST", "/query", {"query": "alpha", "top_k": 1})
+        finally:
+            await server.close()
+        return response, small
+
+    response, small = asyncio.run(main())
+    assert response.startswith(b"HTTP/1.1 413 ")
+    assert small[0] == 200 and embedder.query_batches == [["alpha"]]
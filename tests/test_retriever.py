@@ -1,14 +1,95 @@
-from pathlib import Path
+from typing import List, Sequence
 
-from docuflow.services import BGETextEmbedder, ChromaVectorStore, VectorRetriever
+import numpy as np
+import pytest
 
+from docuflow.interfaces import ITextEmbedder
+from docuflow.services import BGETextEmbedder, ChromaVectorStore, FlatVectorStore, VectorRetriever
 
-def test_retrieve_returns_structured_chunks():
+
+def test_retrieve_returns_structured_chunks(tmp_path):
     embedder = BGETextEmbedder(batch_size=64)
-    vector_store = ChromaVectorStore(db_path=Path("chroma_test_r"), collection_name="test_collection_r")
+    vector_store = ChromaVectorStore(db_path=tmp_path / "chroma", collection_name="test_collection_r")
 
     retrieve = VectorRetriever(embedder=embedder, vector_store=vector_store)
 
     query = "What is ai"
     result = retrieve.retrieve(query=query, top_k=5)
     print(result)
+
+
+class QueryCountingEmbedder(ITextEmbedder):
+    """Unit vectors along the axis picked by the first word, counts query batches"""
+
+    AXES = {"alpha": 0, "beta": 1, "gamma": 2}
+
+    def __init__(self) -> None:
+        self.query_batches: List[List[str]] = []
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        vectors = []
+        for text in texts:
+            vector = [0.0, 0.0, 0.0]
+            vector[self.AXES[text.split()[0]]] = 1.0
+            vectors.append(vector)
+        return vectors
+
+    def embed_queries(self, queries: Sequence[str]) -> np.ndarray:
+        self.query_batches.append(list(queries))
+        return self.embed_array(queries)
+
+
+def test_retrieve_many_embeds_uncached_queries_in_one_batch(tmp_path) -> None:
+    embedder = QueryCountingEmbedder()
+    vector_store = ChromaVectorStore(db_path=tmp_path / "chroma", collection_name="retrieve_many")
+    texts = ["alpha chunk", "beta chunk", "gamma chunk"]
+    vector_store.add(
+        ids=["a", "b", "c"],
+        documents=texts,
+        metadata=[{"source": "doc.md"}] * 3,
+        embeddings=embedder.embed_array(texts),
+    )
+    retriever = VectorRetriever(embedder=embedder, vector_store=vector_store, cache_size=2)
+
+    results = retriever.retrieve_many(["beta query", "alpha query", "beta  query"], top_k=1)
+    assert [chunks[0].id for chunks in results] == ["b", "a", "b"]
+    assert results[0][0].content == "beta chunk"
+    assert results[0][0].score == pytest.approx(1.0)
+    assert embedder.query_batches == [["beta query", "alpha query"]]
+
+    # Cached queries are not embedded again; the cache keeps only the 2 most recent
+    assert retriever.retrieve("alpha query", top_k=1)[0].id == "a"
+    assert len(embedder.query_batches) == 1
+    # "beta query" is now least recently used and makes room for "gamma query"
+    retriever.retrieve("gamma query", top_k=1)
+    retriever.retrieve_many(["alpha query", "beta query"], top_k=1)
+    assert embedder.query_batches[1:] == [["gamma query"], ["beta query"]]
+    assert retriever.cache_stats()["size"] == 2
+
+
+class CountingFlatStore(FlatVectorStore):
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.calls: List[str] = []
+
+    def query(self, *args, **kwargs):
+        self.calls.append("query")
+        return super().query(*args, **kwargs)
+
+    def query_batch(self, *args, **kwargs):
+        self.calls.append("query_batch")
+        return super().query_batch(*args, **kwargs)
+
+
+def test_retrieve_many_searches_the_store_once(tmp_path) -> None:
+    embedder = QueryCountingEmbedder()
+    store = CountingFlatStore(db_path=tmp_path, collection_name="flat")
+    texts = ["alpha chunk", "beta chunk", "gamma chunk"]
+    store.add(["a", "b", "c"], texts, [{"source": "doc.md"}] * 3, embedder.embed_array(texts))
+    retriever = VectorRetriever(embedder=embedder, vector_store=store)
+
+    results = retriever.retrieve_many(["gamma query", "alpha query", "beta query"], top_k=1)
+    assert [chunks[0].id for chunks in results] == ["c", "a", "b"]
+    assert retriever.retrieve("beta query", top_k=1)[0].id == "b"
+    # a single query goes through query(), which the flat store runs as a batch of one
+    assert store.calls == ["query_batch", "query", "query_batch"]
@@ -1,16 +1,11 @@
-import shutil
-from pathlib import Path
+import numpy as np
+import pytest
 
 from docuflow.services import ChromaVectorStore
 
 
-def test_chroma_vector_store_add_and_query() -> None:
-    db_path = Path("chroma_test")
-
-    if db_path.exists():
-        shutil.rmtree(db_path)
-
-    store = ChromaVectorStore(db_path=db_path, collection_name="test_collection")
+def test_chroma_vector_store_add_and_query(tmp_path) -> None:
+    store = ChromaVectorStore(db_path=tmp_path / "chroma", collection_name="test_collection")
 
     ids = ["1", "2"]
     documents = ["AI is amazing", "Cricket is popular"]
@@ -26,3 +21,130 @@ def test_chroma_vector_store_add_and_query() -> None:
 
     assert results is not None
     assert len(results["ids"][0]) == 1
+
+
+def test_chroma_vector_store_get_by_metadata(tmp_path) -> None:
+    store = ChromaVectorStore(db_path=tmp_path / "chroma", collection_name="test_collection_get")
+
+    store.add(
+        ["a", "b"],
+        ["AI is amazing", "Cricket is popular"],
+        [{"source": "x.pdf"}, {"source": "y.pdf"}],
+        [[0.1, 0.2, 0.3], [0.9, 0.8, 0.7]],
+    )
+
+    assert store.get(where={"source": "x.pdf"}, include=())["ids"] == ["a"]
+    assert store.get(ids=["b"])["documents"] == ["Cricket is popular"]
+
+
+def test_chroma_vector_store_query_with_filter(tmp_path) -> None:
+    store = ChromaVectorStore(db_path=tmp_path / "chroma", collection_name="test_collection_filter")
+
+    store.add(
+        ["a", "b", "c"],
+        ["AI is amazing", "AI is popular", "Cricket is popular"],
+        [{"source": "x.pdf", "page": 1}, {"source": "x.pdf", "page": 5}, {"source": "y.pdf", "page": 5}],
+        [[0.1, 0.2, 0.3], [0.1, 0.2, 0.31], [0.9, 0.8, 0.7]],
+    )
+
+    results = store.query([0.9, 0.8, 0.7], n_results=3, where={"source": "x.pdf", "page": {"$gte": 2}})
+    assert results["ids"] == [["b"]]
+
+
+def test_chroma_vector_store_range_and_nested_filters(tmp_path) -> None:
+    store = ChromaVectorStore(db_path=tmp_path / "chroma", collection_name="test_collection_range")
+    store.add(
+        ["p1", "p3", "p5", "q3"],
+        ["one", "three", "five", "other three"],
+        [
+            {"source": "x.pdf", "page": 1},
+            {"source": "x.pdf", "page": 3},
+            {"source": "x.pdf", "page": 5},
+            {"source": "y.pdf", "page": 3},
+        ],
+        np.eye(4, dtype=np.float32),
+    )
+
+    def ids(where):
+        return sorted(store.get(where=where, include=())["ids"])
+
+    # the same filters the flat store accepts
+    assert ids({"page": {"$gte": 2, "$lte": 4}}) == ["p3", "q3"]
+    assert ids({"source": "x.pdf", "page": {"$gt": 1, "$lt": 9}}) == ["p3", "p5"]
+    assert ids({"$or": [{"page": {"$gte": 5, "$lte": 5}}, {"source": "y.pdf"}]}) == ["p5", "q3"]
+    assert ids({"$and": [{"source": "x.pdf"}]}) == ["p1", "p3", "p5"]
+    assert ids({"source": {"$in": ("y.pdf",)}}) == ["q3"]
+    results = store.query([0.0, 1.0, 0.0, 0.0], n_results=4, where={"page": {"$gte": 2, "$lte": 4}})
+    assert results["ids"][0][0] == "p3" and sorted(results["ids"][0]) == ["p3", "q3"]
+
+    with pytest.raises(ValueError):
+        store.get(where={"$and": []})
+
+
+def test_chroma_vector_store_query_batch(tmp_path) -> None:
+    store = ChromaVectorStore(db_path=tmp_path / "chroma", collection_name="test_collection_batch")
+    store.add(
+        ["a", "b"],
+        ["AI is amazing", "Cricket is popular"],
+        [{"topic": "tech"}, {"topic": "sports"}],
+        [[0.1, 0.2, 0.3], [0.9, 0.8, 0.7]],
+    )
+
+    results = store.query_batch(np.array([[0.9, 0.8, 0.7], [0.1, 0.2, 0.3], [0.9, 0.8, 0.7]]), n_results=1)
+    assert results["ids"] == [["b"], ["a"], ["b"]]
+
+
+class FlakyCollection:
+    """Chroma collection that fails the first upsert of a given batch, counts upserts"""
+
+    def __init__(self, collection, fail_on: str, failures: int = 1) -> None:
+        self.collection = collection
+        self.fail_on = fail_on
+        self.failures = failures
+        self.batches = []
+
+    def upsert(self, ids, **kwargs) -> None:
+        self.batches.append(list(ids))
+        if ids[0] == self.fail_on and self.failures > 0:
+            self.failures -= 1
+            raise RuntimeError("transient write error")
+        self.collection.upsert(ids=ids, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+
+def test_chroma_add_writes_in_batches_and_retries_failed_batch(tmp_path) -> None:
+    store = ChromaVectorStore(
+        db_path=tmp_path / "chroma", collection_name="test_collection_bulk", batch_size=2, write_workers=2
+    )
+    store.retry_backoff = 0.0
+    flaky = FlakyCollection(store.collection, fail_on="c")
+    store.collection = flaky
+
+    ids = ["a", "b", "c", "d", "e"]
+    embeddings = np.eye(5, dtype=np.float32)
+    store.add(ids, [f"doc {i}" for i in ids], [{"source": "x.pdf"}] * 5, embeddings)
+
+    assert sorted(map(tuple, flaky.batches)) == [("a", "b"), ("c", "d"), ("c", "d"), ("e",)]
+    assert sorted(store.get(include=())["ids"]) == ids
+    assert store.query(embeddings[4].tolist(), n_results=1)["ids"] == [["e"]]
+
+
+def test_chroma_add_of_nothing_is_a_no_op(tmp_path) -> None:
+    store = ChromaVectorStore(db_path=tmp_path / "chroma", collection_name="test_collection_empty", write_workers=4)
+    flaky = FlakyCollection(store.collection, fail_on="")
+    store.collection = flaky
+
+    store.add([], [], [], np.empty((0, 3), dtype=np.float32))
+
+    assert flaky.batches == [] and store.get(include=())["ids"] == []
+
+
+def test_chroma_add_raises_when_batch_keeps_failing(tmp_path) -> None:
+    store = ChromaVectorStore(db_path=tmp_path / "chroma", collection_name="test_collection_fail", batch_size=2)
+    store.retry_backoff = 0.0
+    store.collection = FlakyCollection(store.collection, fail_on="c", failures=store.write_retries)
+
+    with pytest.raises(RuntimeError):
+        store.add(["a", "b", "c"], ["x", "y", "z"], [{"k": 1}] * 3, np.eye(3, dtype=np.float32))